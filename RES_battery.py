@@ -0,0 +1,219 @@
+import numpy as np
+import pandas as pd
+
+from RES_derived import ColumnEngine, frame_inputs, is_available
+from RES_kpi import HOURS_PER_YEAR, STATE_OF_CHARGE
+from RES_resample import as_nanoseconds, detect_step, frame_blocks
+
+# Battery cycle analytics of a scenario.
+#
+# The exports have the state of charge, charge power and discharge power of
+# the battery for every timestep. The cycles of the state-of-charge series
+# are counted with the rainflow method, and every period (the year and each
+# season) gets the number of cycles, their depth-weighted cycles (depth of
+# discharge / 100 per cycle, unlike the throughput cycles of the KPI sheet,
+# which divide the discharge throughput by the capacity), a depth-of-discharge
+# histogram and the charge and discharge throughput. Like the KPI sheet (see
+# RES_kpi), totals are averaged per year and the result is one "Battery"
+# sheet, one row per figure and one column per period.
+#
+# Rainflow counting is done without a Python loop over the rows: the series
+# is first reduced to its turning points, then the four-point rule (the
+# middle range of four consecutive turning points is a full cycle when it is
+# no larger than both ranges next to it) is applied to every turning point at
+# once, the cycles found are removed, and this is repeated until no range
+# qualifies, so there are as many passes as cycles are nested deep. Only
+# ranges strictly smaller than both neighbours are taken this way: which of
+# several equal ranges (a state of charge that keeps hitting 0 or 100 %) is
+# the cycle depends on the order they are looked at, so the few turning
+# points left are run through the sequential four-point rule of ASTM E1049,
+# and the cycles and their start times are the same as with that rule. The
+# turning points left over (the residue) are carried to the next block of
+# rows and counted as half cycles at the end, so a multi-year series can be
+# streamed block by block with the same result. A cycle belongs to the
+# period of the month it starts in.
+
+CHARGE_POWER = "Generic 1kWh Lead Acid Charge Power"
+DISCHARGE_POWER = "Generic 1kWh Lead Acid Discharge Power"
+
+# The exported charge/discharge power, else the one derived from the input
+# power (see RES_derived).
+CHARGE_SOURCES = (CHARGE_POWER, "Battery Charge Power")
+DISCHARGE_SOURCES = (DISCHARGE_POWER, "Battery Discharge Power")
+
+# Every column the battery analytics are computed from.
+BATTERY_COLUMNS = [STATE_OF_CHARGE, *CHARGE_SOURCES, *DISCHARGE_SOURCES]
+
+# Depth-of-discharge histogram bins, in % of the state of charge.
+DOD_STEP = 10
+
+
+def turning_points(values):
+    # Positions of the turning points of a series without NaN values: the
+    # first and last value and every value where the series changes
+    # direction (the first value of a flat stretch stands for it).
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.int64)
+    moves = np.flatnonzero(np.r_[True, np.diff(values) != 0])
+    if len(moves) < 3:
+        return moves
+    steps = np.sign(np.diff(values[moves]))
+    reversals = moves[1:-1][steps[1:] != steps[:-1]]
+    return np.r_[moves[0], reversals, moves[-1]]
+
+
+def rainflow(values):
+    # Full cycles of a series of turning points by the four-point rule;
+    # returns (starts, ends, residue): the positions where every full cycle
+    # starts and ends and the positions of the residue, in order.
+    index = np.arange(len(values))
+    starts, ends = [], []
+    while len(index) >= 4:
+        ranges = np.abs(np.diff(values[index]))
+        inner = ranges[1:-1]
+        closed = (inner < ranges[:-2]) & (inner < ranges[2:])
+        if not closed.any():
+            break
+        first = np.flatnonzero(closed) + 1
+        starts.append(index[first])
+        ends.append(index[first + 1])
+        keep = np.ones(len(index), dtype=bool)
+        keep[first] = keep[first + 1] = False
+        index = index[keep]
+
+    # Equal ranges, one turning point at a time.
+    stack, tied = [], []
+    for position in index.tolist():
+        stack.append(position)
+        while len(stack) >= 4:
+            a, b, c, d = values[stack[-4:]]
+            if abs(b - c) > abs(a - b) or abs(b - c) > abs(c - d):
+                break
+            tied.append(stack[-3:-1])
+            del stack[-3:-1]
+    tied = np.array(tied, dtype=np.int64).reshape(-1, 2)
+    starts.append(tied[:, 0])
+    ends.append(tied[:, 1])
+    return np.concatenate(starts), np.concatenate(ends), np.array(stack, dtype=np.int64)
+
+
+class BatteryCycles:
+    # Running per-period cycle counts and throughput of a stream of blocks of
+    # rows.
+    #
+    # seasons:    {season name: months}; an "Annual" period covers every row
+    # step_hours: length of a timestep in hours (detected from the first
+    #             block when None)
+    # residue:    (stamps, state of charge) of the turning points that are
+    #             not part of a full cycle yet
+
+    def __init__(self, seasons, step_hours=None):
+        self.periods = ["Annual"] + list(seasons)
+        self.membership = np.zeros((len(self.periods), 13))
+        self.membership[0, 1:] = 1.0
+        for number, months in enumerate(seasons.values(), start=1):
+            self.membership[number, list(months)] = 1.0
+        self.step_hours = step_hours
+        self.bins = 100 // DOD_STEP
+        self.histogram = np.zeros((len(self.periods), self.bins))
+        self.depth = np.zeros(len(self.periods))
+        self.energy = np.zeros((len(self.periods), 2))
+        self.present = np.zeros(3, dtype=bool)
+        self.rows = 0
+        self.residue = (np.zeros(0, dtype=np.int64), np.zeros(0))
+
+    def add(self, stamps, columns):
+        # Add a block of rows: int64 nanosecond 'stamps' and a mapping of
+        # column names to arrays (raw or derived columns, see RES_derived).
+        stamps = as_nanoseconds(stamps)
+        if len(stamps) == 0:
+            return
+        if self.step_hours is None:
+            step = detect_step(stamps.astype("datetime64[ns]"))
+            self.step_hours = step / 60 if step else 1.0
+        self.rows += len(stamps)
+
+        engine = ColumnEngine(columns)
+        months = stamps.astype("datetime64[ns]").astype("datetime64[M]").astype(np.int64) % 12 + 1
+        for number, sources in enumerate((CHARGE_SOURCES, DISCHARGE_SOURCES)):
+            source = next((column for column in sources if engine.has(column)), None)
+            if source is not None:
+                self.energy[:, number] += self.membership[:, months] @ np.nan_to_num(engine.column(source)) * self.step_hours
+                self.present[number] = True
+
+        if not engine.has(STATE_OF_CHARGE):
+            return
+        self.present[2] = True
+        charge = np.asarray(engine.column(STATE_OF_CHARGE), dtype=np.float64)
+        valid = ~np.isnan(charge)
+        # The residue of the previous blocks goes first; its last point is
+        # only a turning point if the series turns after it.
+        stamps = np.concatenate([self.residue[0], stamps[valid]])
+        charge = np.concatenate([self.residue[1], charge[valid]])
+        points = turning_points(charge)
+        stamps, charge = stamps[points], charge[points]
+        starts, ends, residue = rainflow(charge)
+        self.count(stamps[starts], np.abs(charge[ends] - charge[starts]), 1.0)
+        self.residue = (stamps[residue], charge[residue])
+
+    def count(self, stamps, depths, weight):
+        # Add cycles starting at 'stamps' with the given depths (in % of the
+        # state of charge); weight 1 for full and 0.5 for half cycles.
+        if len(stamps) == 0:
+            return
+        months = stamps.astype("datetime64[ns]").astype("datetime64[M]").astype(np.int64) % 12 + 1
+        member = self.membership[:, months] * weight
+        bins = np.minimum((depths // DOD_STEP).astype(np.int64), self.bins - 1)
+        for period in range(len(self.periods)):
+            self.histogram[period] += np.bincount(bins, member[period], self.bins)
+        self.depth += member @ depths
+
+    def years(self):
+        # Number of years the rows cover (one for a one-year hourly export).
+        if not self.rows:
+            return 1.0
+        return max(self.rows * self.step_hours / HOURS_PER_YEAR, 1e-9)
+
+    def result(self):
+        # The Battery sheet: one row per figure, one column per period, per
+        # year; NaN for the figures the file has no columns for. The residue
+        # is counted as half cycles here, so result() ends the stream.
+        stamps, charge = self.residue
+        self.count(stamps[:-1], np.abs(np.diff(charge)), 0.5)
+        self.residue = (stamps[-1:], charge[-1:])
+
+        years = self.years()
+        cycles = self.histogram.sum(axis=1)
+        rows = {
+            "Rainflow cycles": cycles / years,
+            "Depth-weighted cycles": self.depth / 100 / years,
+        }
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rows["Mean depth of discharge (%)"] = np.where(cycles > 0, self.depth / cycles, np.nan)
+        rows["Charge throughput (kWh)"] = self.energy[:, 0] / years
+        rows["Discharge throughput (kWh)"] = self.energy[:, 1] / years
+        for number in range(self.bins):
+            rows[f"Cycles of {number * DOD_STEP}-{(number + 1) * DOD_STEP} % depth"] = self.histogram[:, number] / years
+
+        table = pd.DataFrame(rows, index=self.periods).T
+        if not self.present[2]:
+            table.loc[[name for name in rows if "throughput" not in name]] = np.nan
+        for number, name in enumerate(("Charge throughput (kWh)", "Discharge throughput (kWh)")):
+            if not self.present[number]:
+                table.loc[name] = np.nan
+        table.index.name = "Battery"
+        return table
+
+
+def battery_columns(header):
+    # The battery columns that are (or can be derived from) the given columns.
+    return [column for column in BATTERY_COLUMNS if is_available(column, header)]
+
+
+def battery_sheet(df, seasons):
+    # The Battery sheet of a frame indexed by 'Time' (or a compact frame),
+    # one block of rows at a time.
+    cycles = BatteryCycles(seasons)
+    for stamps, columns in frame_blocks(df, frame_inputs(df, BATTERY_COLUMNS)):
+        cycles.add(stamps, columns)
+    return cycles.result()
@@ -0,0 +1,468 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+# Benchmarks of the load -> filter -> aggregate -> write flow on synthetic
+# HOMER-shaped workbooks.
+#
+# The synthetic workbooks use the same layout as RES_P11.xlsx: a shared-string
+# header row with the 36 HOMER columns, the units row, then one row per
+# timestep with 'Time' stored as an Excel serial date. Each scale runs in a
+# fresh process and every stage is timed on its own; the results (wall time,
+# peak memory and rows/sec per stage) are written as JSON, which can be compared
+# with the results of another commit:
+#   python RES_bench.py --scales 1 10 --output bench_new.json --compare bench_old.json
+# --startup times the start of RES_pipeline.py instead: argument parsing
+# alone and a run with nothing to rebuild, each in fresh interpreters, and
+# lists the heavy modules (NumPy, pandas...) each of them imported.
+
+# The columns and units of a HOMER hourly export, as stored in RES_P11.xlsx
+# (including the latin1-mangled unit labels the reader has to repair).
+HOMER_COLUMNS = [
+    ("Time", None),
+    ("Global Solar", "kW/m2"),
+    ("Generic flat plate PV Solar Altitude", "Â°"),
+    ("Generic flat plate PV Solar Azimuth", "Â°"),
+    ("Generic flat plate PV Angle of Incidence", "Â°"),
+    ("Generic flat plate PV Incident Solar", "kW/m2"),
+    ("Generic flat plate PV Power Output", "kW"),
+    ("AC Primary Load", "kW"),
+    ("AC Primary Load Served", "kW"),
+    ("Total Electrical Load Served", "kW"),
+    ("Renewable Penetration", "%"),
+    ("Excess Electrical Production", "kW"),
+    ("Unmet Electrical Load", "kW"),
+    ("Capacity Shortage", "kW"),
+    ("Total Renewable Power Output", "kW"),
+    ("Inverter Power Input", "kW"),
+    ("Inverter Power Output", "kW"),
+    ("Rectifier Power Input", "kW"),
+    ("Rectifier Power Output", "kW"),
+    ("Generic 1kWh Lead Acid Maximum Charge Power", "kW"),
+    ("Generic 1kWh Lead Acid Maximum Discharge Power", "kW"),
+    ("Generic 1kWh Lead Acid Charge Power", "kW"),
+    ("Generic 1kWh Lead Acid Discharge Power", "kW"),
+    ("Generic 1kWh Lead Acid Input Power", "kW"),
+    ("Generic 1kWh Lead Acid Energy Content", "kWh"),
+    ("Generic 1kWh Lead Acid State of Charge", "%"),
+    ("Generic 1kWh Lead Acid Energy Cost", "$/kWh"),
+    ("Thermal Load", "kW"),
+    ("Boiler Thermal Output", "kW"),
+    ("Boiler Fuel", "mÂ³"),
+    ("Thermal Served", "kW"),
+    ("Excess Thermal Output", "kW"),
+    ("AC Required Operating Capacity", "kW"),
+    ("DC Required Operating Capacity", "kW"),
+    ("AC Operating Capacity", "kW"),
+    ("DC Operating Capacity", "kW"),
+]
+
+# Scale factor -> (timestep in minutes, number of rows). 1x is one year of
+# hourly data like the sample workbooks; 100x is about 1.7 years of 1-minute
+# data, close to the 1,048,576-row limit of a worksheet.
+SCALES = {
+    1: (60, 8760),
+    10: (6, 87600),
+    100: (1, 876000),
+}
+
+# The columns every benchmark run extracts, as RES_main_1/2 do for P11.
+TARGET_COLUMNS = {
+    "Generic flat plate PV Power Output": "خروجی سلول خورشیدی",
+    "Generic 1kWh Lead Acid Input Power": "ورودی باتری",
+    "Total Electrical Load Served": "بار",
+}
+
+# Runs of every startup command (the median is reported), and the modules a
+# run with nothing to do should not import.
+STARTUP_REPEATS = 5
+HEAVY_MODULES = ("numpy", "pandas", "openpyxl", "pyarrow", "xlsxwriter")
+
+EXCEL_EPOCH = np.datetime64("1899-12-30T00:00:00")
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '<Override PartName="/xl/sharedStrings.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+    "</Types>"
+)
+
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>'
+)
+
+WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="P_bench" sheetId="1" r:id="rId1"/></sheets></workbook>'
+)
+
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '<Relationship Id="rId3" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" '
+    'Target="sharedStrings.xml"/></Relationships>'
+)
+
+# Style 1 is a date-time format, so openpyxl/pandas read 'Time' as datetimes
+# just like in the real exports.
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    "</styleSheet>"
+)
+
+
+def column_letters(index):
+    # 0 -> "A", 35 -> "AJ".
+    letters = ""
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = chr(65 + rest) + letters
+    return letters
+
+
+def synthetic_values(rows, step_minutes, seed=0):
+    # Plausible-looking HOMER data: a daily solar curve for the PV columns,
+    # a noisy load, a battery that absorbs the difference, noise elsewhere.
+    rng = np.random.default_rng(seed)
+    hours = np.arange(rows) * (step_minutes / 60.0)
+    solar = np.clip(np.sin((hours % 24 - 6) / 12 * np.pi), 0, None)
+    load = 0.4 + 0.3 * np.clip(np.sin((hours % 24 - 12) / 12 * np.pi), 0, None) + rng.random(rows) * 0.1
+    values = rng.random((rows, len(HOMER_COLUMNS) - 1))
+    values[:, 0] = solar
+    values[:, 5] = solar * 0.9
+    values[:, 8] = load
+    values[:, 22] = solar * 1.5 - load
+    values[:, 24] = 40 + 60 * rng.random(rows)
+    return values
+
+
+def write_synthetic_workbook(path, scale=1, start="2025-01-01", seed=0, block_rows=20000):
+    # Write a HOMER-shaped workbook for the given scale and return its number
+    # of data rows. The sheet XML is streamed into the archive in blocks.
+    step_minutes, rows = SCALES[scale]
+    names = [name for name, _ in HOMER_COLUMNS]
+    labels = sorted({units for _, units in HOMER_COLUMNS if units})
+    strings = names + labels
+    letters = [column_letters(i) for i in range(len(HOMER_COLUMNS))]
+
+    start_serial = (np.datetime64(start) - EXCEL_EPOCH) / np.timedelta64(1, "D")
+    serials = (start_serial + np.arange(rows) * (step_minutes / 1440.0)).tolist()
+    values = synthetic_values(rows, step_minutes, seed)
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+        archive.writestr("_rels/.rels", ROOT_RELS)
+        archive.writestr("xl/workbook.xml", WORKBOOK)
+        archive.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS)
+        archive.writestr("xl/styles.xml", STYLES)
+        archive.writestr(
+            "xl/sharedStrings.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="{len(strings)}" '
+            f'uniqueCount="{len(strings)}">' + "".join(f"<si><t>{escape(s)}</t></si>" for s in strings) + "</sst>",
+        )
+
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                + f'<dimension ref="A1:{letters[-1]}{rows + 2}"/><sheetData>'.encode("ascii")
+            )
+            header = "".join(f'<c r="{letters[i]}1" t="s"><v>{i}</v></c>' for i in range(len(names)))
+            units = "".join(
+                f'<c r="{letters[i]}2" t="s"><v>{len(names) + labels.index(label)}</v></c>'
+                for i, (_, label) in enumerate(HOMER_COLUMNS)
+                if label
+            )
+            sheet.write(f'<row r="1">{header}</row><row r="2">{units}</row>'.encode("utf-8"))
+
+            for first in range(0, rows, block_rows):
+                last = min(rows, first + block_rows)
+                text = np.char.mod("%.10g", values[first:last]).tolist()
+                parts = []
+                for offset, row_values in enumerate(text):
+                    number = first + offset + 3
+                    cells = "".join(
+                        f'<c r="{letter}{number}"><v>{value}</v></c>' for letter, value in zip(letters[1:], row_values)
+                    )
+                    parts.append(
+                        f'<row r="{number}"><c r="A{number}" s="1"><v>{serials[first + offset]!r}</v></c>{cells}</row>'
+                    )
+                sheet.write("".join(parts).encode("ascii"))
+            sheet.write(b"</sheetData></worksheet>")
+    return rows
+
+
+def peak_rss_mb():
+    # High-water mark of the resident set size of this process, in MB.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class StagePeak:
+    # Peak memory of one stage at a time. ru_maxrss only ever grows, so on
+    # Linux the RSS high-water mark (VmHWM) is reset before every stage
+    # through /proc/self/clear_refs; elsewhere the tracemalloc peak of the
+    # stage's allocations (Python and NumPy) is reported instead.
+    #
+    # measure: "rss" or "traced"
+
+    def __init__(self):
+        try:
+            self.reset_rss()
+            self.measure = "rss"
+        except OSError:
+            self.measure = "traced"
+            tracemalloc.start()
+
+    @staticmethod
+    def reset_rss():
+        with open("/proc/self/clear_refs", "w") as handle:
+            handle.write("5")
+
+    def reset(self):
+        if self.measure == "rss":
+            self.reset_rss()
+        else:
+            tracemalloc.reset_peak()
+
+    def peak_mb(self):
+        if self.measure == "traced":
+            return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        with open("/proc/self/status") as handle:
+            for line in handle:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+        return peak_rss_mb()
+
+
+def run_stages(workbook, rows, work_dir):
+    # Time every pipeline stage on one workbook, in this process, in the order
+    # RES_pipeline.process_scenario runs them (sub-hourly data is resampled
+    # into hourly bins before the extraction).
+    from RES_cache import load_cached, open_entry
+    from RES_extract import mid_month_sheets
+    from RES_pipeline import DEFAULT_MONTHS, DEFAULT_SEASONS
+    from RES_profiles import seasonal_sheets
+    from RES_reader import load_homer
+    from RES_resample import detect_step, needs_resampling, resample_frame
+    from RES_writer import write_result
+
+    cache_dir = os.path.join(work_dir, "cache")
+    results = {}
+    state = {}
+    peak = StagePeak()
+
+    def timed(stage, action):
+        peak.reset()
+        started = time.perf_counter()
+        state[stage] = action()
+        seconds = time.perf_counter() - started
+        results[stage] = {
+            "seconds": round(seconds, 6),
+            "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else None,
+            "peak_mb": round(peak.peak_mb(), 1),
+            "memory": peak.measure,
+        }
+
+    timed("read", lambda: load_homer(workbook, TARGET_COLUMNS))
+    timed("cache_store", lambda: open_entry(workbook, cache_dir))
+    timed("cache_load", lambda: load_cached(workbook, TARGET_COLUMNS, cache_dir))
+    df = state["cache_load"]
+    if needs_resampling(detect_step(df.index)):
+        timed("resample", lambda: resample_frame(df))
+        df = state["resample"]
+    timed("extract", lambda: mid_month_sheets(df, TARGET_COLUMNS, DEFAULT_MONTHS))
+    timed("profile", lambda: seasonal_sheets(df, TARGET_COLUMNS, DEFAULT_SEASONS))
+    timed("write", lambda: write_result(state["profile"], os.path.join(work_dir, "Result_bench.xlsx")))
+    return results
+
+
+def bench_scale(scale, work_dir):
+    # Generate the workbook of one scale and time its stages in a fresh
+    # interpreter, so peak RSS is not polluted by the other scales.
+    workbook = os.path.join(work_dir, f"RES_bench_{scale}x.xlsx")
+    started = time.perf_counter()
+    rows = write_synthetic_workbook(workbook, scale)
+    generate_seconds = time.perf_counter() - started
+
+    script = os.path.abspath(__file__)
+    output = subprocess.run(
+        [sys.executable, script, "--stages-of", workbook, str(rows), work_dir],
+        check=True, capture_output=True, text=True, cwd=os.path.dirname(script),
+    ).stdout
+    step_minutes, _ = SCALES[scale]
+    return {
+        "scale": scale,
+        "rows": rows,
+        "step_minutes": step_minutes,
+        "workbook_mb": round(os.path.getsize(workbook) / (1024 * 1024), 2),
+        "generate_seconds": round(generate_seconds, 3),
+        "stages": json.loads(output.strip().splitlines()[-1]),
+    }
+
+
+def time_command(command, work_dir, repeats=STARTUP_REPEATS):
+    # Median wall time of a command in fresh interpreters, and the heavy
+    # modules it imports (from one more run under -X importtime).
+    env = dict(os.environ, RES_CACHE_DIR=os.path.join(work_dir, "cache"))
+    seconds = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        subprocess.run(command, check=True, capture_output=True, cwd=work_dir, env=env)
+        seconds.append(time.perf_counter() - started)
+    trace = subprocess.run(
+        [command[0], "-X", "importtime"] + command[1:], check=True, capture_output=True, text=True, cwd=work_dir, env=env,
+    ).stderr
+    imported = {line.rsplit("|", 1)[-1].strip() for line in trace.splitlines() if line.startswith("import time:")}
+    return {
+        "seconds": round(float(np.median(seconds)), 4),
+        "heavy_imports": [module for module in HEAVY_MODULES if module in imported],
+    }
+
+
+def bench_startup(work_dir):
+    # Startup of RES_pipeline.py: the bare interpreter (for reference),
+    # --help, and a second run of a one-scenario manifest, whose output is
+    # up to date by then.
+    workbook = os.path.join(work_dir, "RES_bench_1x.xlsx")
+    if not os.path.exists(workbook):
+        write_synthetic_workbook(workbook, 1)
+    manifest = os.path.join(work_dir, "RES_bench_startup.json")
+    with open(manifest, "w", encoding="utf-8") as handle:
+        json.dump({"scenarios": [{
+            "name": "bench",
+            "input": os.path.basename(workbook),
+            "output": "Result_bench_startup.xlsx",
+            "columns": TARGET_COLUMNS,
+        }]}, handle, ensure_ascii=False)
+
+    pipeline = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "RES_pipeline.py")]
+    time_command(pipeline + [manifest], work_dir, repeats=1)
+    return {
+        "interpreter": time_command([sys.executable, "-c", "pass"], work_dir),
+        "help": time_command(pipeline + ["--help"], work_dir),
+        "up_to_date": time_command(pipeline + [manifest], work_dir),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(report, baseline):
+    # Print the speed-up of every stage against a previous report.
+    previous = {result["scale"]: result for result in baseline.get("results", [])}
+    print(f"{'scale':>6} {'stage':<12} {'before (s)':>11} {'after (s)':>10} {'speed-up':>9}")
+    for result in report["results"]:
+        old = previous.get(result["scale"])
+        if old is None:
+            continue
+        for stage, timing in result["stages"].items():
+            if stage not in old["stages"]:
+                continue
+            before, after = old["stages"][stage]["seconds"], timing["seconds"]
+            ratio = before / after if after else float("inf")
+            print(f"{result['scale']:>5}x {stage:<12} {before:>11.4f} {after:>10.4f} {ratio:>8.2f}x")
+    for command, timing in report.get("startup", {}).items():
+        old = baseline.get("startup", {}).get(command)
+        if old is None:
+            continue
+        before, after = old["seconds"], timing["seconds"]
+        ratio = before / after if after else float("inf")
+        print(f"{'start':>6} {command:<12} {before:>11.4f} {after:>10.4f} {ratio:>8.2f}x")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the HOMER pipeline on synthetic workbooks.")
+    parser.add_argument("--scales", nargs="+", type=int, default=[1, 10], choices=sorted(SCALES))
+    parser.add_argument("--output", default="bench_output.json", help="where to write the JSON report")
+    parser.add_argument("--compare", metavar="REPORT", help="a previous JSON report to compare against")
+    parser.add_argument("--startup", action="store_true", help="time the startup of RES_pipeline.py instead of the stages")
+    parser.add_argument("--stages-of", nargs=3, metavar=("WORKBOOK", "ROWS", "DIR"), help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.stages_of:
+        workbook, rows, work_dir = args.stages_of
+        print(json.dumps(run_stages(workbook, int(rows), work_dir)))
+        return 0
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="res_bench_") as work_dir:
+        if args.startup:
+            report["startup"] = bench_startup(work_dir)
+            for command, timing in report["startup"].items():
+                heavy = ", ".join(timing["heavy_imports"]) or "-"
+                print(f"start {command:<12} {timing['seconds']:>9.4f} s  imports: {heavy}")
+        for scale in [] if args.startup else args.scales:
+            result = bench_scale(scale, work_dir)
+            report["results"].append(result)
+            for stage, timing in result["stages"].items():
+                print(f"{scale:>4}x {stage:<12} {timing['seconds']:>9.4f} s  {timing['peak_mb']:>8.1f} MB")
+
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=1)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            compare(report, json.load(handle))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
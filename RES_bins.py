@@ -0,0 +1,28 @@
+# Time bins of the result sheets.
+#
+# The result sheets hold one row per bin of the day (hourly by default). These
+# definitions do not need NumPy or pandas, so a manifest can be checked (and
+# an up to date run can finish) without importing them.
+
+DEFAULT_BIN_MINUTES = 60
+MINUTES_PER_DAY = 24 * 60
+
+
+def check_bin_minutes(bin_minutes):
+    # Bins have to tile a day exactly.
+    if bin_minutes <= 0 or MINUTES_PER_DAY % bin_minutes:
+        raise ValueError(f"A bin of {bin_minutes} minutes does not divide a day evenly.")
+    return bin_minutes
+
+
+def day_slots(bin_minutes=DEFAULT_BIN_MINUTES):
+    # Number of bins in a day (24 for hourly bins).
+    return MINUTES_PER_DAY // check_bin_minutes(bin_minutes)
+
+
+def slot_labels(bin_minutes=DEFAULT_BIN_MINUTES):
+    # 'Hour' index of the result sheets: 0..23 for hourly bins, the start of
+    # every bin in (fractional) hours otherwise.
+    if bin_minutes == 60:
+        return list(range(24))
+    return [slot * bin_minutes / 60 for slot in range(day_slots(bin_minutes))]
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from RES_columns import ColumnIndex
+from RES_timing import stage
+
+# Binary columnar cache of parsed HOMER exports.
+#
+# The first time a workbook is loaded, every column of the sheet is decoded
+# (header fix, units row dropped, 'Time' converted to datetime) and stored as
+# one raw binary file per column in a cache entry keyed by the workbook's
+# content hash and modification time. The sheet is streamed into those files
+# chunk by chunk, so even multi-year sub-hourly exports are cached in bounded
+# memory. Later runs memory-map the files instead of parsing the xlsx again,
+# whatever subset of columns they ask for. NumPy, pandas and the reader are
+# imported by the functions that build and read entries, so hashing a
+# workbook (the up to date check of RES_incremental) does not load them.
+
+# Where cache entries are kept; can be moved with the RES_CACHE_DIR variable.
+CACHE_DIR = os.environ.get("RES_CACHE_DIR", ".res_cache")
+
+# Once the cache grows over this size, the least recently used entries are
+# removed.
+MAX_CACHE_BYTES = int(os.environ.get("RES_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+# Bumped whenever the layout of an entry changes, so old entries are not
+# read with the new code.
+CACHE_VERSION = 4
+
+META_FILE = "meta.json"
+TIME_FILE = "time.bin"
+
+
+def file_digest(path):
+    # SHA-256 of the workbook content, read in blocks.
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(path):
+    # Entries are keyed by content hash and mtime, so a regenerated export
+    # never reuses a stale entry.
+    stat = os.stat(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    with stage("hash"):
+        digest = file_digest(path)
+    return f"{stem}-{digest[:20]}-{stat.st_mtime_ns}-v{CACHE_VERSION}"
+
+
+def entry_size(entry):
+    # Total size in bytes of the files of one cache entry (0 if another
+    # process removed it in the meantime).
+    try:
+        return sum(entry_file.stat().st_size for entry_file in os.scandir(entry) if entry_file.is_file())
+    except FileNotFoundError:
+        return 0
+
+
+def store_entry(path, entry, time_column="Time"):
+    # Stream the whole workbook once and append every column, chunk by
+    # chunk, to its own raw binary file.
+    import numpy as np
+
+    from RES_reader import read_homer_chunks
+    from RES_timeaxis import TimeAxisCheck
+
+    staging = f"{entry}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    files, dtypes, handles, rows = {}, {}, {}, 0
+    check = TimeAxisCheck()
+    try:
+        with stage("parse"):
+            header, units, chunks = read_homer_chunks(path, None, time_column)
+            numbers = {name: number for number, name in enumerate(header)}
+            for chunk in chunks:
+                if time_column in chunk:
+                    check.add(chunk[time_column])
+                for name, values in chunk.items():
+                    if name not in handles:
+                        files[name] = TIME_FILE if name == time_column else f"c{numbers[name]:03d}.bin"
+                        dtypes[name] = values.dtype.str
+                        handles[name] = open(os.path.join(staging, files[name]), "wb")
+                    handles[name].write(np.ascontiguousarray(values).tobytes())
+                rows += len(chunk[time_column]) if time_column in chunk else len(next(iter(chunk.values())))
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+    meta = {
+        "source": os.path.abspath(path),
+        "header": header,
+        "column_index": ColumnIndex(header).to_json(),
+        "units": {name: label for name, label in units.items() if name is not None},
+        "time_column": time_column,
+        "rows": rows,
+        "time_axis": check.summary(),
+        "files": files,
+        "dtypes": dtypes,
+    }
+    with open(os.path.join(staging, META_FILE), "w", encoding="utf-8") as handle:
+        json.dump(meta, handle, ensure_ascii=False, indent=1)
+    # Irregular timesteps are reported once, when the file is first read.
+    for line in check.messages(os.path.basename(path)):
+        print(line)
+
+    # Publishing the entry with a rename keeps concurrent readers from ever
+    # seeing a half-written entry.
+    try:
+        os.rename(staging, entry)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, keep=None):
+    # Remove least recently used entries until the cache fits in max_bytes.
+    # The entry named in 'keep' (the one just used) is never removed.
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_dir() and ".tmp-" not in entry.name:
+            try:
+                used = os.path.getmtime(os.path.join(entry.path, META_FILE))
+            except FileNotFoundError:
+                used = 0
+            entries.append((used, entry.path, entry_size(entry.path)))
+    total = sum(size for _, _, size in entries)
+    for _, entry, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if keep is not None and os.path.abspath(entry) == os.path.abspath(keep):
+            continue
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+
+
+def open_entry(path, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, time_column="Time"):
+    # Return the cache entry directory for a workbook, creating it on a miss.
+    entry = os.path.join(cache_dir, cache_key(path))
+    meta = os.path.join(entry, META_FILE)
+    if os.path.exists(meta):
+        # Touch the metadata so eviction sees this entry as recently used.
+        now = time.time()
+        os.utime(meta, (now, now))
+        return entry
+
+    os.makedirs(cache_dir, exist_ok=True)
+    store_entry(path, entry, time_column)
+    with stage("evict"):
+        evict(cache_dir, max_bytes, keep=entry)
+    return entry
+
+
+def read_entry(entry, columns=None):
+    # Memory-map the requested columns of a cache entry; returns
+    # (meta, {name: array}) with the 'Time' column included. Requested
+    # columns are resolved through the column index of the entry (see
+    # RES_columns): a column the file names differently is returned under
+    # the requested name (under each of them when several requested names
+    # resolve to it), and meta["header"] and meta["units"] use those names.
+    import numpy as np
+
+    with open(os.path.join(entry, META_FILE), encoding="utf-8") as handle:
+        meta = json.load(handle)
+    time_column = meta["time_column"]
+    if columns is None:
+        sources = {name: name for name in meta["files"]}
+    else:
+        index = ColumnIndex.from_json(meta["header"], meta["column_index"])
+        sources, notes = index.resolve([name for name in columns if name != time_column])
+        for line in notes:
+            print(line)
+        sources[time_column] = time_column
+        aliases = {}
+        for name, source in sources.items():
+            aliases.setdefault(source, []).append(name)
+        meta["header"] = [alias for name in meta["header"] for alias in aliases.get(name, [name])]
+        meta["units"] = {alias: label for name, label in meta["units"].items() for alias in aliases.get(name, [name])}
+    arrays = {}
+    for name, source in sources.items():
+        file_name = meta["files"].get(source)
+        if file_name is None:
+            continue
+        dtype = np.dtype(meta["dtypes"][source])
+        if meta["rows"]:
+            arrays[name] = np.memmap(os.path.join(entry, file_name), dtype=dtype, mode="r", shape=(meta["rows"],))
+        else:
+            arrays[name] = np.empty(0, dtype=dtype)
+    return meta, arrays
+
+
+def load_cached(path, columns=None, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, time_column="Time"):
+    # Cached counterpart of RES_reader.load_homer: same DataFrame (indexed by
+    # 'Time', requested columns in sheet order), but backed by the
+    # memory-mapped cache entry of the workbook. The units row is kept in
+    # df.attrs["units"].
+    import pandas as pd
+
+    entry = open_entry(path, cache_dir, max_bytes, time_column)
+    with stage("mmap"):
+        meta, arrays = read_entry(entry, columns)
+    data = {name: arrays[name] for name in meta["header"] if name in arrays and name != time_column}
+    index = pd.DatetimeIndex(arrays.get(time_column, []), name=time_column)
+    df = pd.DataFrame(data, index=index, copy=False)
+    df.attrs["units"] = meta["units"]
+    return df
@@ -0,0 +1,243 @@
+import numpy as np
+
+from RES_battery import BATTERY_COLUMNS, battery_columns
+from RES_cache import CACHE_DIR, MAX_CACHE_BYTES, open_entry, read_entry
+from RES_derived import derive_chunks, is_available, raw_columns
+from RES_kpi import KPI_COLUMNS, kpi_columns
+from RES_extract import month_sheets
+from RES_profiles import profile_sheets
+from RES_sketch import QuantileSketch, distribution_sheets
+from RES_resample import (
+    CHUNK_ROWS,
+    DAY_NS,
+    DEFAULT_BIN_MINUTES,
+    MINUTE_NS,
+    NAT,
+    as_nanoseconds,
+    day_slots,
+    detect_step,
+    needs_resampling,
+)
+
+# One-pass, constant-memory aggregation of long HOMER exports.
+#
+# Multi-year runs (e.g. 25-year lifetime simulations) and exports that
+# concatenate several sites are read from the workbook's cache entry in
+# fixed-size blocks of rows instead of one DataFrame. Every block updates
+# running per-(season, hour, column) counts, sums, sums of squares, minima and
+# maxima, and fills in the mid-month days, so both result layouts come out of
+# a single pass over the data. Rows of a season are pooled: the seasonal
+# profile of a multi-site export is the mean over every site and day. On
+# request the same blocks also fill a QuantileSketch (see RES_sketch) for the
+# percentile profiles of the "distribution" mode.
+
+# Statistics that can be computed from the running totals.
+STATISTICS = ("mean", "std", "min", "max")
+
+
+def cached_chunks(
+    path, columns=None, chunk_rows=CHUNK_ROWS, time_column="Time", cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES
+):
+    # Open (or build) the cache entry of a workbook; returns (header, chunks)
+    # where 'chunks' yields {name: array} blocks of chunk_rows consecutive rows
+    # sliced from the memory-mapped columns.
+    entry = open_entry(path, cache_dir, max_bytes, time_column)
+    meta, arrays = read_entry(entry, columns)
+
+    def chunks():
+        for start in range(0, meta["rows"], chunk_rows):
+            yield {name: values[start:start + chunk_rows] for name, values in arrays.items()}
+
+    return meta["header"], chunks()
+
+
+def binned_chunks(chunks, columns, bin_minutes=DEFAULT_BIN_MINUTES, time_column="Time"):
+    # Turn {name: array} blocks into (stamps, values) blocks, values holding
+    # 'columns' in order. Finer data is averaged into bins on the way, one
+    # bin per run of consecutive rows in the same (day, bin): the run at the
+    # end of a block is held back and joined to the next block, so a bin
+    # split across two blocks is still averaged as a whole. The time may go
+    # back (a multi-site export starting over), it just starts new runs.
+    carry = None
+    resample = None
+    bin_ns = bin_minutes * MINUTE_NS
+    for chunk in chunks:
+        stamps = as_nanoseconds(chunk[time_column])
+        values = np.column_stack(
+            [np.asarray(chunk.get(name, np.full(len(stamps), np.nan)), dtype=np.float64) for name in columns]
+        )
+        values = values.reshape(len(stamps), len(columns))
+        valid = stamps != NAT
+        stamps, values = stamps[valid], values[valid]
+        if resample is None and len(stamps) > 1:
+            resample = needs_resampling(detect_step(stamps.astype("datetime64[ns]")), bin_minutes)
+        if not resample:
+            yield stamps, values
+            continue
+
+        if carry is not None:
+            stamps = np.concatenate([carry[0], stamps])
+            values = np.concatenate([carry[1], values])
+        if len(stamps) == 0:
+            continue
+        bins = stamps // bin_ns
+        starts = run_starts(bins)
+        last = starts[-1]
+        carry = (stamps[last:], values[last:])
+        if last:
+            yield binned(bins[:last], values[:last], starts[:-1], bin_ns)
+    if carry is not None and len(carry[0]):
+        bins = carry[0] // bin_ns
+        yield binned(bins, carry[1], run_starts(bins), bin_ns)
+
+
+def run_starts(bins):
+    # Positions where a run of rows in the same bin starts.
+    return np.flatnonzero(np.concatenate([[True], bins[1:] != bins[:-1]]))
+
+
+def binned(bins, values, starts, bin_ns):
+    # Average every run of rows into one bin (NaN values are left out), as
+    # (bin start stamps, means).
+    present = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(present, values, 0.0), starts, axis=0)
+    counts = np.add.reduceat(present, starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    return bins[starts] * bin_ns, means
+
+
+class ProfileAccumulator:
+    # Running per-(season, bin, column) statistics and mid-month days of a
+    # stream of (stamps, values) blocks.
+    #
+    # columns:     names of the value columns, in order
+    # seasons:     {season name: months} to build profiles for
+    # months:      target months of the mid-month days
+    # day:         day of the month of the mid-month days
+    # bin_minutes: width of the bins of the day (60: hourly)
+    # sketch:      QuantileSketch of the seasons, or None
+
+    def __init__(self, columns, seasons=None, months=None, day=15, bin_minutes=DEFAULT_BIN_MINUTES, sketch=False):
+        self.columns = list(columns)
+        self.seasons = dict(seasons or {})
+        self.months = list(months or [])
+        self.day = day
+        self.bin_minutes = bin_minutes
+        self.slots = day_slots(bin_minutes)
+
+        shape = (len(self.seasons), self.slots, len(self.columns))
+        self.counts = np.zeros(shape, dtype=np.int64)
+        self.sums = np.zeros(shape)
+        self.squares = np.zeros(shape)
+        self.minimum = np.full(shape, np.inf)
+        self.maximum = np.full(shape, -np.inf)
+        # membership[season, month] tells whether a calendar month (1-12)
+        # belongs to a season.
+        self.membership = np.zeros((len(self.seasons), 13), dtype=bool)
+        for number, season_months in enumerate(self.seasons.values()):
+            self.membership[number, list(season_months)] = True
+
+        self.days = np.full((len(self.months), self.slots, len(self.columns)), np.nan)
+        self.filled = np.zeros(len(self.months), dtype=np.int64)
+        self.sketch = QuantileSketch(self.seasons, self.columns, bin_minutes) if sketch else None
+
+    def add(self, stamps, values):
+        # Add a block of rows: int64 nanosecond 'stamps' and a (rows, columns)
+        # float array.
+        if len(stamps) == 0:
+            return
+        dates = stamps.astype("datetime64[ns]")
+        month_starts = dates.astype("datetime64[M]")
+        months = month_starts.astype(np.int64) % 12 + 1
+        days = (dates.astype("datetime64[D]") - month_starts).astype(np.int64) + 1
+        slots = (stamps % DAY_NS) // (self.bin_minutes * MINUTE_NS)
+        present = ~np.isnan(values)
+        filled = np.where(present, values, 0.0)
+
+        for season in range(len(self.seasons)):
+            rows = self.membership[season, months]
+            if not rows.any():
+                continue
+            season_slots, season_values = slots[rows], values[rows]
+            season_present, season_filled = present[rows], filled[rows]
+            for number in range(len(self.columns)):
+                self.counts[season, :, number] += np.bincount(season_slots[season_present[:, number]], minlength=self.slots)
+                self.sums[season, :, number] += np.bincount(season_slots, season_filled[:, number], self.slots)
+                self.squares[season, :, number] += np.bincount(season_slots, season_filled[:, number] ** 2, self.slots)
+            # fmin/fmax skip NaN values.
+            np.fmin.at(self.minimum[season], season_slots, season_values)
+            np.fmax.at(self.maximum[season], season_slots, season_values)
+        if self.sketch is not None:
+            self.sketch.add(stamps, values)
+
+        # Mid-month days: the first rows of the target day, in file order, as
+        # RES_main_1's month/day filter took them.
+        for number, month in enumerate(self.months):
+            missing = self.slots - self.filled[number]
+            if missing <= 0:
+                continue
+            rows = np.flatnonzero((months == month) & (days == self.day))[:missing]
+            start = self.filled[number]
+            self.days[number, start:start + len(rows)] = values[rows]
+            self.filled[number] += len(rows)
+
+    def profiles(self, stat="mean"):
+        # {season: (bins, columns) array} of one of STATISTICS.
+        if stat not in STATISTICS:
+            raise ValueError(f"The chunked aggregation cannot compute {stat!r}, expected one of {STATISTICS}.")
+        counts = self.counts
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.sums / counts
+            if stat == "mean":
+                result = mean
+            elif stat == "std":
+                # Sample standard deviation, like pandas' default.
+                result = np.sqrt(np.maximum(self.squares - counts * mean * mean, 0.0) / (counts - 1))
+                result[counts < 2] = np.nan
+            else:
+                result = (self.minimum if stat == "min" else self.maximum).copy()
+        result[counts == 0] = np.nan
+        return dict(zip(self.seasons, result))
+
+    def mid_month_sheets(self, target_columns, target_months):
+        # Same sheets as RES_extract.mid_month_sheets.
+        return month_sheets(self.days, self.filled, self.columns, target_columns, target_months, self.bin_minutes)
+
+    def seasonal_sheets(self, target_columns, stat="mean"):
+        # Same sheets as RES_profiles.seasonal_sheets.
+        return profile_sheets(self.profiles(stat), self.columns, target_columns, self.bin_minutes)
+
+    def distribution_sheets(self, target_columns, quantiles):
+        # The percentile and maximum sheets of every season (see RES_sketch).
+        return distribution_sheets(self.sketch, target_columns, quantiles)
+
+
+def aggregate_file(
+    path, target_columns, seasons=None, months=None, day=15, bin_minutes=DEFAULT_BIN_MINUTES,
+    chunk_rows=CHUNK_ROWS, time_column="Time", balance=None, sketch=False, battery=None,
+):
+    # Run one workbook through a ProfileAccumulator block by block. Missing
+    # columns are reported and left out; derived columns are computed block
+    # by block. The same blocks also feed 'balance' (an RES_kpi.EnergyBalance)
+    # when one is given, the accumulator's QuantileSketch with 'sketch' and
+    # 'battery' (an RES_battery.BatteryCycles) when one is given.
+    columns = list(target_columns) + (KPI_COLUMNS if balance is not None else [])
+    columns += BATTERY_COLUMNS if battery is not None else []
+    header, chunks = cached_chunks(path, raw_columns(columns), chunk_rows, time_column)
+    found = [orig_col for orig_col in target_columns if is_available(orig_col, header)]
+    for orig_col in target_columns:
+        if orig_col not in found:
+            print(f"The {orig_col} column is not found.")
+    wanted = (kpi_columns(header) if balance is not None else []) + (battery_columns(header) if battery is not None else [])
+    extra = [column for column in dict.fromkeys(wanted) if column not in found]
+    chunks = derive_chunks(chunks, found + extra)
+
+    accumulator = ProfileAccumulator(found, seasons, months, day, bin_minutes, sketch)
+    for stamps, values in binned_chunks(chunks, found + extra, bin_minutes, time_column):
+        accumulator.add(stamps, values[:, :len(found)])
+        if balance is not None:
+            balance.add(stamps, dict(zip(found + extra, values.T)))
+        if battery is not None:
+            battery.add(stamps, dict(zip(found + extra, values.T)))
+    return accumulator
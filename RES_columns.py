@@ -0,0 +1,161 @@
+import difflib
+import re
+import unicodedata
+
+# Resolution of requested column names against the header of a HOMER export.
+#
+# The column mappings name columns the way one HOMER model calls them
+# ('Generic 3 kW Power Output', 'Generic 1kWh Lead Acid Input Power'), but a
+# model with other components names the same quantity after its own
+# components ('Bergey Excel 10 Power Output', 'Generic 1kWh Li-Ion Input
+# Power'), and exports differ in case, spacing and punctuation. A ColumnIndex
+# is built once per file (and kept in its cache entry, see RES_cache): it maps
+# the normalized name and the role (PV output, wind output, battery input,
+# grid purchases...) of every column to its position, so a requested column
+# is resolved with dictionary lookups, in this order:
+#   1. its exact name;
+#   2. its normalized name;
+#   3. its role, when exactly one column of the file has that role;
+#   4. for names without a role, the closest normalized name (a difflib
+#      ratio of at least FUZZY_CUTOFF) that has the same words: as many of
+#      them, and each one the same or a misspelling of it (same_words).
+# A name with a role is never matched by spelling alone, so 'Grid Sales'
+# cannot end up reading 'Grid Purchases', and a fuzzy match only forgives
+# typos, so 'DC Operating Capacity' never reads 'AC Operating Capacity' nor
+# 'Total Electrical Load' the 'Total Electrical Load Served'. Every column
+# not read under its own name is reported.
+
+FUZZY_CUTOFF = 0.85
+
+# Words shorter than this, or with digits, have to match exactly ('ac' and
+# 'dc', '3kw' and '10kw').
+FUZZY_MIN_WORD = 4
+
+# Component words of batteries and wind turbines in (normalized) HOMER names.
+# HOMER's own generic turbines are named 'Generic <N> kW' with nothing else,
+# so a bare rating only counts as a wind turbine in that exact form; gensets,
+# hydro plants, converters and the like are rated in kW too and never count.
+BATTERY = r"(?:batter|lead acid|li ion|lithium|nicd|\d+kwh\b)"
+WIND = r"(?:wind|turbine|\bwt\b|bergey|enercon|vestas)"
+GENERIC_WIND = r"generic \d+kw power output$"
+NOT_OTHER_SOURCE = (
+    r"^(?!.*\b(?:genset|generator|diesel|hydro|converter|inverter|rectifier|electrolyzer|fuel cell|boiler|pv)\b)"
+)
+NOT_MAXIMUM = r"^(?!.*\bmaximum\b).*"
+
+# (role, pattern of normalized names); the first matching role wins.
+ROLES = (
+    ("pv output", re.compile(r"\bpv\b.*\bpower output$")),
+    ("wind output", re.compile(NOT_OTHER_SOURCE + r"(?:.*" + WIND + r".*\bpower output$|" + GENERIC_WIND + ")")),
+    ("battery input", re.compile(BATTERY + r".*\binput power$")),
+    ("battery charge", re.compile(NOT_MAXIMUM + BATTERY + r".*\bcharge power$")),
+    ("battery discharge", re.compile(NOT_MAXIMUM + BATTERY + r".*\bdischarge power$")),
+    ("battery energy content", re.compile(BATTERY + r".*\benergy content$")),
+    ("battery state of charge", re.compile(BATTERY + r".*\bstate of charge$")),
+    ("grid purchases", re.compile(r"^grid (?:purchases?|power purchased|energy purchased)$")),
+    ("grid sales", re.compile(r"^grid (?:sales?|power sold|energy sold)$")),
+)
+
+
+def normalize(name):
+    # Lower-case name without units in brackets, punctuation or repeated
+    # spaces, with numbers joined to their unit ('1 kWh' and '1kWh' are the
+    # same).
+    text = unicodedata.normalize("NFKC", str(name)).casefold()
+    text = re.sub(r"\([^)]*\)|\[[^\]]*\]", " ", text)
+    text = re.sub(r"[\W_]+", " ", text)
+    text = re.sub(r"(\d) (?=[km]?wh?\b)", r"\1", text)
+    return " ".join(text.split())
+
+
+def column_role(key):
+    # Role of a normalized name, or None.
+    for role, pattern in ROLES:
+        if pattern.search(key):
+            return role
+    return None
+
+
+def same_words(key, other):
+    # Whether two normalized names have the same words, each spelled alike:
+    # equal, or both long plain words with a difflib ratio of at least
+    # FUZZY_CUTOFF ('electrcal' for 'electrical', not 'charge' for
+    # 'discharge' or 'input' for 'output').
+    words, others = key.split(), other.split()
+    if len(words) != len(others):
+        return False
+    for word, other_word in zip(words, others):
+        if word == other_word:
+            continue
+        if min(len(word), len(other_word)) < FUZZY_MIN_WORD or not (word + other_word).isalpha():
+            return False
+        if difflib.SequenceMatcher(None, word, other_word).ratio() < FUZZY_CUTOFF:
+            return False
+    return True
+
+
+class ColumnIndex:
+    # names:      the header, in sheet order
+    # exact:      {name: position}
+    # normalized: {normalized name: position}
+    # roles:      {role: positions of the columns with that role}
+
+    def __init__(self, names, normalized=None, roles=None):
+        self.names = list(names)
+        self.exact = {}
+        for position, name in enumerate(self.names):
+            self.exact.setdefault(name, position)
+        if normalized is None:
+            normalized, roles = {}, {}
+            for position, name in enumerate(self.names):
+                key = normalize(name)
+                normalized.setdefault(key, position)
+                role = column_role(key)
+                if role is not None:
+                    roles.setdefault(role, []).append(position)
+        self.normalized = normalized
+        self.roles = roles
+
+    def to_json(self):
+        return {"normalized": self.normalized, "roles": self.roles}
+
+    @classmethod
+    def from_json(cls, names, data):
+        # The index of a header, as stored by to_json().
+        return cls(names, data["normalized"], data["roles"])
+
+    def find(self, name):
+        # (position, match) of a requested column, match being 'exact',
+        # 'normalized', 'role' or 'fuzzy'; position is None ('missing' or
+        # 'ambiguous') when the column cannot be resolved.
+        if name in self.exact:
+            return self.exact[name], "exact"
+        key = normalize(name)
+        if key in self.normalized:
+            return self.normalized[key], "normalized"
+        role = column_role(key)
+        if role is not None:
+            positions = self.roles.get(role, [])
+            if len(positions) == 1:
+                return positions[0], "role"
+            return None, "ambiguous" if positions else "missing"
+        for close in difflib.get_close_matches(key, self.normalized, n=3, cutoff=FUZZY_CUTOFF):
+            if same_words(key, close):
+                return self.normalized[close], "fuzzy"
+        return None, "missing"
+
+    def resolve(self, names):
+        # Returns ({requested name: header name}, notes) for the requested
+        # columns found in the file; the notes say which columns were found
+        # under another name or match several columns.
+        found, notes = {}, []
+        for name in dict.fromkeys(names):
+            position, match = self.find(name)
+            if position is not None:
+                found[name] = self.names[position]
+                if match in ("role", "fuzzy"):
+                    notes.append(f"The {name} column is read from the {found[name]} column.")
+            elif match == "ambiguous":
+                candidates = ", ".join(self.names[number] for number in self.roles[column_role(normalize(name))])
+                notes.append(f"The {name} column matches several columns ({candidates}).")
+        return found, notes
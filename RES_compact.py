@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from RES_cache import load_cached
+from RES_extract import regular_step
+from RES_resample import frame_stamps
+
+# Memory-compact representation of a loaded HOMER export.
+#
+# The loaders return float64 columns and a datetime64 'Time' index, which is
+# more than kW values with three decimals need. A compact frame picks a
+# schema per column instead:
+#   percent columns ('%' in the units row, e.g. 'State of Charge') whose
+#   values all lie in 0-100:  uint8, rounded to whole percent;
+#   every other column:       float32.
+# A fixed-step time axis is replaced by a RangeIndex of step numbers (no
+# memory at all); its origin and step are kept in df.attrs, and the stages of
+# the pipeline read the times from them (RES_resample.frame_stamps) and the
+# columns in their compact dtype, converting one block or column at a time,
+# so the whole frame never exists as float64. time_index() rebuilds the
+# datetimes for other uses. Irregular time axes keep their DatetimeIndex.
+# Percent columns a stage needs unrounded (the state of charge of the KPI
+# sheet and the battery analytics) can be kept as float32.
+
+PERCENT_UNITS = ("%",)
+
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+
+def column_dtype(values, unit=None, exact=False):
+    # The compact dtype of one float64 column; 'exact' columns are never
+    # rounded to whole percent. Only the range is looked at, so the column is
+    # never copied.
+    missing = np.isnan(values)
+    low, high = (0.0, 0.0) if missing.all() else (np.nanmin(values), np.nanmax(values))
+    if unit in PERCENT_UNITS and not exact and not missing.any() and low >= 0 and high <= 100:
+        return np.dtype(np.uint8)
+    if max(-low, high) > FLOAT32_MAX:
+        return np.dtype(np.float64)
+    return np.dtype(np.float32)
+
+
+def compact_frame(df, units=None, exact=()):
+    # A compact copy of a frame indexed by 'Time' (see above); the columns
+    # named in 'exact' stay float32 even if they are percent columns.
+    units = df.attrs.get("units", {}) if units is None else units
+    columns = {}
+    for name in df.columns:
+        values = df[name].to_numpy(dtype=np.float64)
+        dtype = column_dtype(values, units.get(name), name in exact)
+        columns[name] = np.rint(values).astype(dtype) if dtype == np.uint8 else values.astype(dtype)
+
+    attrs = {"units": dict(units)}
+    index = df.index
+    if isinstance(index, pd.DatetimeIndex) and not index.hasnans:
+        stamps = index.as_unit("ns").asi8
+        step = regular_step(stamps)
+        if step is not None:
+            attrs.update(time_origin=int(stamps[0]), time_step=step, time_name=index.name or "Time")
+            index = pd.RangeIndex(len(stamps), name="Step")
+    compact = pd.DataFrame(columns, index=index, copy=False)
+    compact.attrs.update(attrs)
+    return compact
+
+
+def time_index(df):
+    # The DatetimeIndex of a frame, rebuilt from the step numbers of a
+    # compact frame.
+    if "time_step" not in df.attrs or isinstance(df.index, pd.DatetimeIndex):
+        return df.index
+    return pd.DatetimeIndex(frame_stamps(df).astype("datetime64[ns]"), name=df.attrs["time_name"])
+
+
+def with_time_index(df):
+    # The frame indexed by its datetimes again (values are not copied).
+    if isinstance(df.index, pd.DatetimeIndex):
+        return df
+    expanded = df.set_axis(time_index(df), axis=0)
+    expanded.attrs = dict(df.attrs)
+    return expanded
+
+
+def load_compact(path, columns=None):
+    # Load a workbook (through the cache) straight into a compact frame.
+    return compact_frame(load_cached(path, columns))
+
+
+def memory_bytes(df):
+    # Bytes held by the columns and the index of a frame.
+    return int(df.memory_usage(index=True, deep=True).sum())
@@ -0,0 +1,229 @@
+import argparse
+import os
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from RES_pipeline import manifest_scenarios, process_scenario
+from RES_writer import write_workbook
+
+# Cross-scenario comparison of the result sheets of a manifest.
+#
+# The 24-row sheets of every scenario (P11-P16: PV-only, wind-only, hybrid,
+# grid-connected...) are computed once each and stacked into one aligned
+# (scenario, period, hour, column) array, the columns being the union of the
+# output labels of all scenarios (NaN where a scenario has no such column).
+# Deltas, ratios and rankings against a baseline scenario are then plain
+# array operations over the scenario axis, so hundreds of scenarios cost one
+# load each. The summary workbook holds:
+#   "Totals": the daily total of every period and column (sum of the hourly
+#             values, i.e. kWh per day for a kW column), one row per scenario;
+#   "Delta", "Ratio": the totals minus / divided by the baseline's;
+#   "Rank":   the rank of every scenario per period and column (1 = largest);
+#   one "Δ <period>" sheet per period with the hourly deltas.
+#
+#   python RES_compare.py RES_main_1.json --baseline 11 --output Comparison.xlsx
+
+
+class ScenarioStore:
+    # values:    float array of shape (scenarios, periods, hours, columns)
+    # scenarios: scenario names along the first axis
+    # periods:   month/season names along the second axis
+    # hours:     'Hour' labels along the third axis
+    # columns:   output labels along the last axis
+
+    def __init__(self, values, scenarios, periods, hours, columns):
+        self.values = values
+        self.scenarios = list(scenarios)
+        self.periods = list(periods)
+        self.hours = list(hours)
+        self.columns = list(columns)
+
+    @classmethod
+    def from_results(cls, results):
+        # Build the store from {scenario: {period: result DataFrame}}; sheets
+        # that are not hour-of-day profiles (KPI, Days) are left out. Every
+        # sheet has to have the same hours (the same bins).
+        results = {
+            name: {period: df for period, df in sheets.items() if df.index.name == "Hour"} for name, sheets in results.items()
+        }
+        scenarios = list(results)
+        periods = list(dict.fromkeys(period for sheets in results.values() for period in sheets))
+        columns = list(dict.fromkeys(column for sheets in results.values() for df in sheets.values() for column in df.columns))
+        hours = next((list(df.index) for sheets in results.values() for df in sheets.values()), [])
+        for name, sheets in results.items():
+            for period, df in sheets.items():
+                if list(df.index) != hours:
+                    raise ValueError(
+                        f"The {period} sheet of scenario {name} has {len(df)} bins instead of {len(hours)};"
+                        " only scenarios with the same bins can be compared."
+                    )
+
+        values = np.full((len(scenarios), len(periods), len(hours), len(columns)), np.nan)
+        period_numbers = {period: number for number, period in enumerate(periods)}
+        column_numbers = {column: number for number, column in enumerate(columns)}
+        for scenario, sheets in enumerate(results.values()):
+            for period, df in sheets.items():
+                targets = [column_numbers[column] for column in df.columns]
+                values[scenario, period_numbers[period]][:, targets] = df.to_numpy(dtype=np.float64, na_value=np.nan)
+        return cls(values, scenarios, periods, hours, columns)
+
+    def scenario_number(self, name):
+        if name not in self.scenarios:
+            raise ValueError(f"The baseline scenario {name!r} is not one of {self.scenarios}.")
+        return self.scenarios.index(name)
+
+    def frame(self, values=None):
+        # Long DataFrame indexed by (scenario, period, hour).
+        values = self.values if values is None else values
+        index = pd.MultiIndex.from_product([self.scenarios, self.periods, self.hours], names=["Scenario", "Period", "Hour"])
+        return pd.DataFrame(values.reshape(-1, len(self.columns)), index=index, columns=self.columns)
+
+    def totals(self):
+        # (scenarios, periods, columns) daily totals; NaN where a scenario has
+        # no value for a column.
+        bin_hours = 24 / len(self.hours) if self.hours else 1.0
+        present = ~np.isnan(self.values)
+        totals = np.where(present, self.values, 0.0).sum(axis=2) * bin_hours
+        totals[~present.any(axis=2)] = np.nan
+        return totals
+
+    def deltas(self, baseline, values=None):
+        # Difference of every scenario to the baseline scenario.
+        values = self.values if values is None else values
+        return values - values[self.scenario_number(baseline)]
+
+    def ratios(self, baseline, values=None):
+        # Ratio of every scenario to the baseline scenario (NaN where the
+        # baseline is zero).
+        values = self.values if values is None else values
+        reference = values[self.scenario_number(baseline)]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(reference != 0, values / reference, np.nan)
+
+    def ranks(self, values):
+        # Rank of every scenario along the first axis, 1 for the largest
+        # value; scenarios without a value get NaN.
+        flat = pd.DataFrame(values.reshape(len(self.scenarios), -1))
+        return flat.rank(axis=0, ascending=False, method="min").to_numpy().reshape(values.shape)
+
+    def table(self, values):
+        # A (scenarios, periods, columns) array as one sheet: a row per
+        # scenario and a '<period> <column>' column per period and column.
+        names = [f"{period} {column}" for period in self.periods for column in self.columns]
+        table = pd.DataFrame(values.reshape(len(self.scenarios), -1), index=self.scenarios, columns=names)
+        table.index.name = "Scenario"
+        return table.dropna(axis=1, how="all")
+
+    def hourly_table(self, values, period):
+        # The hourly values of one period: a row per hour and a
+        # '<scenario> <column>' column per scenario and column.
+        number = self.periods.index(period)
+        block = values[:, number].transpose(1, 0, 2).reshape(len(self.hours), -1)
+        names = [f"{scenario} {column}" for scenario in self.scenarios for column in self.columns]
+        table = pd.DataFrame(block, index=self.hours, columns=names)
+        table.index.name = "Hour"
+        return table.dropna(axis=1, how="all")
+
+    def summary(self, baseline):
+        # The sheets of the comparison workbook, in order.
+        totals = self.totals()
+        sheets = {
+            "Totals": self.table(totals),
+            "Delta": self.table(self.deltas(baseline, totals)),
+            "Ratio": self.table(self.ratios(baseline, totals)),
+            "Rank": self.table(self.ranks(totals)),
+        }
+        hourly = self.deltas(baseline)
+        for period in self.periods:
+            sheets[f"Δ {period}"] = self.hourly_table(hourly, period)
+        return sheets
+
+
+def collect_results(scenarios, workers=1):
+    # Compute the result sheets of every scenario once; missing or broken
+    # workbooks are reported and left out.
+    present = []
+    for scenario in scenarios:
+        if os.path.exists(scenario["input"]):
+            present.append(scenario)
+        else:
+            print(f"The {os.path.relpath(scenario['input'])} file is not found.")
+
+    def report(scenario, error):
+        print(f"The {os.path.relpath(scenario['input'])} file could not be processed: {error}")
+
+    # Scenarios are kept in manifest order, whichever finishes first.
+    results = {}
+    if workers > 1 and len(present) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(present))) as pool:
+            futures = [(scenario, pool.submit(process_scenario, scenario)) for scenario in present]
+            for scenario, future in futures:
+                try:
+                    results[scenario["name"]] = future.result()
+                except (OSError, ValueError, KeyError, zipfile.BadZipFile) as error:
+                    report(scenario, error)
+                except Exception as error:
+                    # Anything else (e.g. a malformed export pandas chokes on)
+                    # is reported too and the scenario left out.
+                    report(scenario, f"{type(error).__name__}: {error}")
+    else:
+        for scenario in present:
+            try:
+                results[scenario["name"]] = process_scenario(scenario)
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile) as error:
+                report(scenario, error)
+            except Exception as error:
+                report(scenario, f"{type(error).__name__}: {error}")
+    return results
+
+
+def compare_manifest(path, baseline=None, output=None, only=None, workers=1):
+    # Compare the scenarios of a manifest and write the summary workbook;
+    # the first scenario is the baseline unless another one is named.
+    manifest, scenarios = manifest_scenarios(path, only)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    # Only the hour-of-day sheets are compared.
+    for scenario in scenarios:
+        scenario["kpi"] = scenario["battery"] = False
+    results = collect_results(scenarios, workers)
+    if not results:
+        raise ValueError("No scenario could be processed.")
+
+    store = ScenarioStore.from_results(results)
+    baseline = baseline or store.scenarios[0]
+    output = output or os.path.join(base_dir, manifest.get("comparison_output", "Comparison.xlsx"))
+    write_workbook(store.summary(baseline).items(), output)
+    print(f"✅{os.path.relpath(output)} (baseline {baseline})")
+    return store
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Compare the scenarios of a manifest against a baseline scenario.")
+    parser.add_argument("manifest", help="scenario manifest (.json, .toml or .yaml)")
+    parser.add_argument("--baseline", metavar="NAME", help="baseline scenario (default: the first one)")
+    parser.add_argument("--output", metavar="PATH", help="summary workbook (default: Comparison.xlsx next to the manifest)")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="compare only the named scenarios")
+    parser.add_argument(
+        "-j", "--workers", type=int, default=1,
+        help="number of worker processes (0 = one per CPU core, default 1)",
+    )
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    workers = args.workers if args.workers > 0 else os.cpu_count() or 1
+    try:
+        compare_manifest(args.manifest, args.baseline, args.output, args.only, workers)
+    except ValueError as error:
+        print(error)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
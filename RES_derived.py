@@ -0,0 +1,184 @@
+import numpy as np
+
+# Derived HOMER quantities, computed on demand.
+#
+# A derived column is declared once, with the columns it is computed from and
+# a vectorized NumPy function of them. A scenario asks for derived columns in
+# its column mapping exactly like for raw HOMER columns, e.g.
+#   "columns": {"Net Load": "بار خالص", "Renewable Fraction": "سهم تجدیدپذیر"}
+# Only the raw columns they need are loaded, only the requested columns (and
+# what they depend on) are computed, and every column is computed at most
+# once per file, so related metrics share their intermediates ('Renewable
+# Output' is computed once for 'Net Load', 'Self-Consumption Ratio' and
+# 'Renewable Fraction').
+
+PV_OUTPUT = "Generic flat plate PV Power Output"
+WIND_OUTPUT = "Generic 3 kW Power Output"
+TOTAL_RENEWABLE = "Total Renewable Power Output"
+BATTERY_INPUT = "Generic 1kWh Lead Acid Input Power"
+LOAD_SERVED = "Total Electrical Load Served"
+EXCESS = "Excess Electrical Production"
+GRID_SALES = "Grid Sales"
+
+
+class DerivedColumn:
+    # name:     the name the column is requested under
+    # inputs:   columns (raw or derived) the function needs, in order
+    # function: vectorized function of the input arrays
+    # optional: further columns, passed after the inputs, or as None when the
+    #           file does not have them; a column without inputs needs at
+    #           least one of them
+
+    def __init__(self, name, inputs, function, optional=()):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.function = function
+        self.optional = tuple(optional)
+
+
+# Every derived column, by name.
+DERIVED = {}
+
+
+def derived(name, inputs=(), optional=()):
+    # Decorator declaring a function as the derived column 'name'.
+    def register(function):
+        DERIVED[name] = DerivedColumn(name, inputs, function, optional)
+        return function
+
+    return register
+
+
+@derived("Renewable Output", optional=(TOTAL_RENEWABLE, PV_OUTPUT, WIND_OUTPUT))
+def renewable_output(total, pv, wind):
+    # HOMER's own total when it is exported, else PV plus wind output.
+    if total is not None:
+        return total
+    return sum(part for part in (pv, wind) if part is not None)
+
+
+@derived("Net Load", (LOAD_SERVED, "Renewable Output"))
+def net_load(load, renewable):
+    # Load left over after the renewable output (negative when there is a
+    # surplus).
+    return load - renewable
+
+
+@derived("Battery Charge Power", (BATTERY_INPUT,))
+def battery_charge(battery_input):
+    # HOMER's battery input power is positive while charging.
+    return np.maximum(battery_input, 0.0)
+
+
+@derived("Battery Discharge Power", (BATTERY_INPUT,))
+def battery_discharge(battery_input):
+    return np.maximum(-battery_input, 0.0)
+
+
+@derived("Self-Consumed Renewable", ("Renewable Output", EXCESS), optional=(GRID_SALES,))
+def self_consumed(renewable, excess, grid_sales):
+    # Renewable output that was neither dumped nor sold to the grid.
+    used = renewable - excess
+    if grid_sales is not None:
+        used = used - grid_sales
+    return np.maximum(used, 0.0)
+
+
+@derived("Self-Consumption Ratio", ("Self-Consumed Renewable", "Renewable Output"))
+def self_consumption_ratio(used, renewable):
+    # Share of the renewable output used on site; NaN without output.
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(renewable > 0, used / renewable, np.nan)
+
+
+@derived("Renewable Fraction", ("Self-Consumed Renewable", LOAD_SERVED))
+def renewable_fraction(used, load):
+    # Share of the served load covered by renewable output; NaN without load.
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(load > 0, np.minimum(used, load) / load, np.nan)
+
+
+def is_available(name, columns):
+    # Whether a column is a raw column of 'columns' or a derived column that
+    # can be computed from them.
+    if name in columns:
+        return True
+    spec = DERIVED.get(name)
+    if spec is None:
+        return False
+    if not all(is_available(column, columns) for column in spec.inputs):
+        return False
+    return bool(spec.inputs) or any(is_available(column, columns) for column in spec.optional)
+
+
+def raw_columns(names):
+    # The raw columns to load for the requested (raw or derived) columns.
+    needed = {}
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name in DERIVED:
+            pending.extend(DERIVED[name].inputs + DERIVED[name].optional)
+        else:
+            needed[name] = True
+    return list(needed)
+
+
+def frame_inputs(df, names):
+    # The columns of a frame that the requested (raw or derived) columns are
+    # read or computed from.
+    return [name for name in dict.fromkeys(list(names) + raw_columns(names)) if name in df.columns]
+
+
+class ColumnEngine:
+    # Raw and derived columns of one file, each computed at most once.
+    # 'raw' is anything that maps raw column names to arrays (a DataFrame or
+    # a block of rows from RES_reader / RES_chunked).
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.names = set(raw.keys())
+        self.values = {}
+
+    def has(self, name):
+        return is_available(name, self.names)
+
+    def column(self, name):
+        # The values of a column, computing it (and its inputs) if needed.
+        if name not in self.values:
+            if name in self.names:
+                # float32 (compact) columns stay float32; whole-percent
+                # uint8 columns become float32 too, to hold NaN.
+                values = np.asarray(self.raw[name])
+                self.values[name] = values.astype(np.result_type(values.dtype, np.float32), copy=False)
+            else:
+                spec = DERIVED[name]
+                arguments = [self.column(column) for column in spec.inputs]
+                arguments += [self.column(column) if self.has(column) else None for column in spec.optional]
+                self.values[name] = spec.function(*arguments)
+        return self.values[name]
+
+    def derived(self, names):
+        # {name: values} of the requested derived columns that are not raw
+        # columns and can be computed.
+        return {name: self.column(name) for name in names if name not in self.names and name in DERIVED and self.has(name)}
+
+
+def with_derived(df, names):
+    # The frame plus the requested derived columns that can be computed from
+    # it (the frame itself when none is requested); the columns of the frame
+    # are not copied.
+    extra = ColumnEngine(df).derived(names)
+    if not extra:
+        return df
+    df = df.copy(deep=False)
+    for name, values in extra.items():
+        df[name] = values
+    return df
+
+
+def derive_chunks(chunks, names):
+    # Add the requested derived columns to every {name: array} block.
+    for chunk in chunks:
+        extra = ColumnEngine(chunk).derived(names)
+        yield {**chunk, **extra} if extra else chunk
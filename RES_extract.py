@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+from RES_resample import DEFAULT_BIN_MINUTES, day_slots, frame_stamps, slot_labels
+
+# Single-pass extraction of the mid-month days used by RES_main_1.
+#
+# Instead of filtering the whole DataFrame with a month/day boolean mask for
+# every (month, column) pair, the row positions of all target days are
+# worked out once per file and every requested column is gathered for every
+# target day with one fancy-index into a 2-D array.
+
+HOURS = 24
+
+
+def regular_step(stamps):
+    # Return the constant timestep of an int64 nanosecond time axis, or None
+    # when it has gaps, repeats or is not sorted (the arithmetic path needs a
+    # fixed grid).
+    if len(stamps) < 2:
+        return None
+    step = stamps[1] - stamps[0]
+    if step <= 0 or not np.all(np.diff(stamps) == step):
+        return None
+    return int(step)
+
+
+def first_day_start(start, month, day):
+    # Midnight of the first (month, day) date whose day is not over before
+    # 'start', i.e. the date the old month/day mask would have found first.
+    for year in (start.year, start.year + 1):
+        try:
+            candidate = pd.Timestamp(year=year, month=month, day=day)
+        except ValueError:
+            continue
+        if candidate + pd.Timedelta(days=1) > start:
+            return candidate
+    return None
+
+
+def day_positions(stamps, months, day=15, hours=HOURS):
+    # Row positions of the first 'hours' rows of the given day in each month
+    # of an int64 nanosecond time axis, as a (len(months), hours) array where
+    # -1 marks a missing row.
+    positions = np.full((len(months), hours), -1, dtype=np.int64)
+    if len(stamps) == 0:
+        return positions
+
+    step = regular_step(stamps)
+    if step is not None:
+        # Fixed-step data: the position of a timestamp is pure arithmetic.
+        one_day = pd.Timedelta(days=1).value
+        for row, month in enumerate(months):
+            midnight = first_day_start(pd.Timestamp(stamps[0]), month, day)
+            if midnight is None:
+                continue
+            offset = midnight.value - stamps[0]
+            begin = max(0, -(-offset // step))
+            end = min(len(stamps), -(-(offset + one_day) // step))
+            count = min(hours, max(0, end - begin))
+            positions[row, :count] = np.arange(begin, begin + count)
+        return positions
+
+    # Irregular index: compute the calendar fields once and look each day up.
+    index = pd.DatetimeIndex(stamps.astype("datetime64[ns]"))
+    index_months = index.month.to_numpy()
+    index_days = index.day.to_numpy()
+    for row, month in enumerate(months):
+        found = np.flatnonzero((index_months == month) & (index_days == day))[:hours]
+        positions[row, :len(found)] = found
+    return positions
+
+
+def gather(values, positions):
+    # Fancy-index a (rows, columns) array with a (days, hours) position array,
+    # giving a float64 (days, hours, columns) block with NaN where a row is
+    # missing.
+    if len(values) == 0:
+        return np.full(positions.shape + values.shape[1:], np.nan)
+    block = values[np.where(positions < 0, 0, positions)].astype(np.float64)
+    block[positions < 0] = np.nan
+    return block
+
+
+def mid_month_sheets(df, target_columns, target_months, day=15, bin_minutes=DEFAULT_BIN_MINUTES):
+    # Build the 24-hour result sheet of every target month, exactly as the
+    # per-column loops of RES_main_1 did: one column per target column (under
+    # its new name), an 'Hour' index from 0 to 23, and None where a column is
+    # missing or the day has fewer than 24 values. With bins other than an
+    # hour (df already resampled to them) the sheet has one row per bin.
+    found = [orig_col for orig_col in target_columns if orig_col in df.columns]
+    for orig_col in target_columns:
+        if orig_col not in df.columns:
+            print(f"The {orig_col} column is not found.")
+
+    slots = day_slots(bin_minutes)
+    positions = day_positions(frame_stamps(df), list(target_months), day, slots)
+    # Only the rows of the target days are gathered (and made float64), one
+    # column at a time, so float32 (compact) columns are never converted.
+    block = np.empty(positions.shape + (len(found),))
+    for number, orig_col in enumerate(found):
+        block[:, :, number] = gather(df[orig_col].to_numpy(), positions)
+    counts = (positions >= 0).sum(axis=1)
+    return month_sheets(block, counts, found, target_columns, target_months, bin_minutes)
+
+
+def month_sheets(block, counts, found, target_columns, target_months, bin_minutes=DEFAULT_BIN_MINUTES):
+    # Lay out the gathered (months, bins, found columns) block as one sheet
+    # per target month; 'counts' is the number of rows found for each month.
+    slots = day_slots(bin_minutes)
+    sheets = {}
+    for row, month_name in enumerate(target_months.values()):
+        result_df = pd.DataFrame(index=range(slots))
+        for orig_col, new_col in target_columns.items():
+            if orig_col not in found:
+                result_df[new_col] = [None] * slots
+            elif counts[row] < slots:
+                print(f"Just {counts[row]} values are available for {new_col} in {month_name}")
+                result_df[new_col] = [None] * slots
+            else:
+                result_df[new_col] = block[row, :, found.index(orig_col)]
+
+        result_df.index = slot_labels(bin_minutes)
+        result_df.index.name = "Hour"
+        sheets[month_name] = result_df
+    return sheets
@@ -0,0 +1,124 @@
+import glob
+import hashlib
+import os
+
+from RES_cache import file_digest
+
+# Dependency tracking for incremental runs.
+#
+# Every output records what it was built from: the input workbook (content
+# hash, plus size and mtime so unchanged files are not hashed again), the
+# column mapping, the month/season definition, the output format, whether it
+# has a KPI or Battery sheet or uses the compact schema and the version of
+# the pipeline code. On the next run an output is only rebuilt when one of
+# these changed, and the reasons are reported. When charts are asked for
+# (--plots), the record also lists the charts drawn from the output, and
+# it is rebuilt when they were drawn into another folder or one is gone.
+
+# Human-readable reason for each field of a record.
+REASONS = {
+    "input": "the input file changed",
+    "columns": "the column mapping changed",
+    "periods": "the month/season definition or the bins changed",
+    "format": "the output format changed",
+    "kpi": "the KPI sheet was turned on or off",
+    "battery": "the Battery sheet was turned on or off",
+    "compact": "the compact schema was turned on or off",
+    "code": "the code changed",
+}
+
+_code_version = None
+
+
+def code_version():
+    # Hash of the pipeline source files (RES_*.py next to this module), so
+    # any code change rebuilds the outputs it could affect.
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        folder = os.path.dirname(os.path.abspath(__file__))
+        for path in sorted(glob.glob(os.path.join(folder, "RES_*.py"))):
+            if os.path.basename(path).startswith("RES_main_"):
+                continue
+            with open(path, "rb") as handle:
+                digest.update(os.path.basename(path).encode("utf-8") + b"\0" + handle.read())
+        _code_version = digest.hexdigest()[:16]
+    return _code_version
+
+
+def input_fingerprint(path, previous=None):
+    # Size, mtime and content hash of an input workbook. The hash of the
+    # previous record is reused when size and mtime did not change.
+    stat = os.stat(path)
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+        sha256 = previous["sha256"]
+    else:
+        sha256 = file_digest(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+
+
+def scenario_periods(scenario):
+    # Only the part of the period definition the scenario's mode uses.
+    if scenario["mode"] == "mid_month":
+        periods = {"mode": "mid_month", "day": scenario["day"], "months": scenario["months"]}
+        # The KPI and Battery sheets have a column per season in every mode.
+        if scenario.get("kpi") or scenario.get("battery"):
+            periods["seasons"] = scenario["seasons"]
+    else:
+        periods = {"mode": scenario["mode"], "seasons": scenario["seasons"]}
+        if scenario["mode"] == "representative":
+            periods["typical_days"] = scenario.get("typical_days", 1)
+        elif scenario["mode"] == "distribution":
+            periods["quantiles"] = scenario.get("quantiles")
+    periods["bin_minutes"] = scenario.get("bin_minutes", 60)
+    # Month numbers become strings in JSON; store them that way already.
+    if "months" in periods:
+        periods["months"] = {str(month): name for month, name in periods["months"].items()}
+    return periods
+
+
+def scenario_record(scenario, fmt, previous=None):
+    # The dependency record of one scenario output.
+    previous_input = (previous or {}).get("input")
+    return {
+        "input": input_fingerprint(scenario["input"], previous_input),
+        "columns": scenario["columns"],
+        "periods": scenario_periods(scenario),
+        "format": fmt,
+        "kpi": scenario.get("kpi", False),
+        "battery": scenario.get("battery", False),
+        "compact": scenario.get("compact", False),
+        "code": code_version(),
+    }
+
+
+def chart_record(paths, plots):
+    # The charts drawn from an output into the plots folder.
+    return {
+        "dir": os.path.abspath(plots["dir"]),
+        "format": plots.get("format", "png"),
+        "files": [os.path.abspath(path) for path in paths],
+    }
+
+
+def missing_charts(previous, plots):
+    # Whether the charts asked for have to be drawn (again).
+    charts = (previous or {}).get("charts")
+    if not charts or charts["dir"] != os.path.abspath(plots["dir"]) or charts["format"] != plots.get("format", "png"):
+        return True
+    return not all(os.path.exists(path) for path in charts["files"])
+
+
+def stale_reasons(previous, record):
+    # Why an output has to be rebuilt; an empty list means it is up to date.
+    if not previous:
+        return ["there is no previous output"]
+    reasons = []
+    for field, reason in REASONS.items():
+        if field == "input":
+            changed = (previous.get("input") or {}).get("sha256") != record["input"]["sha256"]
+        else:
+            changed = previous.get(field) != record[field]
+        if changed:
+            reasons.append(reason)
+    return reasons
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+from RES_derived import EXCESS, GRID_SALES, LOAD_SERVED, ColumnEngine, frame_inputs, is_available
+from RES_resample import as_nanoseconds, detect_step, frame_blocks
+
+# Energy-balance KPIs of a scenario.
+#
+# The annual and seasonal energy totals of a HOMER export (energy delivered,
+# renewable production, grid purchases and sales, excess production, unmet
+# load, capacity shortage, battery charge/discharge) and the battery
+# throughput in full cycles (discharge throughput / capacity). Every total
+# comes out of one matrix product: the (periods x rows) 0/1 period matrix
+# times the (rows x quantities) power matrix, times the length of a timestep.
+# Totals are averaged per year, so a multi-year run gives the same kind of
+# figures as a one-year run. The result is written as a "KPI" sheet next to
+# the profile sheets (one row per KPI, one column per period).
+
+HOURS_PER_YEAR = 8760
+
+GRID_PURCHASES = "Grid Purchases"
+UNMET_LOAD = "Unmet Electrical Load"
+CAPACITY_SHORTAGE = "Capacity Shortage"
+ENERGY_CONTENT = "Generic 1kWh Lead Acid Energy Content"
+STATE_OF_CHARGE = "Generic 1kWh Lead Acid State of Charge"
+
+# (KPI label, power column it integrates).
+ENERGY_KPIS = (
+    ("Energy delivered (kWh)", LOAD_SERVED),
+    ("Renewable production (kWh)", "Renewable Output"),
+    ("Grid purchases (kWh)", GRID_PURCHASES),
+    ("Grid sales (kWh)", GRID_SALES),
+    ("Excess production (kWh)", EXCESS),
+    ("Unmet load (kWh)", UNMET_LOAD),
+    ("Capacity shortage (kWh)", CAPACITY_SHORTAGE),
+    ("Battery charge (kWh)", "Battery Charge Power"),
+    ("Battery throughput (kWh)", "Battery Discharge Power"),
+)
+CYCLES_KPI = "Throughput cycles"
+CAPACITY_KPI = "Battery capacity (kWh)"
+
+# Every column the KPIs are computed from.
+KPI_COLUMNS = [column for _, column in ENERGY_KPIS] + [ENERGY_CONTENT, STATE_OF_CHARGE]
+
+
+class EnergyBalance:
+    # Running per-period energy totals of a stream of blocks of rows.
+    #
+    # seasons:    {season name: months}; an "Annual" period covers every row
+    # step_hours: length of a timestep in hours (detected from the first
+    #             block when None)
+
+    def __init__(self, seasons, step_hours=None):
+        self.periods = ["Annual"] + list(seasons)
+        self.membership = np.zeros((len(self.periods), 13))
+        self.membership[0, 1:] = 1.0
+        for number, months in enumerate(seasons.values(), start=1):
+            self.membership[number, list(months)] = 1.0
+        self.step_hours = step_hours
+        self.energy = np.zeros((len(self.periods), len(ENERGY_KPIS)))
+        self.present = np.zeros(len(ENERGY_KPIS), dtype=bool)
+        self.rows = 0
+        self.capacity_sum = 0.0
+        self.capacity_count = 0
+
+    def add(self, stamps, columns):
+        # Add a block of rows: int64 nanosecond 'stamps' and a mapping of
+        # column names to arrays (raw or derived columns, see RES_derived).
+        stamps = as_nanoseconds(stamps)
+        if len(stamps) == 0:
+            return
+        if self.step_hours is None:
+            step = detect_step(stamps.astype("datetime64[ns]"))
+            self.step_hours = step / 60 if step else 1.0
+        self.rows += len(stamps)
+
+        engine = ColumnEngine(columns)
+        power = np.zeros((len(stamps), len(ENERGY_KPIS)))
+        for number, (_, column) in enumerate(ENERGY_KPIS):
+            if engine.has(column):
+                power[:, number] = np.nan_to_num(engine.column(column))
+                self.present[number] = True
+        months = stamps.astype("datetime64[ns]").astype("datetime64[M]").astype(np.int64) % 12 + 1
+        self.energy += (self.membership[:, months] @ power) * self.step_hours
+
+        # Nominal battery capacity: energy content over state of charge.
+        if engine.has(ENERGY_CONTENT) and engine.has(STATE_OF_CHARGE):
+            content = np.asarray(engine.column(ENERGY_CONTENT), dtype=np.float64)
+            charge = np.asarray(engine.column(STATE_OF_CHARGE), dtype=np.float64)
+            valid = (charge > 0) & ~np.isnan(content)
+            self.capacity_sum += float(np.sum(content[valid] / (charge[valid] / 100)))
+            self.capacity_count += int(valid.sum())
+
+    def years(self):
+        # Number of years the rows cover (one for a one-year hourly export).
+        if not self.rows:
+            return 1.0
+        return max(self.rows * self.step_hours / HOURS_PER_YEAR, 1e-9)
+
+    def result(self):
+        # The KPI sheet: one row per KPI, one column per period, totals per
+        # year; NaN for the quantities the file does not have.
+        energy = self.energy / self.years()
+        energy[:, ~self.present] = np.nan
+        table = pd.DataFrame(energy.T, index=[label for label, _ in ENERGY_KPIS], columns=self.periods)
+        capacity = self.capacity_sum / self.capacity_count if self.capacity_count else np.nan
+        throughput = table.loc["Battery throughput (kWh)"].to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            table.loc[CYCLES_KPI] = throughput / capacity
+        table.loc[CAPACITY_KPI] = capacity
+        table.index.name = "KPI"
+        return table
+
+
+def kpi_columns(header):
+    # The KPI columns that are (or can be derived from) the given columns.
+    return [column for column in KPI_COLUMNS if is_available(column, header)]
+
+
+def kpi_sheet(df, seasons):
+    # The KPI sheet of a frame indexed by 'Time' (or a compact frame), one
+    # block of rows at a time.
+    balance = EnergyBalance(seasons)
+    for stamps, columns in frame_blocks(df, frame_inputs(df, KPI_COLUMNS)):
+        balance.add(stamps, columns)
+    return balance.result()
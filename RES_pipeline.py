@@ -0,0 +1,481 @@
+import argparse
+import json
+import os
+import sys
+
+from RES_bins import DEFAULT_BIN_MINUTES, check_bin_minutes
+from RES_incremental import chart_record, missing_charts, scenario_record, stale_reasons
+from RES_plot import PLOT_FORMATS, chart_paths
+from RES_timing import EVENTS, scenario_context, stage, summary_table, take_events, write_trace
+from RES_writer import FORMATS, output_path, read_signature, save_signature, write_combined, write_result
+
+# Config-driven batch runner for HOMER scenario workbooks.
+#
+# A scenario manifest (JSON, TOML or YAML) lists the input workbooks, the
+# column mapping of each one (original HOMER name -> output label) and the
+# mode of the run:
+#   "mid_month": the 24 hours of one day (the 15th by default) of each
+#                target month, as RES_main_1 does;
+#   "seasonal":  the 24-hour mean profile of each season, as RES_main_2 does;
+#   "representative": the real day of each season closest to its mean
+#                profile, or "typical_days" (k) weighted k-medoid days of
+#                each season (see RES_typical);
+#   "distribution": the P10/P50/P90 ("quantiles") and maximum 24-hour
+#                profiles of each season, from mergeable quantile sketches
+#                filled in one streaming pass (see RES_sketch).
+# Every scenario then goes through the same load -> extract -> write steps.
+#
+# Manifest layout (JSON shown; relative paths are taken from the manifest's
+# directory):
+#   {
+#     "mode": "mid_month",
+#     "day": 15,
+#     "months": {"2": "February", "5": "May", ...},
+#     "seasons": {"Winter": [1, 2, 3], ...},
+#     "column_sets": {"pv": {"Generic flat plate PV Power Output": "...", ...}},
+#     "scenarios": [
+#       {"name": "11", "input": "RES_P11.xlsx", "output": "Result_P11.xlsx", "columns": "pv"}
+#     ]
+#   }
+# A scenario's "columns" is either a mapping or the name of a column set (the
+# keys may also name derived columns, see RES_derived), and
+# any of "mode", "day", "months" and "seasons" can be overridden per scenario.
+# "bin_minutes" (default 60) sets the bins of the result sheets: exports with
+# a finer timestep (1-, 5-, 15-minute...) are averaged into them first.
+# "chunked": true aggregates the workbook block by block in one pass instead
+# of loading it as a whole (see RES_chunked), for multi-year or multi-site
+# exports; only the mean/std/min/max statistics are available that way (the
+# "distribution" mode always runs this way).
+# "kpi": true adds a "KPI" sheet with the annual and seasonal energy totals
+# of the scenario (see RES_kpi). "battery": true adds a "Battery" sheet with
+# the rainflow cycle counts, depth-of-discharge histogram and throughput of
+# the battery (see RES_battery). "compact": true processes the workbook in
+# the compact float32/uint8 schema of RES_compact.
+# An optional top-level "format" picks the output backend (see RES_writer)
+# and "combined_output" names the workbook of the "combined" format.
+#
+# The scheduler starts one process per scenario, so this module only imports
+# what argument parsing and the up to date check need; NumPy, pandas and the
+# modules built on them are imported by the stages that use them (see
+# "python RES_bench.py --startup").
+
+MODES = ("mid_month", "seasonal", "representative", "distribution")
+
+DEFAULT_MONTHS = {2: "February", 5: "May", 8: "August", 11: "November"}
+
+DEFAULT_SEASONS = {
+    "Winter": [1, 2, 3],
+    "Spring": [4, 5, 6],
+    "Summer": [7, 8, 9],
+    "Autumn": [10, 11, 12],
+}
+
+DEFAULT_QUANTILES = [10, 50, 90]
+
+
+def load_manifest(path):
+    # Read a manifest file; the format is chosen from its extension.
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".toml":
+        import tomllib
+
+        with open(path, "rb") as handle:
+            return tomllib.load(handle)
+    if extension in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("Reading YAML manifests requires PyYAML (pip install pyyaml).") from None
+        with open(path, encoding="utf-8") as handle:
+            return yaml.safe_load(handle)
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def resolve_scenarios(manifest, base_dir="."):
+    # Expand a manifest into a list of self-contained scenario dictionaries:
+    # name, input, output, columns, mode, day, months, seasons, typical_days,
+    # quantiles, bin_minutes, chunked, kpi, battery and compact.
+    column_sets = manifest.get("column_sets", {})
+    scenarios = []
+    for number, entry in enumerate(manifest.get("scenarios", []), start=1):
+        columns = entry.get("columns", {})
+        if isinstance(columns, str):
+            if columns not in column_sets:
+                raise ValueError(f"Scenario {entry.get('name', number)} uses the unknown column set {columns!r}.")
+            columns = column_sets[columns]
+
+        mode = entry.get("mode", manifest.get("mode", "mid_month"))
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}, expected one of {MODES}.")
+
+        months = entry.get("months", manifest.get("months", DEFAULT_MONTHS))
+        seasons = entry.get("seasons", manifest.get("seasons", DEFAULT_SEASONS))
+        name = str(entry.get("name", number))
+        typical_days = int(entry.get("typical_days", manifest.get("typical_days", 1)))
+        if typical_days < 1:
+            raise ValueError(f"Scenario {name} asks for {typical_days} typical days; at least one is needed.")
+        quantiles = [float(quantile) for quantile in entry.get("quantiles", manifest.get("quantiles", DEFAULT_QUANTILES))]
+        if not all(0 <= quantile <= 100 for quantile in quantiles):
+            raise ValueError(f"Scenario {name} asks for the quantiles {quantiles}; they have to lie between 0 and 100.")
+        stem = os.path.splitext(os.path.basename(entry["input"]))[0]
+        output = entry.get("output", f"Result_{stem.replace('RES_', '')}.xlsx")
+
+        scenarios.append({
+            "name": name,
+            "input": os.path.join(base_dir, entry["input"]),
+            "output": os.path.join(base_dir, output),
+            "columns": dict(columns),
+            "mode": mode,
+            "day": int(entry.get("day", manifest.get("day", 15))),
+            "months": {int(month): month_name for month, month_name in months.items()},
+            "seasons": {season: [int(month) for month in season_list] for season, season_list in seasons.items()},
+            "typical_days": typical_days,
+            "quantiles": quantiles,
+            "bin_minutes": check_bin_minutes(int(entry.get("bin_minutes", manifest.get("bin_minutes", DEFAULT_BIN_MINUTES)))),
+            "chunked": bool(entry.get("chunked", manifest.get("chunked", False))),
+            "kpi": bool(entry.get("kpi", manifest.get("kpi", False))),
+            "battery": bool(entry.get("battery", manifest.get("battery", False))),
+            "compact": bool(entry.get("compact", manifest.get("compact", False))),
+        })
+    return scenarios
+
+
+def process_scenario(scenario):
+    # Load one workbook and reduce it to its 24-row result sheets (plus the
+    # KPI and Battery sheets on request).
+    from RES_battery import BATTERY_COLUMNS, battery_sheet
+    from RES_cache import load_cached
+    from RES_compact import compact_frame
+    from RES_derived import raw_columns, with_derived
+    from RES_extract import mid_month_sheets
+    from RES_kpi import KPI_COLUMNS, STATE_OF_CHARGE, kpi_sheet
+    from RES_profiles import seasonal_sheets
+    from RES_resample import detect_step, frame_stamps, needs_resampling, resample_frame
+    from RES_typical import representative_sheets
+
+    bin_minutes = scenario.get("bin_minutes", DEFAULT_BIN_MINUTES)
+    if scenario.get("chunked") or scenario["mode"] == "distribution":
+        if scenario["mode"] == "representative":
+            raise ValueError("the representative mode compares whole days and cannot run chunked")
+        return chunked_scenario(scenario, bin_minutes)
+    columns = list(scenario["columns"]) + (KPI_COLUMNS if scenario.get("kpi") else [])
+    columns += BATTERY_COLUMNS if scenario.get("battery") else []
+    with stage("load"):
+        df = load_cached(scenario["input"], raw_columns(columns))
+    if scenario.get("compact"):
+        with stage("compact"):
+            # Rainflow counting and the KPI sheet need the state of charge
+            # unrounded. The stages read the step numbers and float32 columns
+            # of the compact frame as they are.
+            exact = [STATE_OF_CHARGE] if scenario.get("battery") or scenario.get("kpi") else []
+            df = compact_frame(df, exact=exact)
+    with stage("derive"):
+        df = with_derived(df, columns)
+    if needs_resampling(detect_step(frame_stamps(df)), bin_minutes):
+        with stage("resample"):
+            df = resample_frame(df, bin_minutes)
+    if scenario["mode"] == "mid_month":
+        with stage("extract"):
+            sheets = mid_month_sheets(df, scenario["columns"], scenario["months"], scenario["day"], bin_minutes)
+    elif scenario["mode"] == "representative":
+        with stage("select"):
+            sheets = representative_sheets(
+                df, scenario["columns"], scenario["seasons"], scenario.get("typical_days", 1), bin_minutes
+            )
+    else:
+        with stage("profile"):
+            sheets = seasonal_sheets(df, scenario["columns"], scenario["seasons"], bin_minutes=bin_minutes)
+    if scenario.get("kpi"):
+        with stage("kpi"):
+            sheets["KPI"] = kpi_sheet(df, scenario["seasons"])
+    if scenario.get("battery"):
+        with stage("battery"):
+            sheets["Battery"] = battery_sheet(df, scenario["seasons"])
+    return sheets
+
+
+def chunked_scenario(scenario, bin_minutes):
+    # The same result sheets, aggregated block by block in one pass.
+    from RES_battery import BatteryCycles
+    from RES_chunked import aggregate_file
+    from RES_kpi import EnergyBalance
+
+    mid_month = scenario["mode"] == "mid_month"
+    distribution = scenario["mode"] == "distribution"
+    balance = EnergyBalance(scenario["seasons"]) if scenario.get("kpi") else None
+    battery = BatteryCycles(scenario["seasons"]) if scenario.get("battery") else None
+    with stage("aggregate"):
+        accumulator = aggregate_file(
+            scenario["input"],
+            scenario["columns"],
+            seasons=None if mid_month else scenario["seasons"],
+            months=scenario["months"] if mid_month else None,
+            day=scenario["day"],
+            bin_minutes=bin_minutes,
+            balance=balance,
+            sketch=distribution,
+            battery=battery,
+        )
+    if mid_month:
+        sheets = accumulator.mid_month_sheets(scenario["columns"], scenario["months"])
+    elif distribution:
+        with stage("quantiles"):
+            sheets = accumulator.distribution_sheets(scenario["columns"], scenario.get("quantiles", DEFAULT_QUANTILES))
+    else:
+        sheets = accumulator.seasonal_sheets(scenario["columns"])
+    if balance is not None:
+        sheets["KPI"] = balance.result()
+    if battery is not None:
+        sheets["Battery"] = battery.result()
+    return sheets
+
+
+def instrumented_scenario(scenario, instrument=None):
+    # Process a scenario inside its timing context (and optional cProfile /
+    # tracemalloc capture); returns the sheets and the events recorded for it,
+    # so worker processes can send their timings back.
+    instrument = instrument or {}
+    # A forked worker starts with a copy of its parent's events; only the
+    # ones recorded from here on belong to this scenario.
+    first = len(EVENTS)
+    with scenario_context(scenario["name"], instrument.get("profile_dir"), instrument.get("trace_memory", False)):
+        sheets = process_scenario(scenario)
+    events = EVENTS[first:]
+    del EVENTS[first:]
+    return sheets, events
+
+
+def output_reasons(previous, record, plots):
+    # The stale reasons of one output, including charts that are missing
+    # when 'plots' are asked for; the record keeps the charts drawn before.
+    reasons = stale_reasons(previous, record)
+    if previous and previous.get("charts"):
+        record["charts"] = previous["charts"]
+    if plots and previous and missing_charts(previous, plots):
+        reasons.append("the charts are missing")
+    return reasons
+
+
+def select_stale(scenarios, fmt, combined, force=False, plots=None):
+    # Check every output against its dependency record (see RES_incremental)
+    # and return (scenarios to rebuild, new records by scenario name). Up to
+    # date outputs are reported and left out unless 'force' is set; with
+    # 'plots' an output whose charts are missing is rebuilt as well.
+    records = {}
+    if fmt == "combined":
+        previous = read_signature(combined) or {}
+        reasons = []
+        for scenario in scenarios:
+            records[scenario["name"]] = scenario_record(scenario, fmt, previous.get(scenario["name"]))
+            for reason in output_reasons(previous.get(scenario["name"]), records[scenario["name"]], plots):
+                reasons.append(f"{reason} ({scenario['name']})")
+        if set(previous) - set(records):
+            reasons.append("scenarios were removed")
+        if force:
+            return scenarios, records
+        if not reasons:
+            print(f"{os.path.relpath(combined)} is up to date.")
+            return [], records
+        print(f"Rebuilding {os.path.relpath(combined)}: {', '.join(reasons)}.")
+        return scenarios, records
+
+    stale = []
+    for scenario in scenarios:
+        path = output_path(scenario["output"], fmt)
+        previous = read_signature(path)
+        records[scenario["name"]] = scenario_record(scenario, fmt, previous)
+        reasons = output_reasons(previous, records[scenario["name"]], plots)
+        if force:
+            stale.append(scenario)
+        elif reasons:
+            print(f"Rebuilding {os.path.relpath(path)}: {', '.join(reasons)}.")
+            stale.append(scenario)
+        else:
+            if previous["input"] != records[scenario["name"]]["input"]:
+                # Same content under a new mtime: remember it so the
+                # workbook is not hashed again next time.
+                save_signature(path, records[scenario["name"]])
+            print(f"{os.path.relpath(path)} is up to date.")
+    return stale, records
+
+
+def run_scenarios(scenarios, workers=1, fmt="xlsx", combined=None, force=False, instrument=None, plots=None):
+    # Process and write each scenario; a missing or broken workbook is
+    # reported and the remaining scenarios still run. Returns the names of
+    # the scenarios that failed.
+    #
+    # Outputs whose inputs, settings and code are unchanged are skipped
+    # unless 'force' is set. With workers > 1 the workbooks are parsed and
+    # reduced in a process pool (parsing is CPU-bound and holds the GIL).
+    # Workers only send back the small 24-row result sheets and their stage
+    # timings; the main process writes the outputs. 'instrument' may hold
+    # "profile_dir" and "trace_memory" (see RES_timing). 'plots' may hold
+    # "dir" and "format" to draw the charts of the rebuilt outputs (see
+    # RES_plot).
+    failed = []
+    present = []
+    for scenario in scenarios:
+        if os.path.exists(scenario["input"]):
+            present.append(scenario)
+        else:
+            print(f"The {os.path.relpath(scenario['input'])} file is not found.")
+            failed.append(scenario["name"])
+
+    with stage("check"):
+        ready, records = select_stale(present, fmt, combined, force, plots)
+
+    results = {}
+    charts = {}
+
+    def finish(scenario, outcome):
+        sheets, events = outcome
+        EVENTS.extend(events)
+        if plots:
+            charts[scenario["name"]] = sheets
+            paths = chart_paths(scenario["name"], sheets, plots["dir"], plots.get("format", "png"))
+            records[scenario["name"]]["charts"] = chart_record(paths, plots)
+        with stage("write", scenario=scenario["name"]):
+            if fmt == "combined":
+                results[scenario["name"]] = sheets
+            else:
+                path = output_path(scenario["output"], fmt)
+                write_result(sheets, path, fmt)
+                save_signature(path, records[scenario["name"]])
+        print(f"✅{scenario['name']}")
+
+    def report(scenario, error):
+        print(f"The {os.path.relpath(scenario['input'])} file could not be processed: {error}")
+        failed.append(scenario["name"])
+
+    if not ready:
+        if plots and not failed:
+            print(f"The charts in {os.path.relpath(plots['dir'])} are up to date.")
+        return failed
+
+    # Only needed when something has to be rebuilt.
+    import zipfile
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    if workers > 1 and len(ready) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(ready))) as pool:
+            futures = {pool.submit(instrumented_scenario, scenario, instrument): scenario for scenario in ready}
+            for future in as_completed(futures):
+                scenario = futures[future]
+                try:
+                    finish(scenario, future.result())
+                except (OSError, ValueError, KeyError, zipfile.BadZipFile) as error:
+                    report(scenario, error)
+                except Exception as error:
+                    # Anything else (e.g. a malformed export pandas chokes on)
+                    # is reported too; the other scenarios still run.
+                    report(scenario, f"{type(error).__name__}: {error}")
+    else:
+        for scenario in ready:
+            try:
+                finish(scenario, instrumented_scenario(scenario, instrument))
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile) as error:
+                report(scenario, error)
+            except Exception as error:
+                report(scenario, f"{type(error).__name__}: {error}")
+
+    if fmt == "combined" and results:
+        # Keep the manifest order of the scenarios in the combined workbook.
+        with stage("write"):
+            write_combined({s["name"]: results[s["name"]] for s in ready if s["name"] in results}, combined)
+        if not failed:
+            save_signature(combined, records)
+
+    if plots and charts:
+        from RES_plot import render_charts
+
+        with stage("plot"):
+            count = render_charts(charts, plots["dir"], plots.get("format", "png"), workers)
+        print(f"✅{count} charts in {os.path.relpath(plots['dir'])}")
+    return failed
+
+
+# Scenario settings that can be turned on for every scenario from the
+# command line.
+SWITCHES = ("chunked", "kpi", "battery", "compact")
+
+
+def manifest_scenarios(path, only=None, switches=()):
+    # Returns (manifest, scenarios) of a manifest file, keeping only the named
+    # scenarios if 'only' is given; the SWITCHES listed in 'switches' are
+    # turned on for every scenario.
+    manifest = load_manifest(path)
+    scenarios = resolve_scenarios(manifest, os.path.dirname(os.path.abspath(path)))
+    if only:
+        scenarios = [scenario for scenario in scenarios if scenario["name"] in only]
+    for scenario in scenarios:
+        for switch in switches:
+            scenario[switch] = True
+    return manifest, scenarios
+
+
+def run_manifest(path, only=None, workers=1, fmt=None, combined=None, force=False, instrument=None, switches=(), plots=None):
+    # Run every scenario of a manifest (or only the named ones); the SWITCHES
+    # listed in 'switches' are turned on for every scenario.
+    manifest, scenarios = manifest_scenarios(path, only, switches)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    fmt = fmt or manifest.get("format", "xlsx")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format {fmt!r}, expected one of {FORMATS}.")
+    combined = combined or os.path.join(base_dir, manifest.get("combined_output", "Result_all.xlsx"))
+    return run_scenarios(scenarios, workers, fmt, combined, force, instrument, plots)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the HOMER scenarios listed in a manifest.")
+    parser.add_argument("manifest", help="scenario manifest (.json, .toml or .yaml)")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="run only the named scenarios")
+    parser.add_argument(
+        "-j", "--workers", type=int, default=1,
+        help="number of worker processes (0 = one per CPU core, default 1)",
+    )
+    parser.add_argument("--format", choices=FORMATS, help="output backend (default: the manifest's, else xlsx)")
+    parser.add_argument("--combined-output", metavar="PATH", help="workbook written by --format combined")
+    parser.add_argument("--force", action="store_true", help="rebuild every output, even if it is up to date")
+    parser.add_argument("--plots", metavar="DIR", help="draw a chart of every month/season sheet into DIR")
+    parser.add_argument("--plot-format", choices=PLOT_FORMATS, default="png", help="chart file format (default png)")
+    parser.add_argument("--kpi", action="store_true", help="add a KPI sheet with the energy totals of every scenario")
+    parser.add_argument(
+        "--battery", action="store_true",
+        help="add a Battery sheet with the rainflow cycles and throughput of every scenario's battery",
+    )
+    parser.add_argument(
+        "--chunked", action="store_true",
+        help="aggregate every workbook block by block in one pass (for multi-year or multi-site exports)",
+    )
+    parser.add_argument(
+        "--compact", action="store_true",
+        help="process the workbooks as float32 / uint8 percent columns to use less memory",
+    )
+    parser.add_argument("--timings", action="store_true", help="print the time spent in every pipeline stage")
+    parser.add_argument("--trace", metavar="PATH", help="write a Chrome trace (JSON) of the pipeline stages")
+    parser.add_argument("--profile", metavar="DIR", help="write a cProfile dump per scenario into DIR")
+    parser.add_argument("--trace-memory", action="store_true", help="record the tracemalloc peak of every scenario")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    workers = args.workers if args.workers > 0 else os.cpu_count() or 1
+    instrument = {"profile_dir": args.profile, "trace_memory": args.trace_memory}
+    plots = {"dir": args.plots, "format": args.plot_format} if args.plots else None
+    switches = [switch for switch in SWITCHES if getattr(args, switch)]
+    with stage("run"):
+        failed = run_manifest(
+            args.manifest, args.only, workers, args.format, args.combined_output, args.force, instrument, switches, plots
+        )
+    events = take_events()
+    if args.timings:
+        print(summary_table(events))
+    if args.trace:
+        write_trace(args.trace, events)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import importlib.util
+import os
+import re
+
+# Charts of the hour-of-day result sheets.
+#
+# Every month/season sheet of every scenario becomes one line chart (one line
+# per column, under its output label). The charts are drawn headless on the
+# Agg canvas straight from the result arrays: each process creates a single
+# figure and axes and clears and reuses them for every chart it draws, and
+# the charts are split between worker processes. Persian labels are shaped
+# and put in right-to-left order first (with the optional arabic-reshaper and
+# python-bidi packages), since matplotlib neither joins Arabic-script letters
+# nor reorders right-to-left text.
+
+PLOT_FORMATS = ("png", "svg")
+
+FIGURE_SIZE = (8, 4.5)
+DPI = 100
+
+# Hebrew, Arabic (and Persian) letters and their presentation forms.
+RTL_PATTERN = re.compile("[\u0590-\u08ff\ufb1d-\ufdff\ufe70-\ufeff]")
+
+# Characters that cannot appear in file names.
+UNSAFE_PATTERN = re.compile(r'[<>:"/\\|?*\s]+')
+
+# The figure and axes of this process, created on first use.
+_canvas = None
+
+
+def can_shape():
+    # Whether the packages that shape right-to-left labels are installed.
+    return all(importlib.util.find_spec(name) is not None for name in ("arabic_reshaper", "bidi"))
+
+
+def rtl_label(text):
+    # Text ready to be drawn left to right: right-to-left labels are shaped
+    # and reordered, anything else is returned unchanged (render_charts
+    # warns once when the shaping packages are missing).
+    text = str(text)
+    if not RTL_PATTERN.search(text):
+        return text
+    try:
+        import arabic_reshaper
+        from bidi.algorithm import get_display
+    except ImportError:
+        return text
+    return get_display(arabic_reshaper.reshape(text))
+
+
+def chart_name(*parts):
+    return "_".join(UNSAFE_PATTERN.sub("_", str(part)).strip("_") for part in parts)
+
+
+def chart_path(plot_dir, name, sheet_name, fmt="png"):
+    return os.path.join(plot_dir, f"{chart_name(name, sheet_name)}.{fmt}")
+
+
+def chart_paths(name, sheets, plot_dir, fmt="png"):
+    # The chart files drawn for the hour-of-day sheets of one scenario.
+    return [
+        chart_path(plot_dir, name, sheet_name, fmt)
+        for sheet_name, result_df in sheets.items()
+        if result_df.index.name == "Hour"
+    ]
+
+
+def chart_jobs(results, plot_dir, fmt="png"):
+    # One (path, title, hours, values, labels) job per hour-of-day sheet of
+    # {scenario: {sheet name: DataFrame}}; other sheets (KPI) are skipped.
+    import numpy as np
+
+    jobs = []
+    for name, sheets in results.items():
+        for sheet_name, result_df in sheets.items():
+            if result_df.index.name != "Hour":
+                continue
+            jobs.append((
+                chart_path(plot_dir, name, sheet_name, fmt),
+                f"{name} {sheet_name}",
+                np.asarray(result_df.index, dtype=np.float64),
+                result_df.to_numpy(dtype=np.float64, na_value=np.nan),
+                [str(column) for column in result_df.columns],
+            ))
+    return jobs
+
+
+def canvas():
+    # The figure and axes reused by every chart of this process.
+    global _canvas
+    if _canvas is None:
+        try:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+        except ImportError:
+            raise ImportError("Drawing charts requires matplotlib (pip install matplotlib).") from None
+        figure = Figure(figsize=FIGURE_SIZE, dpi=DPI)
+        FigureCanvasAgg(figure)
+        _canvas = (figure, figure.add_subplot())
+    return _canvas
+
+
+def render(jobs):
+    # Draw and save a batch of charts; returns how many were written.
+    figure, axes = canvas()
+    for path, title, hours, values, labels in jobs:
+        axes.clear()
+        lines = axes.plot(hours, values, marker=".")
+        axes.set_title(rtl_label(title))
+        axes.set_xlabel("Hour")
+        axes.set_xlim(0, 24)
+        axes.set_xticks(range(0, 25, 3))
+        axes.grid(alpha=0.3)
+        axes.legend(lines, [rtl_label(label) for label in labels], loc="upper left", fontsize="small")
+        figure.savefig(path)
+    return len(jobs)
+
+
+def render_charts(results, plot_dir, fmt="png", workers=1):
+    # Draw every hour-of-day sheet of {scenario: sheets} into plot_dir, in
+    # 'workers' processes; returns the number of charts.
+    if fmt not in PLOT_FORMATS:
+        raise ValueError(f"Unknown chart format {fmt!r}, expected one of {PLOT_FORMATS}.")
+    os.makedirs(plot_dir, exist_ok=True)
+    jobs = chart_jobs(results, plot_dir, fmt)
+    texts = [text for _, title, _, _, labels in jobs for text in [title, *labels]]
+    if any(RTL_PATTERN.search(text) for text in texts) and not can_shape():
+        print(
+            "The right-to-left labels are drawn unshaped (letters not joined, in the wrong order);"
+            " shaping them requires arabic-reshaper and python-bidi (pip install arabic-reshaper python-bidi)."
+        )
+    if workers > 1 and len(jobs) > 1:
+        # One batch per worker, so each worker sets up its figure only once.
+        from concurrent.futures import ProcessPoolExecutor
+
+        batches = [jobs[number::workers] for number in range(min(workers, len(jobs)))]
+        with ProcessPoolExecutor(max_workers=len(batches)) as pool:
+            return sum(pool.map(render, batches))
+    return render(jobs)
@@ -0,0 +1,183 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from RES_resample import DEFAULT_BIN_MINUTES, MINUTE_NS, NAT, day_slots, frame_stamps, slot_labels
+
+# Hour-of-day profile cube used by RES_main_2.
+#
+# The selected columns of a file are reshaped once into a (day, hour, column)
+# NumPy cube. Every seasonal profile is then a masked reduction over the day
+# axis of that cube: the means (and standard deviations) of all seasons and
+# all columns come out of one matrix product, and min/max/percentile profiles
+# are taken from the same cube without copying the season's rows. The hour
+# axis can also hold finer (or coarser) bins of the day, see RES_resample.
+
+HOURS = 24
+DAY_NS = pd.Timedelta(days=1).value
+
+STATISTICS = ("mean", "std", "min", "max", "median", "percentile")
+
+
+class ProfileCube:
+    # values:     float array of shape (days, 24, columns), NaN where no data
+    #             (the middle axis has one entry per bin of the day); float32
+    #             for a compact frame (see RES_compact), else float64
+    # day_months: calendar month (1-12) of every day
+    # columns:    the column names along the last axis
+    # first_day:  midnight of the first day of the cube
+
+    def __init__(self, values, day_months, columns, first_day):
+        self.values = values
+        self.day_months = day_months
+        self.columns = list(columns)
+        self.first_day = first_day
+
+    @classmethod
+    def from_frame(cls, df, columns=None, bin_minutes=DEFAULT_BIN_MINUTES):
+        # Build the cube from a DataFrame indexed by 'Time' (or a compact
+        # frame), one column at a time. When a day-hour slot holds several
+        # rows (sub-hourly data) their mean is used.
+        slots_per_day = day_slots(bin_minutes)
+        slot_ns = bin_minutes * MINUTE_NS
+        columns = list(df.columns if columns is None else [c for c in columns if c in df.columns])
+        dtype = np.result_type(np.float32, *[df[column].dtype for column in columns])
+        stamps = frame_stamps(df)
+        valid = stamps != NAT
+        stamps = stamps[valid]
+        if len(stamps) == 0:
+            return cls(np.empty((0, slots_per_day, len(columns)), dtype), np.empty(0, dtype=np.int64), columns, None)
+
+        origin = stamps.min() - stamps.min() % DAY_NS
+        offsets = stamps - origin
+        slots = (offsets // DAY_NS) * slots_per_day + (offsets % DAY_NS) // slot_ns
+        n_days = int(slots.max() // slots_per_day) + 1
+
+        cube = np.full((n_days * slots_per_day, len(columns)), np.nan, dtype=dtype)
+        one_per_slot = np.all(np.diff(slots) > 0)
+        for number, column in enumerate(columns):
+            values = df[column].to_numpy()
+            values = values if valid.all() else values[valid]
+            if one_per_slot:
+                # One row per slot (regular hourly data): plain scatter.
+                cube[slots, number] = values
+            else:
+                # Several rows per slot: average them, ignoring NaN.
+                present = ~np.isnan(values)
+                totals = np.bincount(slots, np.where(present, values, 0.0), len(cube))
+                counts = np.bincount(slots, present, len(cube))
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    cube[:, number] = np.where(counts > 0, totals / counts, np.nan)
+
+        first_day = pd.Timestamp(origin)
+        days = pd.date_range(first_day, periods=n_days, freq="D")
+        return cls(cube.reshape(n_days, slots_per_day, len(columns)), days.month.to_numpy(), columns, first_day)
+
+    def day_mask(self, months):
+        # Boolean mask over the day axis selecting the given months.
+        return np.isin(self.day_months, list(months))
+
+    def season_weights(self, seasons):
+        # (seasons, days) 0/1 matrix, one row per season.
+        return np.stack([self.day_mask(months) for months in seasons]).astype(np.float64)
+
+    def moments(self, seasons):
+        # Per-season (count, sum, sum of squares) over the day axis, each of
+        # shape (seasons, 24, columns), from one matrix product per moment
+        # and column (in float64, one column of the cube at a time).
+        weights = self.season_weights(seasons)
+        shape = (len(weights), self.values.shape[1], len(self.columns))
+        counts, sums, squares = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+        for number in range(len(self.columns)):
+            values = self.values[:, :, number].astype(np.float64)
+            present = ~np.isnan(values)
+            filled = np.where(present, values, 0.0)
+            counts[:, :, number] = weights @ present
+            sums[:, :, number] = weights @ filled
+            squares[:, :, number] = weights @ (filled * filled)
+        return counts, sums, squares
+
+    def profiles(self, seasons, stat="mean", q=None):
+        # Hour-of-day profiles of several seasons at once. 'seasons' maps a
+        # season name to its months; returns {season: (24, columns) array}.
+        # 'stat' is one of STATISTICS ('percentile' takes q in 0-100).
+        if stat not in STATISTICS:
+            raise ValueError(f"Unknown statistic {stat!r}, expected one of {STATISTICS}.")
+        names = list(seasons)
+        groups = [seasons[name] for name in names]
+
+        if stat in ("mean", "std"):
+            counts, sums, squares = self.moments(groups)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = sums / counts
+                if stat == "mean":
+                    result = mean
+                else:
+                    # Sample standard deviation, like pandas' default.
+                    result = np.sqrt(np.maximum(squares - counts * mean * mean, 0.0) / (counts - 1))
+                    result[counts < 2] = np.nan
+            result[counts == 0] = np.nan
+            return dict(zip(names, result))
+
+        profiles = {}
+        for name, months in zip(names, groups):
+            profiles[name] = self.profile(months, stat, q)
+        return profiles
+
+    def profile(self, months, stat="mean", q=None):
+        # Hour-of-day profile of a single set of months, shape (24, columns).
+        if stat in ("mean", "std"):
+            return self.profiles({"season": months}, stat)["season"]
+        mask = self.day_mask(months)
+        if not mask.any():
+            return np.full(self.values.shape[1:], np.nan)
+        where = mask[:, None, None]
+        if stat == "min":
+            result = np.fmin.reduce(self.values, axis=0, where=where, initial=np.inf)
+        elif stat == "max":
+            result = np.fmax.reduce(self.values, axis=0, where=where, initial=-np.inf)
+        else:
+            # Order statistics need the season's days side by side.
+            percent = 50 if stat == "median" else q
+            if percent is None:
+                raise ValueError("The 'percentile' statistic needs q.")
+            # Hours without any value (e.g. a ratio at night) stay NaN.
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                result = np.nanpercentile(self.values[mask], percent, axis=0)
+            return result.astype(np.float64)
+        result[np.isinf(result)] = np.nan
+        return result.astype(np.float64)
+
+
+def seasonal_sheets(df, target_columns, season_months, stat="mean", q=None, bin_minutes=DEFAULT_BIN_MINUTES):
+    # Build the 24-hour result sheet of every season, as the groupby loops of
+    # RES_main_2 did: one column per target column (under its new name), an
+    # 'Hour' index from 0 to 23, and None for the columns that are missing.
+    # With bins other than an hour the sheet has one row per bin.
+    for orig_col in target_columns:
+        if orig_col not in df.columns:
+            print(f"The {orig_col} column is not found.")
+
+    cube = ProfileCube.from_frame(df, target_columns, bin_minutes)
+    return profile_sheets(cube.profiles(season_months, stat, q), cube.columns, target_columns, bin_minutes)
+
+
+def profile_sheets(profiles, found, target_columns, bin_minutes=DEFAULT_BIN_MINUTES):
+    # Lay out {season: (bins, found columns) array} profiles as one sheet per
+    # season, the columns under their new names.
+    slots = day_slots(bin_minutes)
+    sheets = {}
+    for season_name, profile in profiles.items():
+        result_df = pd.DataFrame(index=range(slots))
+        for orig_col, new_col in target_columns.items():
+            if orig_col in found:
+                result_df[new_col] = profile[:, found.index(orig_col)]
+            else:
+                result_df[new_col] = [None] * slots
+
+        result_df.index = slot_labels(bin_minutes)
+        result_df.index.name = "Hour"
+        sheets[season_name] = result_df
+    return sheets
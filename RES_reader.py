@@ -0,0 +1,315 @@
+import itertools
+import re
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from RES_timeaxis import build_text_axis
+from RES_timing import stage
+
+# Streaming, column-projected reader for HOMER hourly workbooks.
+#
+# A HOMER export is a single-sheet workbook: row 1 holds the column names
+# (as shared strings), row 2 holds the units (kW, %, kWh...) and every row
+# after that is one timestep. pd.read_excel parses every cell of the sheet
+# through openpyxl, even though the scripts only use a handful of columns.
+# Here the sheet XML is scanned straight out of the zip archive in chunks,
+# and only the cells of the 'Time' column and the requested columns are
+# converted into typed NumPy arrays.
+
+# Size of each block read from the compressed sheet stream, and the amount
+# of sheet XML decoded into one chunk of rows when streaming.
+CHUNK_SIZE = 1 << 20
+CHUNK_BYTES = 8 << 20
+
+# Offset between the Excel serial date epoch and the Unix epoch, in days.
+EXCEL_EPOCH_OFFSET = 25569
+
+# One <row>...</row> element, and one <c> cell inside it. Self-closing rows
+# and cells (e.g. an empty styled cell) are their own alternative, so they
+# match with an empty body instead of running on into the next element.
+ROW_PATTERN = re.compile(rb"<row\b[^>]*?(?:/>|>(.*?)</row>)", re.S)
+CELL_PATTERN = re.compile(rb'<c r="([A-Z]+)(\d+)"([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+VALUE_PATTERN = re.compile(rb"<v>([^<]*)</v>")
+TEXT_PATTERN = re.compile(rb"<t[^>]*>([^<]*)</t>")
+TYPE_PATTERN = re.compile(rb'\bt="(\w+)"')
+SHARED_STRING_PATTERN = re.compile(rb"<si>(.*?)</si>", re.S)
+SHEET_PATTERN = re.compile(rb'<sheet\b[^>]*?r:id="([^"]+)"')
+RELATIONSHIP_PATTERN = re.compile(rb"<Relationship\b([^>]*)/?>")
+
+XML_ENTITIES = {"&lt;": "<", "&gt;": ">", "&quot;": '"', "&apos;": "'", "&amp;": "&"}
+
+
+def fix_header(name):
+    # HOMER writes UTF-8 text that ends up stored as latin1 in the workbook
+    # (e.g. 'Â°' for '°'); the scripts have always repaired it this way.
+    if isinstance(name, str):
+        return name.encode("latin1", errors="ignore").decode("utf-8", errors="ignore")
+    return name
+
+
+def unescape(text):
+    # Replace the five predefined XML entities in a decoded string.
+    if "&" in text:
+        for entity, char in XML_ENTITIES.items():
+            text = text.replace(entity, char)
+    return text
+
+
+def column_index(letters):
+    # Convert spreadsheet column letters ("A", "AJ"...) into a 0-based index.
+    index = 0
+    for char in letters:
+        index = index * 26 + (ord(char) - 64)
+    return index - 1
+
+
+def index_letters(index):
+    # Inverse of column_index: 0 -> "A", 35 -> "AJ".
+    letters = ""
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = chr(65 + rest) + letters
+    return letters
+
+
+def read_shared_strings(archive):
+    # Load the shared string table; a HOMER export only keeps the header and
+    # units labels there, so it is tiny.
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    data = archive.read("xl/sharedStrings.xml")
+    strings = []
+    for item in SHARED_STRING_PATTERN.finditer(data):
+        text = b"".join(TEXT_PATTERN.findall(item.group(1))).decode("utf-8")
+        strings.append(unescape(text))
+    return strings
+
+
+def first_sheet_path(archive):
+    # Resolve the XML part of the first worksheet through the workbook
+    # relationships, falling back to the usual default name.
+    try:
+        workbook = archive.read("xl/workbook.xml")
+        rels = archive.read("xl/_rels/workbook.xml.rels")
+    except KeyError:
+        return "xl/worksheets/sheet1.xml"
+    sheet = SHEET_PATTERN.search(workbook)
+    if sheet is None:
+        return "xl/worksheets/sheet1.xml"
+    for rel in RELATIONSHIP_PATTERN.finditer(rels):
+        attrs = dict(re.findall(rb'(\w+)="([^"]*)"', rel.group(1)))
+        if attrs.get(b"Id") == sheet.group(1):
+            target = attrs[b"Target"].decode("utf-8").lstrip("/")
+            return target if target.startswith("xl/") else "xl/" + target
+    return "xl/worksheets/sheet1.xml"
+
+
+def iter_row_blocks(stream, block_bytes=CHUNK_SIZE):
+    # Yield blocks of raw bytes that always end on a complete </row>, so that
+    # the regular expressions never see a row cut in half.
+    tail = b""
+    while True:
+        chunk = stream.read(block_bytes)
+        if not chunk:
+            break
+        data = tail + chunk
+        end = data.rfind(b"</row>")
+        if end < 0:
+            tail = data
+            continue
+        end += len(b"</row>")
+        yield data[:end]
+        tail = data[end:]
+    if tail:
+        yield tail
+
+
+def cell_text(cell_type, body, shared):
+    # Decode the value of a single cell into a Python string or float.
+    if cell_type == b"inlineStr":
+        return unescape(b"".join(TEXT_PATTERN.findall(body)).decode("utf-8"))
+    value = VALUE_PATTERN.search(body)
+    if value is None:
+        return None
+    raw = value.group(1)
+    if cell_type == b"s":
+        return shared[int(raw)]
+    if cell_type in (b"str", b"e"):
+        return unescape(raw.decode("utf-8"))
+    return float(raw)
+
+
+def parse_row(body, shared):
+    # Fully decode one row into a {column index: value} dictionary.
+    cells = {}
+    for letters, _, attrs, inner in CELL_PATTERN.findall(body):
+        cell_type = TYPE_PATTERN.search(attrs)
+        value = cell_text(cell_type.group(1) if cell_type else None, inner, shared)
+        if value is not None:
+            cells[column_index(letters.decode("ascii"))] = value
+    return cells
+
+
+def is_units_row(cells, time_index):
+    # The HOMER units row has no timestamp and only text labels.
+    if not cells or time_index in cells:
+        return False
+    return all(isinstance(value, str) for value in cells.values())
+
+
+def to_datetime(values):
+    # Convert Excel serial dates into datetime64, rounded to the second so
+    # that values like 46022.958333333336 land exactly on the hour.
+    seconds = np.round((values - EXCEL_EPOCH_OFFSET) * 86400.0)
+    times = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[s]")
+    valid = ~np.isnan(seconds)
+    times[valid] = seconds[valid].astype("int64").astype("datetime64[s]")
+    return times
+
+
+def read_homer_chunks(path, columns=None, time_column="Time", chunk_bytes=CHUNK_BYTES):
+    # Open a HOMER workbook for streaming. Returns (header, units, chunks):
+    # the header and units are decoded right away, and 'chunks' is an
+    # iterator of {name: array} blocks of consecutive rows (about chunk_bytes
+    # of sheet XML each) holding the 'Time' column and each requested column
+    # that exists in the sheet. 'columns' is any iterable of (decoded) column
+    # names; None means every column. The workbook stays open until the
+    # iterator is exhausted or closed.
+    archive = zipfile.ZipFile(path)
+    try:
+        shared = read_shared_strings(archive)
+        stream = archive.open(first_sheet_path(archive))
+        blocks = iter_row_blocks(stream, chunk_bytes)
+        first_block = next(blocks, b"")
+
+        # Decode the header row and the units row in full; they are the only
+        # rows that are not plain numbers.
+        leading = ROW_PATTERN.finditer(first_block)
+        header_row = next(leading, None)
+        if header_row is None:
+            raise ValueError(f"{path} has no header row.")
+    except Exception:
+        archive.close()
+        raise
+    header = {i: fix_header(name) for i, name in parse_row(header_row.group(1) or b"", shared).items()}
+    time_index = next((i for i, name in header.items() if name == time_column), 0)
+
+    units, data_start = {}, header_row.end()
+    units_row = next(leading, None)
+    if units_row is not None:
+        cells = parse_row(units_row.group(1) or b"", shared)
+        if is_units_row(cells, time_index):
+            units = {header.get(i): fix_header(label) for i, label in cells.items()}
+            data_start = units_row.end()
+
+    # Work out which spreadsheet columns have to be materialized.
+    wanted = set(header.values()) if columns is None else set(columns) | {time_column}
+    selected = {}
+    for index, name in sorted(header.items()):
+        if name in wanted and name not in selected.values():
+            selected[index] = name
+    names = [header[i] for i in sorted(header)]
+
+    # Only cells of the selected columns are matched; the longest letters go
+    # first so "AJ" is never read as "A".
+    alternatives = b"|".join(re.escape(index_letters(i).encode("ascii")) for i in sorted(selected, reverse=True))
+    projected = re.compile(rb'<c r="(' + alternatives + rb')(\d+)"([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+
+    def chunks():
+        try:
+            if not selected:
+                return
+            for data in itertools.chain([first_block[data_start:]], blocks):
+                arrays = decode_block(projected.findall(data), selected, shared, time_column)
+                if arrays:
+                    yield arrays
+        finally:
+            stream.close()
+            archive.close()
+
+    return names, units, chunks()
+
+
+def decode_block(cells, selected, shared, time_column):
+    # Turn the matched cells of a block of rows into typed arrays, placing
+    # every value at its row position (missing cells become NaN).
+    raw_rows = {index: [] for index in selected}
+    raw_values = {index: [] for index in selected}
+    text_cells = {index: {} for index in selected}
+    for letters, row_num, attrs, inner in cells:
+        index = column_index(letters.decode("ascii"))
+        cell_type = TYPE_PATTERN.search(attrs)
+        if cell_type is None or cell_type.group(1) == b"n":
+            value = VALUE_PATTERN.search(inner)
+            if value is not None:
+                raw_rows[index].append(row_num)
+                raw_values[index].append(value.group(1))
+        else:
+            value = cell_text(cell_type.group(1), inner, shared)
+            if value is not None:
+                text_cells[index][int(row_num)] = value
+
+    row_numbers = {
+        index: np.array(raw_rows[index], dtype="S").astype(np.int64) if raw_rows[index] else np.empty(0, np.int64)
+        for index in selected
+    }
+    bounds = [int(r.min()) for r in row_numbers.values() if len(r)]
+    bounds += [int(r.max()) for r in row_numbers.values() if len(r)]
+    bounds += [row for rows in text_cells.values() for row in rows]
+    if not bounds:
+        return {}
+    first, last = min(bounds), max(bounds)
+
+    arrays = {}
+    for index, name in selected.items():
+        values = np.full(last - first + 1, np.nan)
+        if raw_rows[index]:
+            values[row_numbers[index] - first] = np.array(raw_values[index], dtype="S").astype(np.float64)
+        if text_cells[index]:
+            if name == time_column:
+                # Text timestamps are handed to pandas below.
+                values = values.astype(object)
+                for row_num, value in text_cells[index].items():
+                    values[row_num - first] = value
+            else:
+                # Data columns are numeric; stray text becomes NaN.
+                rows = np.fromiter(text_cells[index], dtype=np.int64) - first
+                values[rows] = pd.to_numeric(pd.Series(list(text_cells[index].values())), errors="coerce")
+        arrays[name] = values
+
+    # The 'Time' column is stored as Excel serial dates; text timestamps go
+    # through the time-axis builder (see RES_timeaxis).
+    if time_column in arrays:
+        times = arrays[time_column]
+        if times.dtype == object:
+            arrays[time_column] = build_text_axis(times)
+        else:
+            arrays[time_column] = to_datetime(times)
+    return arrays
+
+
+def read_homer_columns(path, columns=None, time_column="Time"):
+    # Read a HOMER workbook in one go and return (header, units, arrays),
+    # where 'arrays' maps the 'Time' column and each requested column that
+    # exists in the sheet to a NumPy array covering every data row.
+    names, units, chunks = read_homer_chunks(path, columns, time_column)
+    with stage("scan"):
+        blocks = list(chunks)
+    if not blocks:
+        return names, units, {}
+    with stage("decode"):
+        arrays = {name: np.concatenate([block[name] for block in blocks]) for name in blocks[0]}
+    return names, units, arrays
+
+
+def load_homer(path, columns=None, time_column="Time"):
+    # Read a HOMER workbook into a DataFrame indexed by 'Time', holding only
+    # the requested columns (in sheet order). This is the drop-in replacement
+    # for the pd.read_excel / header fix / pd.to_datetime / set_index steps.
+    header, _, arrays = read_homer_columns(path, columns, time_column)
+    data = {name: arrays[name] for name in header if name in arrays and name != time_column}
+    index = pd.DatetimeIndex(arrays.get(time_column, []), name=time_column)
+    return pd.DataFrame(data, index=index)
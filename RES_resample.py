@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+from RES_bins import DEFAULT_BIN_MINUTES, check_bin_minutes, day_slots, slot_labels
+from RES_reader import read_homer_chunks
+
+# Timestep detection and streaming resampling of sub-hourly HOMER exports.
+#
+# HOMER can export at 1-, 5-, 10- or 15-minute resolution, while the
+# extraction and profile steps work on fixed bins of the day (hourly by
+# default). The resolution of a file is detected from its 'Time' column, and
+# finer data is averaged into bins block by block with running per-bin sums
+# and counts, so a year of 1-minute data is never held in memory as a whole
+# frame. Bins are aligned on midnight and labelled by their start.
+
+MINUTE_NS = pd.Timedelta(minutes=1).value
+DAY_NS = pd.Timedelta(days=1).value
+
+# Timestamps looked at to detect the timestep, and rows resampled at a time.
+SAMPLE_ROWS = 1000
+CHUNK_ROWS = 1 << 16
+
+NAT = np.iinfo(np.int64).min
+
+
+def as_nanoseconds(stamps):
+    # int64 nanoseconds of a datetime array or index (NaT kept as NAT).
+    return np.asarray(stamps).astype("datetime64[ns]").view(np.int64)
+
+
+def frame_stamps(df):
+    # int64 nanoseconds of the rows of a frame indexed by 'Time', or of a
+    # compact frame indexed by step numbers (see RES_compact).
+    if "time_step" in df.attrs and not isinstance(df.index, pd.DatetimeIndex):
+        return df.attrs["time_origin"] + np.asarray(df.index, dtype=np.int64) * df.attrs["time_step"]
+    return as_nanoseconds(df.index)
+
+
+def frame_blocks(df, columns=None, chunk_rows=CHUNK_ROWS):
+    # (stamps, {name: values}) of every CHUNK_ROWS rows of a frame, without
+    # the rows that have no time; the values keep their dtype, so a float32
+    # or memory-mapped frame is never converted as a whole.
+    stamps = frame_stamps(df)
+    columns = list(df.columns if columns is None else columns)
+    arrays = {name: df[name].to_numpy() for name in columns}
+    for start in range(0, len(df), chunk_rows):
+        block = stamps[start:start + chunk_rows]
+        valid = block != NAT
+        values = {name: values[start:start + chunk_rows] for name, values in arrays.items()}
+        if not valid.all():
+            block = block[valid]
+            values = {name: column[valid] for name, column in values.items()}
+        yield block, values
+
+
+def detect_step(stamps, sample=SAMPLE_ROWS):
+    # The export timestep in minutes: the median difference between the first
+    # 'sample' timestamps, or None when there are fewer than two.
+    stamps = as_nanoseconds(stamps[:sample])
+    steps = np.diff(stamps[stamps != NAT])
+    steps = steps[steps > 0]
+    if len(steps) == 0:
+        return None
+    return float(np.median(steps)) / MINUTE_NS
+
+
+def needs_resampling(step, bin_minutes=DEFAULT_BIN_MINUTES):
+    # Whether data with the given timestep (in minutes, None if unknown) has
+    # to be averaged into the bins; data coarser than the bins is rejected.
+    if step is not None and step > bin_minutes:
+        raise ValueError(f"its {step:g}-minute timestep is coarser than the {bin_minutes}-minute bins asked for")
+    return step is not None and step < bin_minutes
+
+
+class BinAccumulator:
+    # Running per-bin sums and counts of a stream of (timestamps, values)
+    # blocks. NaN values are left out of their bin's mean; blocks may arrive
+    # in any order.
+
+    def __init__(self, columns, bin_minutes=DEFAULT_BIN_MINUTES):
+        self.columns = list(columns)
+        self.bin_ns = check_bin_minutes(bin_minutes) * MINUTE_NS
+        self.origin = None
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.sums = np.zeros((0, len(self.columns)))
+        self.counts = np.zeros((0, len(self.columns)), dtype=np.int64)
+
+    def grow(self, first, last):
+        # Make room for bins first..last (relative to the current origin) and
+        # return how far the existing bins moved.
+        before = max(0, -first)
+        after = max(0, last + 1 - len(self.rows))
+        if before or after:
+            self.rows = np.pad(self.rows, (before, after))
+            self.sums = np.pad(self.sums, ((before, after), (0, 0)))
+            self.counts = np.pad(self.counts, ((before, after), (0, 0)))
+            self.origin -= before * self.bin_ns
+        return before
+
+    def add(self, stamps, values):
+        # Add a block of rows: 'stamps' holds their times and 'values' is a
+        # (rows, columns) array in the order of self.columns.
+        stamps = as_nanoseconds(stamps)
+        values = np.asarray(values, dtype=np.float64).reshape(len(stamps), len(self.columns))
+        valid = stamps != NAT
+        stamps, values = stamps[valid], values[valid]
+        if len(stamps) == 0:
+            return
+        if self.origin is None:
+            first = stamps.min()
+            self.origin = int(first - first % DAY_NS)
+
+        bins = (stamps - self.origin) // self.bin_ns
+        bins += self.grow(int(bins.min()), int(bins.max()))
+        low = int(bins.min())
+        bins -= low
+        size = int(bins.max()) + 1
+        window = slice(low, low + size)
+
+        self.rows[window] += np.bincount(bins, minlength=size)
+        present = ~np.isnan(values)
+        for number in range(len(self.columns)):
+            self.sums[window, number] += np.bincount(bins, np.where(present[:, number], values[:, number], 0.0), size)
+            self.counts[window, number] += np.bincount(bins[present[:, number]], minlength=size)
+
+    def result(self, time_column="Time"):
+        # DataFrame of the bin means indexed by bin start; bins that no row
+        # fell into are left out, bins without a value for a column are NaN.
+        used = np.flatnonzero(self.rows)
+        if self.origin is None:
+            stamps = np.empty(0, dtype="datetime64[ns]")
+        else:
+            stamps = (self.origin + used * self.bin_ns).astype("datetime64[ns]")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(self.counts[used] > 0, self.sums[used] / self.counts[used], np.nan)
+        return pd.DataFrame(means, index=pd.DatetimeIndex(stamps, name=time_column), columns=self.columns)
+
+
+def resample_frame(df, bin_minutes=DEFAULT_BIN_MINUTES, chunk_rows=CHUNK_ROWS):
+    # Average a frame indexed by 'Time' (or a compact frame) into bins,
+    # CHUNK_ROWS rows at a time (a memory-mapped frame is only read one chunk
+    # at a time).
+    accumulator = BinAccumulator(df.columns, bin_minutes)
+    for stamps, values in frame_blocks(df, chunk_rows=chunk_rows):
+        columns = [values[name] for name in df.columns]
+        accumulator.add(stamps, np.column_stack(columns) if columns else np.empty((len(stamps), 0)))
+    return accumulator.result(df.attrs.get("time_name") or df.index.name or "Time")
+
+
+def resample_chunks(chunks, columns, bin_minutes=DEFAULT_BIN_MINUTES, time_column="Time"):
+    # Average a stream of {name: array} blocks (see RES_reader) into bins;
+    # 'columns' are the names to keep, in order.
+    accumulator = BinAccumulator(columns, bin_minutes)
+    for chunk in chunks:
+        times = chunk[time_column]
+        values = np.column_stack([chunk.get(name, np.full(len(times), np.nan)) for name in columns])
+        accumulator.add(times, values.reshape(len(times), len(columns)))
+    return accumulator.result(time_column)
+
+
+def load_resampled(path, columns=None, bin_minutes=DEFAULT_BIN_MINUTES, time_column="Time"):
+    # Stream a HOMER workbook straight into bins without building the full
+    # frame; same layout as RES_reader.load_homer (columns in sheet order).
+    names, units, chunks = read_homer_chunks(path, columns, time_column)
+    wanted = set(names if columns is None else columns)
+    kept = [name for name in dict.fromkeys(names) if name in wanted and name != time_column]
+    return resample_chunks(chunks, kept, bin_minutes, time_column)
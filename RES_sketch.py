@@ -0,0 +1,344 @@
+import argparse
+import os
+import sys
+import zipfile
+
+import numpy as np
+
+from RES_profiles import profile_sheets
+from RES_resample import DAY_NS, DEFAULT_BIN_MINUTES, MINUTE_NS, day_slots
+
+# Mergeable quantile sketches of hour-of-day distributions.
+#
+# The percentile profiles of RES_profiles sort every season's values of every
+# hour, which needs the whole file in memory. Here every (season, bin,
+# column) cell keeps a DDSketch-style log histogram instead: a value x is
+# counted in bucket ceil(log_gamma |x|) with its sign, gamma = (1 + a) / (1 -
+# a), so every quantile read back from the counts is within a relative error
+# of a (ACCURACY) of a value of that rank. Values closer to zero than a
+# column's floor, a times the largest magnitude of the column's first block
+# (rounded down to a power of gamma), go to a zero bucket instead, so a
+# column spans a few hundred buckets rather than every power of gamma down
+# to the smallest rounding noise; below the floor the error is absolute, at
+# most a times that magnitude. Each column keeps its own bucket range in the
+# one counts array: a block of rows is added with one bincount per season,
+# the ranges grow with the magnitudes that actually occur, and two sketches
+# are merged by adding their counts (on the higher of their two floors), so
+# the sketches of parallel workers or of several files combine as if all the
+# rows had gone through one. The exact minimum and maximum of every cell are
+# kept as well.
+#
+# Merging the scenarios of a manifest into one set of distribution profiles
+# (e.g. every site of a farm), columns matched by their output labels:
+#   python RES_sketch.py RES_main_2.json --output Distribution.xlsx -j 4
+
+ACCURACY = 0.01
+
+
+class QuantileSketch:
+    # seasons:          {season name: months}
+    # columns:          column names along the third axis
+    # bin_minutes:      width of the bins of the day
+    # accuracy:         relative accuracy of the quantiles
+    # counts:           int32 array (seasons, bins, columns, buckets)
+    # floor:            log_gamma of the zero threshold of every column (NaN
+    #                   until the column has a nonzero value)
+    # low, high:        signed bucket keys of the first and last bucket of
+    #                   every column (low > high while it has none)
+    # minimum, maximum: exact extremes of every (season, bin, column) cell
+
+    def __init__(self, seasons, columns, bin_minutes=DEFAULT_BIN_MINUTES, accuracy=ACCURACY):
+        self.seasons = {name: [int(month) for month in months] for name, months in seasons.items()}
+        self.columns = list(columns)
+        self.bin_minutes = bin_minutes
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.slots = day_slots(bin_minutes)
+        shape = (len(self.seasons), self.slots, len(self.columns))
+        self.counts = np.zeros(shape + (0,), dtype=np.int32)
+        self.floor = np.full(len(self.columns), np.nan)
+        self.low = np.ones(len(self.columns), dtype=np.int64)
+        self.high = np.zeros(len(self.columns), dtype=np.int64)
+        self.minimum = np.full(shape, np.inf)
+        self.maximum = np.full(shape, -np.inf)
+        self.membership = np.zeros((len(self.seasons), 13), dtype=bool)
+        for number, months in enumerate(self.seasons.values()):
+            self.membership[number, months] = True
+
+    def set_floors(self, values, present):
+        # Give the columns without a floor one from this block's magnitudes.
+        magnitude = np.where(present, np.abs(np.nan_to_num(values)), 0.0).max(axis=0, initial=0.0)
+        new = np.isnan(self.floor) & (magnitude > 0)
+        self.floor[new] = np.floor(np.log(self.accuracy * magnitude[new]) / np.log(self.gamma))
+
+    def keys(self, values, floor=None):
+        # Signed bucket keys of a (rows, columns) array: +-(ceil(log_gamma
+        # |x|) - floor), 0 at or below the floor (NaN values get key 0 too
+        # and have to be masked out by the caller).
+        floor = self.floor if floor is None else floor
+        magnitude = np.abs(np.nan_to_num(values))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            keys = np.ceil(np.log(magnitude) / np.log(self.gamma)) - floor
+        keys = np.where(keys >= 1, keys, 0).astype(np.int64)
+        return np.where(values < 0, -keys, keys)
+
+    def key_values(self, keys, floor):
+        # The value every signed bucket key of a column with that floor
+        # stands for.
+        magnitude = 2 * self.gamma ** (floor + np.abs(keys)) / (self.gamma + 1)
+        return np.where(keys == 0, 0.0, np.sign(keys) * magnitude)
+
+    def grow(self, first, last):
+        # Make room for the bucket keys first..last of every column (first >
+        # last for the columns that need none).
+        empty = self.low > self.high
+        low = np.where(empty, first, np.minimum(self.low, first))
+        high = np.where(empty, last, np.maximum(self.high, last))
+        if np.array_equal(low, self.low) and np.array_equal(high, self.high):
+            return
+        width = int(np.maximum(high - low + 1, 0).max(initial=0))
+        if np.array_equal(low, self.low) and width <= self.counts.shape[3]:
+            self.high = high
+            return
+        counts = np.zeros(self.counts.shape[:3] + (width,), dtype=np.int32)
+        for number in np.flatnonzero(~empty):
+            used = self.high[number] - self.low[number] + 1
+            start = self.low[number] - low[number]
+            counts[:, :, number, start:start + used] = self.counts[:, :, number, :used]
+        self.counts, self.low, self.high = counts, low, high
+
+    def add(self, stamps, values):
+        # Add a block of rows: int64 nanosecond 'stamps' and a (rows, columns)
+        # float array in the order of self.columns.
+        if len(stamps) == 0:
+            return
+        months = stamps.astype("datetime64[ns]").astype("datetime64[M]").astype(np.int64) % 12 + 1
+        slots = (stamps % DAY_NS) // (self.bin_minutes * MINUTE_NS)
+        present = ~np.isnan(values)
+        if not present.any():
+            return
+        self.set_floors(values, present)
+        keys = self.keys(values)
+        seen = present.any(axis=0)
+        self.grow(
+            np.where(seen, np.where(present, keys, np.iinfo(np.int64).max).min(axis=0), 1),
+            np.where(seen, np.where(present, keys, np.iinfo(np.int64).min).max(axis=0), 0),
+        )
+        width = self.counts.shape[3]
+        # Flat (bin, column, bucket) position of every value.
+        cells = (slots[:, None] * len(self.columns) + np.arange(len(self.columns))) * width + (keys - self.low)
+        size = self.slots * len(self.columns) * width
+
+        for season in range(len(self.seasons)):
+            rows = self.membership[season, months]
+            if not rows.any():
+                continue
+            counted = np.bincount(cells[rows][present[rows]], minlength=size)
+            self.counts[season] += counted.reshape(self.slots, len(self.columns), width)
+            np.fmin.at(self.minimum[season], slots[rows], values[rows])
+            np.fmax.at(self.maximum[season], slots[rows], values[rows])
+
+    def column_buckets(self, number, floor):
+        # (signed keys, counts (seasons, bins, keys)) of one column,
+        # re-expressed against a higher (or equal) floor.
+        keys = np.arange(self.low[number], self.high[number] + 1)
+        counts = self.counts[:, :, number, :len(keys)]
+        if np.isnan(self.floor[number]) or np.isnan(floor):
+            return keys, counts
+        shift = int(floor - self.floor[number])
+        magnitude = np.maximum(np.abs(keys) - shift, 0)
+        return np.sign(keys) * magnitude, counts
+
+    def aligned(self, columns):
+        # A copy of the sketch over 'columns' (a superset of its own columns;
+        # the new ones are empty).
+        numbers = [columns.index(column) for column in self.columns]
+        copy = QuantileSketch(self.seasons, columns, self.bin_minutes, self.accuracy)
+        copy.counts = np.zeros(copy.minimum.shape + (self.counts.shape[3],), dtype=np.int32)
+        copy.counts[:, :, numbers] = self.counts
+        copy.floor[numbers], copy.low[numbers], copy.high[numbers] = self.floor, self.low, self.high
+        copy.minimum[:, :, numbers] = self.minimum
+        copy.maximum[:, :, numbers] = self.maximum
+        return copy
+
+    def merge(self, other):
+        # Add the counts of another sketch of the same seasons, bins and
+        # accuracy into this one; columns are matched by name, and every
+        # column ends up with the higher of the two floors.
+        if (other.seasons, other.bin_minutes, other.accuracy) != (self.seasons, self.bin_minutes, self.accuracy):
+            raise ValueError("Only sketches of the same seasons, bins and accuracy can be merged.")
+        columns = self.columns + [column for column in other.columns if column not in self.columns]
+        merged = self.aligned(columns) if columns != self.columns else self
+        if other.columns != columns:
+            other = other.aligned(columns)
+
+        floor = np.fmax(merged.floor, other.floor)
+        parts = [
+            [
+                sketch.column_buckets(number, floor[number])
+                for sketch in (merged, other)
+                if sketch.low[number] <= sketch.high[number]
+            ]
+            for number in range(len(columns))
+        ]
+        result = QuantileSketch(self.seasons, columns, self.bin_minutes, self.accuracy)
+        result.floor = floor
+        first = np.array([min((keys.min() for keys, _ in part), default=1) for part in parts])
+        last = np.array([max((keys.max() for keys, _ in part), default=0) for part in parts])
+        result.grow(first, last)
+        for number, part in enumerate(parts):
+            for keys, counts in part:
+                np.add.at(result.counts[:, :, number], (slice(None), slice(None), keys - result.low[number]), counts)
+
+        self.columns = columns
+        self.counts, self.floor, self.low, self.high = result.counts, result.floor, result.low, result.high
+        self.minimum = np.fmin(merged.minimum, other.minimum)
+        self.maximum = np.fmax(merged.maximum, other.maximum)
+        return self
+
+    def profiles(self, stat):
+        # {season: (bins, columns) array} of a quantile (0-100), 'min' or
+        # 'max'; NaN where a cell has no values.
+        totals = self.counts.sum(axis=3)
+        if stat in ("min", "max"):
+            result = (self.minimum if stat == "min" else self.maximum).copy()
+        else:
+            if not 0 <= stat <= 100:
+                raise ValueError(f"A quantile has to lie between 0 and 100, not {stat}.")
+            rank = stat / 100 * (totals - 1)
+            # The first bucket whose running count passes the rank (one
+            # season at a time, to keep the running counts small).
+            buckets = np.zeros(totals.shape, dtype=np.int64)
+            for season, counts in enumerate(self.counts):
+                buckets[season] = (np.cumsum(counts, axis=2) <= rank[season, ..., None]).sum(axis=2)
+            buckets = np.minimum(buckets, max(self.counts.shape[3] - 1, 0))
+            values = self.key_values(self.low + buckets, np.nan_to_num(self.floor))
+            result = np.clip(values, self.minimum, self.maximum)
+        result[totals == 0] = np.nan
+        return dict(zip(self.seasons, result))
+
+    def save(self, path):
+        np.savez_compressed(
+            path, counts=self.counts, floor=self.floor, low=self.low, high=self.high,
+            minimum=self.minimum, maximum=self.maximum,
+            columns=np.array(self.columns), seasons=np.array(list(self.seasons)),
+            months=np.array([months for months in self.seasons.values()], dtype=object),
+            settings=np.array([self.bin_minutes, self.accuracy]),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=True) as data:
+            bin_minutes, accuracy = data["settings"]
+            seasons = dict(zip(data["seasons"].tolist(), data["months"].tolist()))
+            sketch = cls(seasons, data["columns"].tolist(), int(bin_minutes), float(accuracy))
+            sketch.counts, sketch.floor = data["counts"], data["floor"]
+            sketch.low, sketch.high = data["low"], data["high"]
+            sketch.minimum, sketch.maximum = data["minimum"], data["maximum"]
+        return sketch
+
+
+def quantile_label(stat):
+    # Sheet name suffix of a statistic: 'P10', 'P50', 'max'.
+    return stat if stat in ("min", "max") else f"P{stat:g}"
+
+
+def distribution_sheets(sketch, target_columns, quantiles):
+    # One sheet per season and statistic ('Winter P10' ... 'Winter max'),
+    # laid out like the seasonal sheets.
+    sheets = {}
+    stats = list(quantiles) + ["max"]
+    profiles = {stat: sketch.profiles(stat) for stat in stats}
+    for season in sketch.seasons:
+        for stat in stats:
+            name = f"{season} {quantile_label(stat)}"
+            sheets.update(profile_sheets({name: profiles[stat][season]}, sketch.columns, target_columns, sketch.bin_minutes))
+    return sheets
+
+
+def scenario_sketch(scenario):
+    # The sketch of one scenario's workbook, over the output labels of its
+    # columns (so sketches of files with different HOMER names merge).
+    from RES_chunked import aggregate_file
+
+    accumulator = aggregate_file(
+        scenario["input"], scenario["columns"], seasons=scenario["seasons"],
+        bin_minutes=scenario.get("bin_minutes", DEFAULT_BIN_MINUTES), sketch=True,
+    )
+    sketch = accumulator.sketch
+    sketch.columns = [scenario["columns"][column] for column in sketch.columns]
+    return sketch
+
+
+def merged_sketch(scenarios, workers=1):
+    # One sketch of every scenario, built in 'workers' processes and merged
+    # in manifest order; missing or broken workbooks are reported and left
+    # out.
+    from concurrent.futures import ProcessPoolExecutor
+
+    present = []
+    for scenario in scenarios:
+        if os.path.exists(scenario["input"]):
+            present.append(scenario)
+        else:
+            print(f"The {os.path.relpath(scenario['input'])} file is not found.")
+
+    def sketches():
+        if workers > 1 and len(present) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(present))) as pool:
+                futures = [(scenario, pool.submit(scenario_sketch, scenario)) for scenario in present]
+                for scenario, future in futures:
+                    yield scenario, future.result
+        else:
+            for scenario in present:
+                yield scenario, lambda scenario=scenario: scenario_sketch(scenario)
+
+    merged = None
+    for scenario, result in sketches():
+        try:
+            sketch = result()
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile) as error:
+            print(f"The {os.path.relpath(scenario['input'])} file could not be processed: {error}")
+            continue
+        merged = sketch if merged is None else merged.merge(sketch)
+    return merged
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Pool the scenarios of a manifest into one set of distribution profiles.")
+    parser.add_argument("manifest", help="scenario manifest (.json, .toml or .yaml)")
+    parser.add_argument("--output", default="Distribution.xlsx", help="workbook to write (default Distribution.xlsx)")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="pool only the named scenarios")
+    parser.add_argument(
+        "--quantiles", nargs="+", type=float,
+        help="percentiles to report besides the maximum (default: the manifest's, else 10 50 90)",
+    )
+    parser.add_argument("--save", metavar="PATH", help="also save the merged sketch (.npz) to merge it again later")
+    parser.add_argument(
+        "-j", "--workers", type=int, default=1,
+        help="number of worker processes (0 = one per CPU core, default 1)",
+    )
+    return parser
+
+
+def main(argv=None):
+    from RES_pipeline import manifest_scenarios
+    from RES_writer import write_result
+
+    args = build_parser().parse_args(argv)
+    workers = args.workers if args.workers > 0 else os.cpu_count() or 1
+    _, scenarios = manifest_scenarios(args.manifest, args.only)
+    sketch = merged_sketch(scenarios, workers)
+    if sketch is None:
+        print("No scenario could be processed.")
+        return 1
+    if args.save:
+        sketch.save(args.save)
+    quantiles = args.quantiles or scenarios[0]["quantiles"]
+    write_result(distribution_sheets(sketch, {column: column for column in sketch.columns}, quantiles), args.output)
+    print(f"✅{os.path.relpath(args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
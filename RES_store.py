@@ -0,0 +1,332 @@
+import argparse
+import calendar
+import datetime
+import json
+import os
+import re
+import sqlite3
+import sys
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from RES_cache import file_digest, load_cached
+from RES_columns import ColumnIndex
+from RES_derived import DERIVED, with_derived
+from RES_pipeline import DEFAULT_SEASONS, load_manifest, resolve_scenarios
+from RES_profiles import ProfileCube
+from RES_resample import DEFAULT_BIN_MINUTES, detect_step, needs_resampling, resample_frame, slot_labels
+
+# Persistent store of pre-aggregated hour-of-day profiles.
+#
+# Ingesting a HOMER export reduces every column of it (and every derived
+# column it allows, see RES_derived), once, to 24-hour profiles per calendar
+# month, per season and per day of the year, and keeps them in a small SQLite
+# database (one row per file, column, period and statistic, the 24 values
+# packed as float64). Questions such as "average August hourly load" or
+# "February 15 battery input" are then answered from the database in
+# milliseconds, without opening the workbook again:
+#   python RES_store.py ingest RES_P11.xlsx
+#   python RES_store.py query RES_P11 August "Total Electrical Load Served"
+#   python RES_store.py query RES_P11 "Feb 15" "Generic 1kWh Lead Acid Input Power"
+# Month and season profiles hold the STATISTICS below; a day profile holds
+# the values of the first such day in the file ("value").
+
+STORE_PATH = os.environ.get("RES_STORE", "profiles.sqlite")
+
+STATISTICS = ("mean", "std", "min", "max", "median")
+DAY_STATISTIC = "value"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    path TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    bin_minutes INTEGER NOT NULL,
+    seasons TEXT,
+    rows INTEGER NOT NULL,
+    first_time TEXT,
+    last_time TEXT,
+    ingested TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS columns (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    number INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    unit TEXT,
+    PRIMARY KEY (file_id, number)
+);
+CREATE TABLE IF NOT EXISTS profiles (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    column_number INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    period TEXT NOT NULL,
+    stat TEXT NOT NULL,
+    hours BLOB NOT NULL,
+    PRIMARY KEY (file_id, column_number, kind, period, stat)
+) WITHOUT ROWID;
+"""
+
+# Month names and abbreviations (English) -> month number.
+MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): number for number, name in enumerate(calendar.month_abbr) if name})
+
+DAY_PATTERNS = (
+    re.compile(r"^(?P<month>\d{1,2})-(?P<day>\d{1,2})$"),
+    re.compile(r"^(?P<month>[a-z]+)\.?\s+(?P<day>\d{1,2})$"),
+    re.compile(r"^(?P<day>\d{1,2})\s+(?P<month>[a-z]+)\.?$"),
+)
+
+
+def connect(path=STORE_PATH):
+    # Open (and create, the first time) the profile store.
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.executescript(SCHEMA)
+    # Stores created before the seasons were recorded get the column (their
+    # files are ingested again on the next run).
+    if "seasons" not in [row[1] for row in connection.execute("PRAGMA table_info(files)")]:
+        connection.execute("ALTER TABLE files ADD COLUMN seasons TEXT")
+    return connection
+
+
+def file_name(path):
+    # Files are stored and queried under their stem, e.g. 'RES_P11'.
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def pack(values):
+    return np.ascontiguousarray(values, dtype=np.float64).tobytes()
+
+
+def unpack(blob):
+    return np.frombuffer(blob, dtype=np.float64)
+
+
+def profile_rows(df, seasons, bin_minutes=DEFAULT_BIN_MINUTES):
+    # Yield (column number, kind, period, stat, values) for every profile of
+    # a frame indexed by 'Time'.
+    cube = ProfileCube.from_frame(df, None, bin_minutes)
+    months = {str(month): [month] for month in range(1, 13)}
+    for stat in STATISTICS:
+        for kind, periods in (("month", months), ("season", seasons)):
+            for period, profile in cube.profiles(periods, stat).items():
+                for number in range(len(cube.columns)):
+                    yield number, kind, period, stat, profile[:, number]
+
+    # Day profiles: the first occurrence of every calendar day, like the
+    # month/day filter of RES_main_1.
+    if cube.first_day is None:
+        return
+    days = pd.date_range(cube.first_day, periods=len(cube.values), freq="D")
+    seen = set()
+    for position, day in enumerate(days):
+        period = f"{day.month:02d}-{day.day:02d}"
+        if period in seen:
+            continue
+        seen.add(period)
+        for number in range(len(cube.columns)):
+            yield number, "day", period, DAY_STATISTIC, cube.values[position, :, number]
+
+
+def ingest_file(connection, path, seasons=None, bin_minutes=DEFAULT_BIN_MINUTES):
+    # Pre-aggregate one workbook into the store. A file already stored with
+    # the same content, bins and seasons is skipped; returns True if it was
+    # ingested.
+    seasons = seasons or DEFAULT_SEASONS
+    season_key = json.dumps({season: [int(month) for month in months] for season, months in seasons.items()})
+    name = file_name(path)
+    digest = file_digest(path)
+    stored = connection.execute("SELECT sha256, bin_minutes, seasons FROM files WHERE name = ?", (name,)).fetchone()
+    if stored == (digest, bin_minutes, season_key):
+        print(f"{name} is already stored.")
+        return False
+
+    df = load_cached(path)
+    units = df.attrs.get("units", {})
+    df = with_derived(df, DERIVED)
+    if needs_resampling(detect_step(df.index), bin_minutes):
+        df = resample_frame(df, bin_minutes)
+    with connection:
+        connection.execute("DELETE FROM files WHERE name = ?", (name,))
+        cursor = connection.execute(
+            "INSERT INTO files (name, path, sha256, bin_minutes, seasons, rows, first_time, last_time, ingested)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                name,
+                os.path.abspath(path),
+                digest,
+                bin_minutes,
+                season_key,
+                len(df),
+                str(df.index.min()) if len(df) else None,
+                str(df.index.max()) if len(df) else None,
+                datetime.datetime.now().isoformat(timespec="seconds"),
+            ),
+        )
+        file_id = cursor.lastrowid
+        connection.executemany(
+            "INSERT INTO columns (file_id, number, name, unit) VALUES (?, ?, ?, ?)",
+            [(file_id, number, column, units.get(column)) for number, column in enumerate(df.columns)],
+        )
+        connection.executemany(
+            "INSERT INTO profiles (file_id, column_number, kind, period, stat, hours) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (file_id, number, kind, period, stat, pack(values))
+                for number, kind, period, stat, values in profile_rows(df, seasons, bin_minutes)
+            ),
+        )
+    print(f"✅{name}")
+    return True
+
+
+def file_record(connection, name):
+    # (id, bin_minutes) of a stored file, by name or path.
+    row = connection.execute("SELECT id, bin_minutes FROM files WHERE name = ?", (file_name(name),)).fetchone()
+    if row is None:
+        raise ValueError(f"{file_name(name)} is not in the store; ingest it first.")
+    return row
+
+
+def resolve_column(connection, file_id, column):
+    # Column number of a column name (exact, normalized, role or close match,
+    # see RES_columns).
+    rows = connection.execute("SELECT number, name FROM columns WHERE file_id = ?", (file_id,)).fetchall()
+    numbers = {name: number for number, name in rows}
+    found, notes = ColumnIndex(numbers).resolve([column])
+    for line in notes:
+        print(line)
+    if column not in found:
+        raise ValueError(f"The {column} column is not found.")
+    return numbers[found[column]]
+
+
+def resolve_period(connection, file_id, period):
+    # (kind, stored period) of a period given as a month ('August', 'aug',
+    # '8'), a season ('Winter') or a day ('02-15', 'Feb 15', '15 February').
+    text = str(period).strip().lower()
+    if text in MONTHS:
+        return "month", str(MONTHS[text])
+    if text.isdigit() and 1 <= int(text) <= 12:
+        return "month", str(int(text))
+
+    seasons = connection.execute(
+        "SELECT DISTINCT period FROM profiles WHERE file_id = ? AND kind = 'season'", (file_id,)
+    ).fetchall()
+    for (season,) in seasons:
+        if season.lower() == text:
+            return "season", season
+
+    for pattern in DAY_PATTERNS:
+        match = pattern.match(text)
+        if match is None:
+            continue
+        month = match.group("month")
+        month = int(month) if month.isdigit() else MONTHS.get(month)
+        if month is not None and 1 <= month <= 12:
+            return "day", f"{month:02d}-{int(match.group('day')):02d}"
+    raise ValueError(f"Unknown period {period!r}: expected a month, a season or a day such as 'Feb 15'.")
+
+
+def query(connection, name, period, columns, stat="mean"):
+    # Hour-of-day profile(s) of one stored file: a DataFrame with an 'Hour'
+    # index and one column per requested column. Day periods only have the
+    # day's own values, so 'stat' is ignored for them.
+    file_id, bin_minutes = file_record(connection, name)
+    kind, stored_period = resolve_period(connection, file_id, period)
+    if kind == "day":
+        stat = DAY_STATISTIC
+    elif stat not in STATISTICS:
+        raise ValueError(f"Unknown statistic {stat!r}, expected one of {STATISTICS}.")
+
+    if isinstance(columns, str):
+        columns = [columns]
+    result_df = pd.DataFrame(index=slot_labels(bin_minutes))
+    for column in columns:
+        row = connection.execute(
+            "SELECT hours FROM profiles WHERE file_id = ? AND column_number = ? AND kind = ? AND period = ? AND stat = ?",
+            (file_id, resolve_column(connection, file_id, column), kind, stored_period, stat),
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"{file_name(name)} has no {stored_period} data.")
+        result_df[column] = unpack(row[0])
+    result_df.index.name = "Hour"
+    return result_df
+
+
+def stored_files(connection):
+    # The stored files as a DataFrame.
+    return pd.read_sql_query(
+        "SELECT name, rows, bin_minutes, first_time, last_time, ingested, path FROM files ORDER BY name", connection
+    )
+
+
+def ingest_paths(connection, paths, bin_minutes=DEFAULT_BIN_MINUTES):
+    # Ingest workbooks and/or every input of scenario manifests (with their
+    # seasons and bins). Returns the number of paths that failed.
+    failed = 0
+    for path in paths:
+        if os.path.splitext(path)[1].lower() in (".json", ".toml", ".yaml", ".yml"):
+            manifest = load_manifest(path)
+            jobs = [
+                (scenario["input"], scenario["seasons"], scenario["bin_minutes"])
+                for scenario in resolve_scenarios(manifest, os.path.dirname(os.path.abspath(path)))
+            ]
+        else:
+            jobs = [(path, None, bin_minutes)]
+        for input_path, seasons, bins in jobs:
+            if not os.path.exists(input_path):
+                print(f"The {os.path.relpath(input_path)} file is not found.")
+                failed += 1
+                continue
+            try:
+                ingest_file(connection, input_path, seasons, bins)
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile) as error:
+                print(f"The {os.path.relpath(input_path)} file could not be processed: {error}")
+                failed += 1
+    return failed
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Pre-aggregated hour-of-day profiles of HOMER exports.")
+    parser.add_argument("--db", default=STORE_PATH, help=f"profile store (default {STORE_PATH}, or $RES_STORE)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="pre-aggregate workbooks (or the inputs of manifests)")
+    ingest.add_argument("paths", nargs="+", metavar="PATH", help="HOMER workbook or scenario manifest")
+    ingest.add_argument("--bin-minutes", type=int, default=DEFAULT_BIN_MINUTES, help="bins of the profiles (default 60)")
+
+    ask = commands.add_parser("query", help="print the profile of some columns over a period")
+    ask.add_argument("file", help="stored file, e.g. RES_P11")
+    ask.add_argument("period", help="month (August), season (Winter) or day (Feb 15, 02-15)")
+    ask.add_argument("columns", nargs="+", metavar="COLUMN", help="HOMER column names")
+    ask.add_argument("--stat", choices=STATISTICS, default="mean", help="statistic of month/season profiles")
+
+    commands.add_parser("list", help="list the stored files")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    connection = connect(args.db)
+    try:
+        if args.command == "ingest":
+            return 1 if ingest_paths(connection, args.paths, args.bin_minutes) else 0
+        if args.command == "list":
+            print(stored_files(connection).to_string(index=False))
+            return 0
+        try:
+            result_df = query(connection, args.file, args.period, args.columns, args.stat)
+        except ValueError as error:
+            print(error)
+            return 1
+        print(result_df.to_string())
+        return 0
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
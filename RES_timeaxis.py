@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+
+# Time axis of a HOMER export.
+#
+# HOMER writes one fixed time format (or Excel serial dates) and a fixed
+# timestep, so the 'Time' column does not need generic, format-guessing
+# datetime parsing row by row. For text timestamps the format is detected
+# once from the first value, the start and step are taken from the first
+# rows, and the axis is generated arithmetically; it is then checked against
+# an evenly spread sample of rows, and only if that check fails is the whole
+# column parsed (with the detected format). Whatever the source, the finished
+# axis is checked for gaps, repeated or skipped hours (DST changes) and steps
+# backwards, and those are reported explicitly instead of silently turning
+# into NaT or misplaced rows.
+
+# Rows used to find the step, and rows checked against the generated axis.
+STEP_ROWS = 16
+SAMPLE_ROWS = 64
+
+# Irregular steps remembered in detail (all of them are counted).
+MAX_REPORTED = 10
+
+HOUR = np.timedelta64(1, "h")
+
+
+def text_format(text):
+    # strftime format of a timestamp string, or None if pandas cannot tell.
+    try:
+        from pandas.tseries.api import guess_datetime_format
+    except ImportError:
+        return None
+    return guess_datetime_format(str(text).strip())
+
+
+def parse_text_times(values, fmt=None):
+    # Parse an object array of timestamp strings into datetime64[s]; values
+    # that do not match become NaT.
+    series = pd.Series(values, dtype=object)
+    if fmt is None:
+        parsed = pd.to_datetime(series, errors="coerce")
+    else:
+        parsed = pd.to_datetime(series, format=fmt, errors="coerce")
+    return parsed.to_numpy().astype("datetime64[s]")
+
+
+def regular_axis(start, step, count):
+    # start, start + step, ... as datetime64[s].
+    return start + np.arange(count) * step
+
+
+def build_text_axis(values, sample=SAMPLE_ROWS):
+    # datetime64[s] axis of an object array of timestamp strings (None where
+    # a cell is empty), generated from its start and step when the sampled
+    # rows agree, parsed in full otherwise.
+    present = np.array([isinstance(value, str) for value in values], dtype=bool)
+    if not present.any():
+        return np.full(len(values), np.datetime64("NaT"), dtype="datetime64[s]")
+    fmt = text_format(values[np.argmax(present)])
+    if not present.all() or len(values) <= STEP_ROWS:
+        return parse_text_times(values, fmt)
+
+    head = parse_text_times(values[:STEP_ROWS], fmt)
+    steps = np.diff(head)
+    if np.isnat(head).any() or not (steps > np.timedelta64(0, "s")).all():
+        return parse_text_times(values, fmt)
+    step = np.median(steps.astype(np.int64)).astype(np.int64) * np.timedelta64(1, "s")
+    axis = regular_axis(head[0], step, len(values))
+
+    rows = np.unique(np.linspace(0, len(values) - 1, min(sample, len(values))).astype(np.int64))
+    if np.array_equal(parse_text_times(values[rows], fmt), axis[rows]):
+        return axis
+    return parse_text_times(values, fmt)
+
+
+def describe_step(step):
+    # '1 h', '15 min' or '30 s'.
+    seconds = int(step / np.timedelta64(1, "s"))
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600} h"
+    if seconds % 60 == 0:
+        return f"{seconds // 60} min"
+    return f"{seconds} s"
+
+
+class TimeAxisCheck:
+    # Checks a time axis, fed block by block, against its own regular step
+    # (the most common step of the first block that has one, together with
+    # the last row before it) and records every irregular
+    # step: gaps, repeated hours and skipped hours (DST changes), other
+    # repeats and steps backwards.
+
+    def __init__(self):
+        self.start = None
+        self.step = None
+        self.rows = 0
+        self.last = None
+        self.counts = {}
+        self.irregular = []
+
+    def add(self, stamps):
+        stamps = np.asarray(stamps).astype("datetime64[s]")
+        if len(stamps) == 0:
+            return
+        if self.start is None:
+            valid = stamps[~np.isnat(stamps)]
+            self.start = valid[0] if len(valid) else None
+        if self.last is not None:
+            full, offset = np.concatenate([[self.last], stamps]), self.rows - 1
+        else:
+            full, offset = stamps, self.rows
+        if self.step is None:
+            steps = np.diff(full[~np.isnat(full)])
+            positive = steps[steps > np.timedelta64(0, "s")]
+            if len(positive):
+                values, counts = np.unique(positive, return_counts=True)
+                self.step = values[np.argmax(counts)]
+        self.rows += len(stamps)
+        self.last = stamps[-1]
+        if self.step is None or len(full) < 2:
+            return
+
+        steps = np.diff(full)
+        odd = np.flatnonzero((steps != self.step) | np.isnat(steps))
+        for position in odd:
+            kind = self.classify(steps[position])
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+            if len(self.irregular) < MAX_REPORTED:
+                self.irregular.append({
+                    "row": int(offset + position + 1),
+                    "kind": kind,
+                    "after": str(full[position]),
+                    "at": str(full[position + 1]),
+                })
+
+    def classify(self, step):
+        if np.isnat(step):
+            return "missing timestamp"
+        if step == self.step + HOUR:
+            return "skipped hour (DST start?)"
+        if step == self.step - HOUR:
+            return "repeated hour (DST end?)"
+        if step < np.timedelta64(0, "s"):
+            return "step backwards"
+        if step == np.timedelta64(0, "s"):
+            return "repeated timestamp"
+        if step > self.step and step % self.step == np.timedelta64(0, "s"):
+            return "gap"
+        return "off-grid step"
+
+    def summary(self):
+        # JSON-friendly description of the axis.
+        return {
+            "start": None if self.start is None else str(self.start),
+            "step": None if self.step is None else describe_step(self.step),
+            "rows": self.rows,
+            "irregular": dict(self.counts),
+            "examples": list(self.irregular),
+        }
+
+    def messages(self, name):
+        # One line per kind of irregular step, with its first occurrence.
+        lines = []
+        for kind, count in self.counts.items():
+            first = next((item for item in self.irregular if item["kind"] == kind), None)
+            where = f", first between {first['after']} and {first['at']}" if first else ""
+            lines.append(f"The Time column of {name} has {count} x {kind} (step {describe_step(self.step)}){where}.")
+        return lines
@@ -0,0 +1,101 @@
+import contextlib
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+
+# Per-stage timing instrumentation of the pipeline.
+#
+# Every pipeline stage (hashing, parsing, loading, extraction, writing...)
+# runs inside a 'stage' context manager that records a Chrome trace
+# "complete" event: name, start, duration, process id and the scenario being
+# processed. The recorded events can be printed as a summary table or
+# written as a JSON trace that chrome://tracing or Perfetto can open.
+# 'scenario_context' can also capture a cProfile profile and the tracemalloc
+# peak of each scenario.
+
+# Events recorded in this process (worker processes send theirs back).
+EVENTS = []
+
+# Arguments attached to every event, e.g. {"scenario": "11"}.
+CONTEXT = {}
+
+
+@contextlib.contextmanager
+def stage(name, **args):
+    # Time the enclosed block as one stage of the pipeline.
+    started = time.time()
+    counter = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - counter
+        EVENTS.append({
+            "name": name,
+            "ph": "X",
+            "ts": round(started * 1e6, 1),
+            "dur": round(duration * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": 0,
+            "args": {**CONTEXT, **args},
+        })
+
+
+@contextlib.contextmanager
+def scenario_context(name, profile_dir=None, trace_memory=False):
+    # Tag every stage of the enclosed block with the scenario name and, on
+    # request, write a cProfile dump to '<profile_dir>/<name>.prof' and record
+    # the peak traced memory of the scenario.
+    previous = CONTEXT.get("scenario")
+    CONTEXT["scenario"] = name
+    profiler = cProfile.Profile() if profile_dir else None
+    tracing = trace_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        with stage("scenario"):
+            yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(profile_dir, exist_ok=True)
+            profiler.dump_stats(os.path.join(profile_dir, f"{name}.prof"))
+        if tracing:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            EVENTS[-1]["args"]["peak_traced_mb"] = round(peak / (1024 * 1024), 2)
+        if previous is None:
+            CONTEXT.pop("scenario", None)
+        else:
+            CONTEXT["scenario"] = previous
+
+
+def take_events():
+    # Return the events recorded so far and start a new list.
+    events = EVENTS[:]
+    del EVENTS[:]
+    return events
+
+
+def summary_table(events):
+    # Total, mean and max time per stage, slowest stages first.
+    totals = {}
+    for event in events:
+        durations = totals.setdefault(event["name"], [])
+        durations.append(event["dur"] / 1e6)
+    lines = [f"{'stage':<14} {'calls':>6} {'total (s)':>10} {'mean (s)':>10} {'max (s)':>10}"]
+    for name, durations in sorted(totals.items(), key=lambda item: -sum(item[1])):
+        total = sum(durations)
+        lines.append(
+            f"{name:<14} {len(durations):>6} {total:>10.4f} {total / len(durations):>10.4f} {max(durations):>10.4f}"
+        )
+    return "\n".join(lines)
+
+
+def write_trace(path, events):
+    # Write the events in Chrome trace format.
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, handle, ensure_ascii=False)
@@ -0,0 +1,127 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from RES_profiles import ProfileCube, profile_sheets
+from RES_resample import DEFAULT_BIN_MINUTES
+
+# Representative and typical days of a scenario.
+#
+# RES_main_1 takes the 15th of February, May, August and November as the days
+# of their seasons, whatever the weather was on that day. The
+# "representative" mode picks real days instead: for every season, the day
+# whose profile over all the selected columns is closest to the season's mean
+# profile, or, with "typical_days": k, the k medoid days of k groups of
+# similar days, each weighted by the share of the season's days it stands
+# for. Columns are scaled by their standard deviation over the season so kW
+# and % columns count alike. Every distance comes out of array operations on
+# the (day, hour, column) cube of RES_profiles: one pass scores all the days
+# of a season against its mean, and one Gram-matrix product gives all the
+# day-to-day distances k-medoids works on.
+
+# Swaps tried by k-medoids before it settles for the medoids it has.
+MAX_ITERATIONS = 100
+
+
+def day_features(values):
+    # The (days, bins * columns) matrix of a season's days, scaled per column,
+    # its mean day and the number of values every day has. Missing values are
+    # replaced by the mean at that slot, so they never count as a difference.
+    values = values.astype(np.float64)
+    scale = np.nanstd(values.reshape(-1, values.shape[2]), axis=0) if values.size else np.ones(values.shape[2])
+    scale[~(scale > 0)] = 1.0
+    flat = (values / scale).reshape(len(values), -1)
+    present = ~np.isnan(flat)
+    with warnings.catch_warnings():
+        # Slots without any value (e.g. a ratio at night) have no mean.
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nan_to_num(np.nanmean(flat, axis=0))
+    return np.where(present, flat, mean), mean, present.sum(axis=1)
+
+
+def pairwise_distances(features):
+    # Euclidean distance between every pair of days, from one Gram matrix.
+    squares = np.einsum("ij,ij->i", features, features)
+    return np.sqrt(np.maximum(squares[:, None] + squares[None, :] - 2.0 * (features @ features.T), 0.0))
+
+
+def k_medoids(distances, k, candidates, first):
+    # Medoids (day numbers) of k groups of days and the group of every day.
+    # Only 'candidates' can be medoids. This is PAM: the medoids are built
+    # greedily from 'first' (the day closest to the mean), each new one
+    # lowering the total distance of the days to their nearest medoid the
+    # most, then the single medoid/day swap that lowers it the most is made
+    # until no swap helps. Every step scores all candidate days at once.
+    allowed = np.flatnonzero(candidates)
+    k = min(k, len(allowed))
+    medoids = [first]
+    nearest = distances[:, first]
+    while len(medoids) < k:
+        costs = np.minimum(nearest[:, None], distances[:, allowed]).sum(axis=0)
+        costs[np.isin(allowed, medoids)] = np.inf
+        medoids.append(int(allowed[np.argmin(costs)]))
+        nearest = np.minimum(nearest, distances[:, medoids[-1]])
+
+    medoids = np.array(medoids)
+    for _ in range(MAX_ITERATIONS):
+        best, swap = distances[:, medoids].min(axis=1).sum(), None
+        for number in range(k):
+            others = np.delete(medoids, number)
+            nearest = distances[:, others].min(axis=1) if len(others) else np.full(len(distances), np.inf)
+            costs = np.minimum(nearest[:, None], distances[:, allowed]).sum(axis=0)
+            choice = int(np.argmin(costs))
+            if costs[choice] < best * (1 - 1e-12):
+                best, swap = costs[choice], (number, allowed[choice])
+        if swap is None:
+            break
+        medoids[swap[0]] = swap[1]
+    return medoids, np.argmin(distances[:, medoids], axis=1)
+
+
+def representative_days(cube, seasons, typical_days=1):
+    # {season: [(day number in the cube, weight, distance to the season's
+    # mean)]}: the day closest to the mean, or the k-medoid days with the
+    # share of the season's days they stand for, largest share first.
+    picks = {}
+    for name, months in seasons.items():
+        days = np.flatnonzero(cube.day_mask(months))
+        if len(days) == 0:
+            picks[name] = []
+            continue
+        features, mean, counts = day_features(cube.values[days])
+        # Partial days (at the ends of an export) are never picked.
+        candidates = counts == counts.max()
+        to_mean = np.sqrt(((features - mean) ** 2).sum(axis=1))
+        first = int(np.argmin(np.where(candidates, to_mean, np.inf)))
+        if typical_days == 1:
+            chosen = [(first, 1.0)]
+        else:
+            medoids, labels = k_medoids(pairwise_distances(features), typical_days, candidates, first)
+            weights = np.bincount(labels, minlength=len(medoids)) / len(days)
+            chosen = [(int(medoids[number]), float(weights[number])) for number in np.argsort(-weights, kind="stable")]
+        picks[name] = [(int(days[day]), weight, float(to_mean[day])) for day, weight in chosen]
+    return picks
+
+
+def representative_sheets(df, target_columns, season_months, typical_days=1, bin_minutes=DEFAULT_BIN_MINUTES):
+    # The result sheets of the "representative" mode: the bins of every
+    # picked day, named after its season (and numbered with typical_days >
+    # 1), plus a "Days" sheet with the date, weight and distance to the
+    # season's mean of each of them.
+    for orig_col in target_columns:
+        if orig_col not in df.columns:
+            print(f"The {orig_col} column is not found.")
+
+    cube = ProfileCube.from_frame(df, target_columns, bin_minutes)
+    profiles, rows = {}, []
+    for season, days in representative_days(cube, season_months, typical_days).items():
+        for rank, (day, weight, distance) in enumerate(days, start=1):
+            name = season if typical_days == 1 else f"{season} {rank}"
+            profiles[name] = cube.values[day].astype(np.float64)
+            date = cube.first_day + pd.Timedelta(days=day)
+            rows.append((name, date.year, date.month, date.day, weight, distance))
+
+    sheets = profile_sheets(profiles, cube.columns, target_columns, bin_minutes)
+    sheets["Days"] = pd.DataFrame(rows, columns=["Period", "Year", "Month", "Day", "Weight", "Distance"]).set_index("Period")
+    return sheets
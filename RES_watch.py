@@ -0,0 +1,244 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from RES_pipeline import SWITCHES, instrumented_scenario, manifest_scenarios, select_stale
+from RES_timing import stage, summary_table, take_events
+from RES_writer import FORMATS, output_path, save_signature, write_result
+
+# Watch mode: keep the outputs of one or more manifests up to date while new
+# HOMER exports arrive.
+#
+# The simulation farm drops RES_P*.xlsx exports into shared folders all day.
+# Instead of re-running RES_main_1.py / RES_main_2.py by hand (and importing
+# pandas again every time), this process stays up and polls the input
+# workbooks of the manifests, and the manifests themselves, every few
+# seconds. A workbook is passed on once it has settled: its size and
+# modification time are the same as at the previous scan and it was last
+# written at least 'settle' seconds ago, so a half-copied export is never
+# read. Settled workbooks go through a bounded queue to a fixed pool of worker
+# processes that keep their imports between files; while every worker is
+# busy and the queue is full, scanning waits (backpressure). Up to date
+# outputs are skipped exactly as in RES_pipeline, and a changed manifest is
+# reloaded, so new scenarios are picked up without a restart.
+
+POLL_SECONDS = 2.0
+SETTLE_SECONDS = 5.0
+
+# Output formats with one output per scenario.
+WATCH_FORMATS = tuple(fmt for fmt in FORMATS if fmt != "combined")
+
+
+def file_signature(path):
+    # (size, mtime in ns) of a file, or None if it does not exist.
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class Watcher:
+    # manifests: {manifest path: output paths of its scenarios}
+    # scenarios: {output path: scenario} of every watched scenario
+    # formats:   {output path: output format}
+    # seen:      {path: signature at the previous scan}
+    # handled:   {path: signature when it was last passed on (for a manifest
+    #            that could not be read, too, so each version of it is only
+    #            read and reported once)}
+    # queued:    output paths waiting in the queue or being processed
+
+    def __init__(
+        self, manifests, workers=1, fmt=None, only=None, switches=(), poll=POLL_SECONDS, settle=SETTLE_SECONDS, timings=False
+    ):
+        self.manifests = {os.path.abspath(path): [] for path in manifests}
+        self.workers = workers
+        self.fmt = fmt
+        self.only = only
+        self.switches = switches
+        self.poll = poll
+        self.settle = settle
+        self.timings = timings
+        self.scenarios = {}
+        self.formats = {}
+        self.seen = {}
+        self.handled = {}
+        self.queued = set()
+        self.pool = None
+        for path in self.manifests:
+            self.load(path)
+
+    def load(self, path):
+        # (Re)read a manifest; a manifest that cannot be read keeps its
+        # previous scenarios until it changes again.
+        signature = file_signature(path)
+        self.handled[path] = signature
+        try:
+            manifest, scenarios = manifest_scenarios(path, self.only, self.switches)
+        except (OSError, ValueError, KeyError) as error:
+            print(f"The {os.path.relpath(path)} manifest could not be read: {error}")
+            return []
+        except Exception as error:
+            # Anything else (e.g. a YAML syntax error, or a manifest that is
+            # not a mapping) is reported too; the watch goes on.
+            print(f"The {os.path.relpath(path)} manifest could not be read: {type(error).__name__}: {error}")
+            return []
+        fmt = self.fmt or manifest.get("format", "xlsx")
+        if fmt not in WATCH_FORMATS:
+            print(f"The {os.path.relpath(path)} manifest asks for {fmt!r} outputs; xlsx files are written instead.")
+            fmt = "xlsx"
+        for output in self.manifests[path]:
+            self.scenarios.pop(output, None)
+            self.formats.pop(output, None)
+        self.manifests[path] = [scenario["output"] for scenario in scenarios]
+        for scenario in scenarios:
+            self.scenarios[scenario["output"]] = scenario
+            self.formats[scenario["output"]] = fmt
+        return self.manifests[path]
+
+    def inputs(self):
+        # {input workbook: output paths of the scenarios reading it}.
+        inputs = {}
+        for output, scenario in self.scenarios.items():
+            inputs.setdefault(scenario["input"], []).append(output)
+        return inputs
+
+    def scan(self):
+        # The watched paths that changed since they were last passed on and
+        # have settled since.
+        now = time.time()
+        settled = []
+        for path in list(self.manifests) + sorted(self.inputs()):
+            signature = file_signature(path)
+            previous, self.seen[path] = self.seen.get(path), signature
+            if signature is None or signature == self.handled.get(path):
+                continue
+            if signature == previous and now - signature[1] / 1e9 >= self.settle:
+                settled.append(path)
+        return settled
+
+    async def run(self):
+        queue = asyncio.Queue(maxsize=self.workers)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        tasks = [asyncio.create_task(self.work(queue)) for _ in range(self.workers)]
+        try:
+            while True:
+                inputs = self.inputs()
+                for path in self.scan():
+                    if path in self.manifests:
+                        outputs = self.load(path)
+                    else:
+                        outputs = inputs.get(path, [])
+                    waiting = [output for output in outputs if output in self.queued]
+                    if not waiting:
+                        # A file that changes again while its scenarios are
+                        # still queued is passed on at a later scan.
+                        self.handled[path] = self.seen[path]
+                    for output in outputs:
+                        if output not in self.queued and os.path.exists(self.scenarios[output]["input"]):
+                            self.queued.add(output)
+                            await queue.put(output)
+                await asyncio.sleep(self.poll)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.pool.shutdown(cancel_futures=True)
+
+    async def work(self, queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            output = await queue.get()
+            try:
+                scenario = self.scenarios.get(output)
+                if scenario is not None:
+                    await self.process(scenario, loop)
+            except Exception as error:
+                # Anything else (e.g. a malformed export pandas chokes on) is
+                # reported too; the worker goes on with the next file.
+                print(
+                    f"The {os.path.relpath(scenario['input'])} file could not be processed: {type(error).__name__}: {error}"
+                )
+            finally:
+                self.queued.discard(output)
+                queue.task_done()
+
+    async def process(self, scenario, loop):
+        # Rebuild one output if it is out of date; parsing and reducing run in
+        # the worker pool, writing runs here.
+        fmt = self.formats[scenario["output"]]
+        events = []
+        # The check hashes the workbook, which takes a while for a large one;
+        # it runs in a thread so scanning goes on meanwhile.
+        with stage("check"):
+            ready, records = await loop.run_in_executor(None, select_stale, [scenario], fmt, None)
+        if ready:
+            try:
+                sheets, events = await loop.run_in_executor(self.pool, instrumented_scenario, scenario)
+                with stage("write", scenario=scenario["name"]):
+                    path = output_path(scenario["output"], fmt)
+                    write_result(sheets, path, fmt)
+                    save_signature(path, records[scenario["name"]])
+                print(f"✅{scenario['name']}")
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile) as error:
+                print(f"The {os.path.relpath(scenario['input'])} file could not be processed: {error}")
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory); start a new pool.
+                print(f"The {os.path.relpath(scenario['input'])} file could not be processed: a worker process stopped.")
+                self.pool.shutdown(cancel_futures=True)
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        # The process runs for days, so the stage events are drained after
+        # every file instead of piling up.
+        events = events + take_events()
+        if self.timings and ready:
+            print(summary_table(events))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Keep the outputs of HOMER scenario manifests up to date as new exports arrive."
+    )
+    parser.add_argument(
+        "manifests", nargs="+", metavar="manifest", help="scenario manifest(s) to watch (.json, .toml or .yaml)"
+    )
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="watch only the named scenarios")
+    parser.add_argument(
+        "-j", "--workers", type=int, default=1,
+        help="number of worker processes (0 = one per CPU core, default 1)",
+    )
+    parser.add_argument("--format", choices=WATCH_FORMATS, help="output backend (default: the manifest's, else xlsx)")
+    parser.add_argument(
+        "--interval", type=float, default=POLL_SECONDS,
+        help=f"seconds between two scans of the watched files (default {POLL_SECONDS:g})",
+    )
+    parser.add_argument(
+        "--settle", type=float, default=SETTLE_SECONDS,
+        help=f"seconds a workbook must stay unchanged before it is read (default {SETTLE_SECONDS:g})",
+    )
+    parser.add_argument("--kpi", action="store_true", help="add a KPI sheet with the energy totals of every scenario")
+    parser.add_argument("--battery", action="store_true", help="add a Battery sheet with the battery cycles of every scenario")
+    parser.add_argument("--chunked", action="store_true", help="aggregate every workbook block by block in one pass")
+    parser.add_argument("--compact", action="store_true", help="process the workbooks as float32 / uint8 percent columns")
+    parser.add_argument("--timings", action="store_true", help="print the time spent in every stage of each rebuilt output")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    workers = args.workers if args.workers > 0 else os.cpu_count() or 1
+    switches = [switch for switch in SWITCHES if getattr(args, switch)]
+    watcher = Watcher(args.manifests, workers, args.format, args.only, switches, args.interval, args.settle, args.timings)
+    print(f"Watching {len(watcher.inputs())} workbooks of {len(watcher.manifests)} manifests (Ctrl+C to stop).")
+    try:
+        asyncio.run(watcher.run())
+    except KeyboardInterrupt:
+        print("Stopped.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import json
+import math
+import os
+
+# Output backends for the 24-row result sheets.
+#
+#   "xlsx":     one workbook per scenario, one sheet per month/season, written
+#               straight through xlsxwriter in constant-memory mode (falls back
+#               to pd.ExcelWriter when xlsxwriter is not installed);
+#   "csv":      one CSV file per scenario, the sheets stacked with a 'Sheet'
+#               column (UTF-8 with BOM so Excel shows the Persian labels);
+#   "parquet":  the same long layout as the CSV, as a Parquet file;
+#   "combined": a single workbook holding every scenario, one sheet per
+#               scenario and month/season.
+#
+# Next to every output a small signature file records which inputs and
+# settings produced it, so an unchanged output is not written again. pandas
+# is only imported by the backends that need it, so checking signatures
+# stays cheap.
+
+FORMATS = ("xlsx", "csv", "parquet", "combined")
+
+EXTENSIONS = {"xlsx": ".xlsx", "csv": ".csv", "parquet": ".parquet", "combined": ".xlsx"}
+
+# Excel limits sheet names to 31 characters.
+MAX_SHEET_NAME = 31
+
+
+def output_path(output, fmt):
+    # The output file of a scenario for the given format.
+    return os.path.splitext(output)[0] + EXTENSIONS[fmt]
+
+
+def signature_path(path):
+    # Hidden sidecar file next to an output, e.g. '.Result_P11.xlsx.sig'.
+    folder, name = os.path.split(path)
+    return os.path.join(folder, f".{name}.sig")
+
+
+def read_signature(path):
+    # The signature recorded for an output, or None if there is none or the
+    # output itself is gone.
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(signature_path(path), encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def save_signature(path, signature):
+    with open(signature_path(path), "w", encoding="utf-8") as handle:
+        json.dump(signature, handle, ensure_ascii=False, indent=1)
+
+
+def cell_value(value):
+    # None for missing values (written as empty cells), plain floats otherwise.
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return float(value)
+
+
+def unique_sheet_name(sheet_name, used):
+    # The sheet name cut to MAX_SHEET_NAME characters. A name that is already
+    # in 'used' (Excel ignores case) gets a numeric suffix, ' (2)', ' (3)'...,
+    # so long scenario names that only differ at the end do not collide.
+    name = sheet_name[:MAX_SHEET_NAME]
+    number = 1
+    while name.lower() in used:
+        number += 1
+        suffix = f" ({number})"
+        name = sheet_name[:MAX_SHEET_NAME - len(suffix)] + suffix
+    used.add(name.lower())
+    return name
+
+
+def unique_sheets(named_sheets):
+    # The (sheet name, DataFrame) pairs under names Excel accepts; a sheet
+    # that had to be renamed is reported.
+    used = set()
+    for sheet_name, result_df in named_sheets:
+        name = unique_sheet_name(sheet_name, used)
+        if name != sheet_name[:MAX_SHEET_NAME]:
+            print(f"The {sheet_name} sheet is written as {name}.")
+        yield name, result_df
+
+
+def write_worksheet(workbook, sheet_name, result_df):
+    # Write one result sheet row by row, as constant-memory mode requires:
+    # the index label and the column labels, then one row per hour.
+    worksheet = workbook.add_worksheet(sheet_name)
+    worksheet.write_row(0, 0, [result_df.index.name or ""] + [str(column) for column in result_df.columns])
+    for row, (hour, values) in enumerate(zip(result_df.index, result_df.itertuples(index=False)), start=1):
+        worksheet.write(row, 0, hour)
+        for column, value in enumerate(values, start=1):
+            value = cell_value(value)
+            if value is not None:
+                worksheet.write_number(row, column, value)
+
+
+def write_workbook(named_sheets, path):
+    # Write (sheet name, DataFrame) pairs into one workbook.
+    named_sheets = unique_sheets(named_sheets)
+    try:
+        import xlsxwriter
+    except ImportError:
+        import pandas as pd
+
+        with pd.ExcelWriter(path) as writer:
+            for sheet_name, result_df in named_sheets:
+                result_df.to_excel(writer, sheet_name=sheet_name)
+        return
+
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    try:
+        for sheet_name, result_df in named_sheets:
+            write_worksheet(workbook, sheet_name, result_df)
+    finally:
+        workbook.close()
+
+
+def long_frame(sheets):
+    # Stack the sheets of a scenario into one table with a 'Sheet' column.
+    import pandas as pd
+
+    frames = [result_df.reset_index().assign(Sheet=sheet_name) for sheet_name, result_df in sheets.items()]
+    table = pd.concat(frames, ignore_index=True)
+    return table[["Sheet"] + [column for column in table.columns if column != "Sheet"]]
+
+
+def write_result(sheets, path, fmt="xlsx"):
+    # Write the result sheets of one scenario in the given format.
+    if fmt == "csv":
+        long_frame(sheets).to_csv(path, index=False, encoding="utf-8-sig")
+    elif fmt == "parquet":
+        import pandas as pd
+
+        table = long_frame(sheets)
+        # Parquet needs one type per column: missing columns become NaN. The
+        # label columns ('Sheet' and the index of every sheet) are left as is.
+        labels = {"Sheet"} | {result_df.index.name for result_df in sheets.values()}
+        for column in table.columns:
+            if column not in labels:
+                table[column] = pd.to_numeric(table[column])
+        table.to_parquet(path, index=False)
+    else:
+        write_workbook(sheets.items(), path)
+
+
+def write_combined(results, path):
+    # Write every scenario into one workbook; 'results' maps a scenario name
+    # to its sheets, and each sheet is named '<scenario> <sheet>' (cut to 31
+    # characters, with a numeric suffix where two names would collide).
+    write_workbook(
+        ((f"{name} {sheet_name}", result_df) for name, sheets in results.items() for sheet_name, result_df in sheets.items()),
+        path,
+    )
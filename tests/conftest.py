@@ -0,0 +1,50 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# The tests import the RES_* modules from the repository root and keep the
+# parsed-workbook cache of the run in a temporary folder (RES_cache reads
+# RES_CACHE_DIR when it is imported, so it is set before any test module).
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CACHE_DIR = tempfile.mkdtemp(prefix="res_cache_")
+os.environ["RES_CACHE_DIR"] = CACHE_DIR
+
+# The sample HOMER export of the README.
+SAMPLE = os.path.join(ROOT, "RES_P11.xlsx")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def sample():
+    return SAMPLE
+
+
+@pytest.fixture(scope="session")
+def manifest_scenario():
+    # The scenario of the sample workbook in one of the two shipped manifests.
+    from RES_pipeline import load_manifest, resolve_scenarios
+
+    def scenario(number, **settings):
+        manifest = load_manifest(os.path.join(ROOT, f"RES_main_{number}.json"))
+        found = next(entry for entry in resolve_scenarios(manifest, ROOT) if entry["name"] == "11")
+        found.update(settings)
+        return found
+
+    return scenario
+
+
+@pytest.fixture(scope="session")
+def sample_frame(sample):
+    # The sample workbook read directly with pandas (units row dropped), the
+    # reference the reducing stages are compared with.
+    import pandas as pd
+
+    return pd.read_excel(sample, skiprows=[1]).set_index("Time").astype(float)
@@ -0,0 +1,146 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from RES_battery import BatteryCycles, rainflow, turning_points
+from RES_kpi import STATE_OF_CHARGE
+
+# The vectorized rainflow counting against the sequential algorithm of ASTM
+# E1049-85 (5.4.4), one turning point at a time, and the block-by-block
+# Battery sheet against the one of the whole series.
+
+SEASONS = {"Winter": [1, 2, 3], "Spring": [4, 5, 6], "Summer": [7, 8, 9], "Autumn": [10, 11, 12]}
+HOUR_NS = 3600 * 10**9
+
+
+def astm_rainflow(values):
+    # {range: cycles} with half cycles of 0.5, as in ASTM E1049 5.4.4.
+    counts = Counter()
+    points = []
+    for value in values:
+        points.append(value)
+        while len(points) >= 3:
+            x = abs(points[-1] - points[-2])
+            y = abs(points[-2] - points[-3])
+            if x < y:
+                break
+            if len(points) == 3:
+                counts[y] += 0.5
+                del points[0]
+            else:
+                counts[y] += 1.0
+                del points[-3:-1]
+    for first, second in zip(points, points[1:]):
+        counts[abs(second - first)] += 0.5
+    return counts
+
+
+def vectorized_rainflow(values):
+    # The same {range: cycles} from RES_battery: full cycles, then the
+    # residue as half cycles.
+    points = values[turning_points(values)]
+    starts, ends, residue = rainflow(points)
+    counts = Counter()
+    for depth in np.abs(points[ends] - points[starts]):
+        counts[depth] += 1.0
+    for depth in np.abs(np.diff(points[residue])):
+        counts[depth] += 0.5
+    return counts
+
+
+def without_zeros(counts):
+    return {depth: cycles for depth, cycles in counts.items() if depth > 0}
+
+
+def test_the_astm_example():
+    # ASTM E1049 fig. 6: ranges 3 (0.5), 4 (1.5), 6 (0.5), 8 (1) and 9 (0.5).
+    values = np.array([-2, 1, -3, 5, -1, 3, -4, 4, -2], dtype=float)
+    assert vectorized_rainflow(values) == astm_rainflow(values) == {3: 0.5, 4: 1.5, 6: 0.5, 8: 1.0, 9: 0.5}
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_rainflow_matches_the_sequential_algorithm(seed):
+    # Rounded random walks, so equal ranges and flat stretches occur.
+    rng = np.random.default_rng(seed)
+    for _ in range(20):
+        values = np.round(rng.normal(size=rng.integers(1, 300)).cumsum(), 1)
+        assert without_zeros(vectorized_rainflow(values)) == without_zeros(astm_rainflow(values[turning_points(values)]))
+
+
+def sequential_cycles(values):
+    # (start, end) of every full cycle and the residue of the sequential
+    # four-point rule on a stack of turning points.
+    stack, cycles = [], []
+    for position in range(len(values)):
+        stack.append(position)
+        while len(stack) >= 4:
+            a, b, c, d = values[stack[-4:]]
+            if abs(b - c) > abs(a - b) or abs(b - c) > abs(c - d):
+                break
+            cycles.append(tuple(stack[-3:-1]))
+            del stack[-3:-1]
+    return sorted(cycles), stack
+
+
+@pytest.mark.parametrize("kind", ["walk", "clipped", "levels"])
+def test_rainflow_finds_the_same_cycles_as_the_sequential_rule(kind):
+    # Clipped walks and a few levels give many equal ranges, where the
+    # cycle picked (and so the time it starts) depends on the order.
+    rng = np.random.default_rng(len(kind))
+    for _ in range(200):
+        rows = rng.integers(4, 400)
+        if kind == "walk":
+            values = rng.normal(size=rows).cumsum()
+        elif kind == "clipped":
+            values = np.clip(50 + np.cumsum(rng.normal(0, 30, rows)), 0, 100)
+        else:
+            values = rng.integers(0, 4, rows).astype(float)
+        points = values[turning_points(values)]
+        starts, ends, residue = rainflow(points)
+        assert (sorted(zip(starts.tolist(), ends.tolist())), residue.tolist()) == sequential_cycles(points)
+
+
+def state_of_charge(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.clip(50 + np.cumsum(rng.normal(0, 4, rows)), 0, 100)
+
+
+def stamps_of(rows):
+    return np.datetime64("2024-01-01", "ns").astype(np.int64) + np.arange(rows) * HOUR_NS
+
+
+def test_the_battery_sheet_matches_the_sequential_algorithm():
+    rows = 2 * 8760
+    charge = state_of_charge(rows)
+    cycles = BatteryCycles(SEASONS)
+    cycles.add(stamps_of(rows), {STATE_OF_CHARGE: charge})
+    sheet = cycles.result()
+    reference = astm_rainflow(charge[turning_points(charge)])
+    years = rows / 8760
+    assert np.isclose(sheet.loc["Depth-weighted cycles", "Annual"] * years, sum(d * n for d, n in reference.items()) / 100)
+    assert np.isclose(sheet.loc["Rainflow cycles", "Annual"] * years, sum(n for d, n in reference.items() if d > 0))
+    # Every cycle belongs to exactly one season.
+    assert np.isclose(sheet.loc["Rainflow cycles", list(SEASONS)].sum(), sheet.loc["Rainflow cycles", "Annual"])
+
+
+@pytest.mark.parametrize("block_rows", [1, 7, 1000, 8760])
+def test_blocks_give_the_same_sheet(block_rows):
+    rows = 3 * 8760 if block_rows > 1 else 2000
+    stamps, charge = stamps_of(rows), state_of_charge(rows, seed=block_rows)
+    charge[::97] = np.nan
+    whole = BatteryCycles(SEASONS)
+    whole.add(stamps, {STATE_OF_CHARGE: charge})
+    blocks = BatteryCycles(SEASONS)
+    for first in range(0, rows, block_rows):
+        blocks.add(stamps[first:first + block_rows], {STATE_OF_CHARGE: charge[first:first + block_rows]})
+    expected = whole.result()
+    sheet = blocks.result()
+    assert list(sheet.index) == list(expected.index)
+    assert np.allclose(sheet.to_numpy(), expected.to_numpy(), equal_nan=True)
+
+
+def test_a_file_without_battery_columns_gives_an_empty_sheet():
+    cycles = BatteryCycles(SEASONS)
+    cycles.add(stamps_of(48), {"Total Electrical Load Served": np.ones(48)})
+    assert cycles.result().isna().all().all()
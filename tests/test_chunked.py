@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from RES_cache import load_cached
+from RES_chunked import aggregate_file, binned_chunks
+from RES_pipeline import process_scenario
+from RES_profiles import seasonal_sheets
+
+# The chunked path (RES_chunked) has to give the same sheets as the
+# in-memory one, whatever the size of the blocks.
+
+
+def assert_same_sheets(sheets, expected):
+    assert list(sheets) == list(expected)
+    for name, sheet in expected.items():
+        assert list(sheets[name].columns) == list(sheet.columns)
+        assert list(sheets[name].index) == list(sheet.index)
+        assert np.allclose(sheets[name].astype(float), sheet.astype(float), equal_nan=True), name
+
+
+@pytest.mark.parametrize("number", [1, 2])
+@pytest.mark.parametrize("extra", [{}, {"kpi": True, "battery": True}])
+def test_chunked_scenario_matches_in_memory(manifest_scenario, number, extra):
+    expected = process_scenario(manifest_scenario(number, **extra))
+    assert_same_sheets(process_scenario(manifest_scenario(number, chunked=True, **extra)), expected)
+
+
+@pytest.mark.parametrize("stat", ["mean", "std", "min", "max"])
+def test_small_blocks_match_in_memory(manifest_scenario, stat):
+    # Blocks of 1000 rows split days and months across blocks.
+    scenario = manifest_scenario(2)
+    df = load_cached(scenario["input"], list(scenario["columns"]))
+    accumulator = aggregate_file(scenario["input"], scenario["columns"], scenario["seasons"], chunk_rows=1000)
+    assert_same_sheets(
+        accumulator.seasonal_sheets(scenario["columns"], stat),
+        seasonal_sheets(df, scenario["columns"], scenario["seasons"], stat),
+    )
+
+
+def test_small_blocks_match_the_mid_month_days(manifest_scenario):
+    scenario = manifest_scenario(1)
+    accumulator = aggregate_file(
+        scenario["input"], scenario["columns"], months=list(scenario["months"]), day=scenario["day"], chunk_rows=777
+    )
+    assert_same_sheets(
+        accumulator.mid_month_sheets(scenario["columns"], scenario["months"]), process_scenario(scenario)
+    )
+
+
+@pytest.mark.parametrize("chunk_rows", [10, 64, 1000])
+def test_a_time_reset_starts_new_bins(chunk_rows):
+    # Two sites of 15-minute rows, the second starting over at the same
+    # time; wherever the blocks are cut, every site is averaged on its own.
+    rng = np.random.default_rng(12)
+    index = pd.date_range("2025-01-01 00:30", periods=4 * 48 - 2, freq="15min", name="Time")
+    sites = [
+        pd.DataFrame({"PV": rng.uniform(0, 3, len(index)), "Load": rng.uniform(0, 1, len(index))}, index=index)
+        for _ in range(2)
+    ]
+    sites[1].iloc[5:9, 0] = np.nan
+    rows = pd.concat(sites)
+    columns = {"Time": rows.index.to_numpy(), "PV": rows["PV"].to_numpy(), "Load": rows["Load"].to_numpy()}
+    chunks = (
+        {name: values[start:start + chunk_rows] for name, values in columns.items()}
+        for start in range(0, len(rows), chunk_rows)
+    )
+    blocks = list(binned_chunks(chunks, ["PV", "Load"]))
+    stamps = np.concatenate([block[0] for block in blocks]).astype("datetime64[ns]")
+    values = np.concatenate([block[1] for block in blocks])
+    expected = pd.concat([site.resample("60min").mean() for site in sites])
+    assert np.array_equal(stamps, expected.index.to_numpy())
+    assert np.allclose(values, expected.to_numpy(), equal_nan=True)
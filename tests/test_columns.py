@@ -0,0 +1,87 @@
+import pytest
+
+from RES_columns import ColumnIndex, column_role, normalize
+
+# Resolution of requested column names: other spellings and components of
+# the same quantity are found and reported, other quantities never are.
+
+HEADER = [
+    "Time",
+    "Generic flat plate PV Power Output",
+    "Bergey Excel 10 Power Output",
+    "Generic 1kWh Li-Ion Input Power",
+    "Generic 1kWh Li-Ion State of Charge (%)",
+    "AC Operating Capacity",
+    "AC Required Operating Capacity",
+    "Total Electrical Load Served",
+    "Excess Electrical Production",
+    "Grid Purchases",
+    "Autosize Genset Power Output",
+]
+
+
+@pytest.fixture
+def index():
+    return ColumnIndex(HEADER)
+
+
+@pytest.mark.parametrize("name, column, match", [
+    ("Grid Purchases", "Grid Purchases", "exact"),
+    ("grid  purchases (kW)", "Grid Purchases", "normalized"),
+    ("Generic 3 kW Power Output", "Bergey Excel 10 Power Output", "role"),
+    ("Generic 1kWh Lead Acid Input Power", "Generic 1kWh Li-Ion Input Power", "role"),
+    ("Generic 1 kWh Lead Acid State of Charge", "Generic 1kWh Li-Ion State of Charge (%)", "role"),
+    ("Total Electrcal Load Served", "Total Electrical Load Served", "fuzzy"),
+    ("Excess Electric Production", "Excess Electrical Production", "fuzzy"),
+])
+def test_the_same_quantity_is_found(index, name, column, match):
+    position, found = index.find(name)
+    assert (HEADER[position], found) == (column, match)
+
+
+@pytest.mark.parametrize("name", [
+    "DC Operating Capacity",
+    "DC Required Operating Capacity",
+    "Total Electrical Load",
+    "Excess Electrical Production Rate",
+    "Generic 1kWh Li-Ion Output Power",
+    "Grid Sales",
+    "Unmet Electrical Load",
+])
+def test_other_quantities_are_missing(index, name):
+    assert index.find(name) == (None, "missing")
+
+
+def test_substitutions_are_reported(index):
+    found, notes = index.resolve(["Grid Purchases", "Generic 3 kW Power Output", "Total Electrcal Load Served"])
+    assert found["Generic 3 kW Power Output"] == "Bergey Excel 10 Power Output"
+    assert notes == [
+        "The Generic 3 kW Power Output column is read from the Bergey Excel 10 Power Output column.",
+        "The Total Electrcal Load Served column is read from the Total Electrical Load Served column.",
+    ]
+
+
+def test_a_role_shared_by_several_columns_is_ambiguous():
+    index = ColumnIndex(HEADER + ["Enercon E-33 Power Output"])
+    assert index.find("Generic 3 kW Power Output") == (None, "ambiguous")
+    found, notes = index.resolve(["Generic 3 kW Power Output"])
+    assert found == {}
+    assert notes == [
+        "The Generic 3 kW Power Output column matches several columns "
+        "(Bergey Excel 10 Power Output, Enercon E-33 Power Output)."
+    ]
+
+
+@pytest.mark.parametrize("name, role", [
+    ("Generic 3 kW Power Output", "wind output"),
+    ("Vestas V47 Power Output", "wind output"),
+    ("Generic flat plate PV Power Output", "pv output"),
+    ("Autosize Genset Power Output", None),
+    ("Generic 10 kW Hydro Power Output", None),
+    ("Generic 100kW Generator Power Output", None),
+    ("Converter Inverter Power Output", None),
+    ("Generic 1kWh Lead Acid Maximum Charge Power", None),
+    ("Generic 1kWh Lead Acid Discharge Power", "battery discharge"),
+])
+def test_roles(name, role):
+    assert column_role(normalize(name)) == role
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from RES_compare import ScenarioStore
+from RES_pipeline import process_scenario
+
+# The comparison workbook against the seasonal hour-of-day means computed
+# directly with pandas on the sample workbook. Three scenarios are compared:
+# the sample ("11"), the same sheets doubled ("double"), and the sample with
+# another column set ("grid"), whose excess production no other scenario has.
+
+SEASONS = {"Winter": [1, 2, 3], "Spring": [4, 5, 6], "Summer": [7, 8, 9], "Autumn": [10, 11, 12]}
+
+PV = "Generic flat plate PV Power Output"
+EXCESS = "Excess Electrical Production"
+
+
+@pytest.fixture(scope="module")
+def store(manifest_scenario):
+    scenario = manifest_scenario(2)
+    sheets = process_scenario(dict(scenario, columns=dict(zip(scenario["columns"], ["PV", "Battery", "Load"]))))
+    grid = process_scenario(dict(scenario, columns={PV: "PV", EXCESS: "Excess"}))
+    double = {period: df * 2 for period, df in sheets.items()}
+    return ScenarioStore.from_results({"11": sheets, "double": double, "grid": grid})
+
+
+@pytest.fixture(scope="module")
+def hourly(sample_frame):
+    # {season: hour-of-day means of the PV and excess columns}.
+    return {
+        season: sample_frame[sample_frame.index.month.isin(months)].groupby(lambda stamp: stamp.hour)[[PV, EXCESS]].mean()
+        for season, months in SEASONS.items()
+    }
+
+
+def test_the_store_is_aligned_on_the_union_of_the_columns(store):
+    assert store.scenarios == ["11", "double", "grid"]
+    assert store.periods == list(SEASONS)
+    assert store.hours == list(range(24))
+    assert store.columns == ["PV", "Battery", "Load", "Excess"]
+    assert np.isnan(store.values[0, :, :, 3]).all()
+    assert np.isnan(store.values[2, :, :, 1:3]).all()
+
+
+def test_totals_deltas_ratios_and_ranks(store, hourly):
+    sheets = store.summary("11")
+    assert list(sheets) == ["Totals", "Delta", "Ratio", "Rank"] + [f"Δ {season}" for season in SEASONS]
+    for season, means in hourly.items():
+        pv, excess = means[PV].sum(), means[EXCESS].sum()
+        totals = sheets["Totals"]
+        assert totals.loc[["11", "double", "grid"], f"{season} PV"].to_numpy() == pytest.approx([pv, 2 * pv, pv])
+        assert totals.loc["grid", f"{season} Excess"] == pytest.approx(excess)
+        assert np.isnan(totals.loc[["11", "double"], f"{season} Excess"]).all()
+
+        assert sheets["Delta"][f"{season} PV"].to_numpy() == pytest.approx([0, pv, 0])
+        assert sheets["Ratio"][f"{season} PV"].to_numpy() == pytest.approx([1, 2, 1])
+        # Without a baseline value there is no delta or ratio.
+        assert f"{season} Excess" not in sheets["Delta"]
+        assert sheets["Rank"][f"{season} PV"].tolist() == [2, 1, 2]
+        assert sheets["Rank"][f"{season} Excess"].isna().tolist() == [True, True, False]
+
+
+def test_hourly_deltas(store, hourly):
+    sheets = store.summary("grid")
+    for season, means in hourly.items():
+        delta = sheets[f"Δ {season}"]
+        assert list(delta.index) == list(range(24))
+        assert np.allclose(delta["double PV"], means[PV])
+        assert np.allclose(delta["11 PV"], 0)
+        assert np.allclose(delta["grid Excess"], 0)
+
+
+def test_the_baseline_has_to_be_a_scenario(store):
+    with pytest.raises(ValueError, match="baseline scenario"):
+        store.summary("12")
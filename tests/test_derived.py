@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from RES_cache import load_cached
+from RES_compact import compact_frame
+from RES_derived import (
+    BATTERY_INPUT,
+    DERIVED,
+    EXCESS,
+    LOAD_SERVED,
+    PV_OUTPUT,
+    TOTAL_RENEWABLE,
+    WIND_OUTPUT,
+    ColumnEngine,
+    derive_chunks,
+    is_available,
+    raw_columns,
+    with_derived,
+)
+
+# The derived columns of the sample workbook against the same quantities
+# written out directly in pandas.
+
+
+@pytest.fixture(scope="module")
+def expected(sample_frame):
+    df = sample_frame
+    renewable = df[TOTAL_RENEWABLE]
+    used = (renewable - df[EXCESS]).clip(lower=0)
+    load = df[LOAD_SERVED]
+    return pd.DataFrame({
+        "Renewable Output": renewable,
+        "Net Load": load - renewable,
+        "Battery Charge Power": df[BATTERY_INPUT].clip(lower=0),
+        "Battery Discharge Power": (-df[BATTERY_INPUT]).clip(lower=0),
+        "Self-Consumed Renewable": used,
+        "Self-Consumption Ratio": (used / renewable).where(renewable > 0),
+        "Renewable Fraction": (np.minimum(used, load) / load).where(load > 0),
+    })
+
+
+def test_only_the_raw_columns_needed_are_loaded():
+    assert set(raw_columns(["Net Load"])) == {LOAD_SERVED, TOTAL_RENEWABLE, PV_OUTPUT, WIND_OUTPUT}
+    assert raw_columns(["Battery Charge Power", LOAD_SERVED]) == [LOAD_SERVED, BATTERY_INPUT]
+
+
+def test_derived_columns_match_pandas(sample, expected):
+    names = list(DERIVED)
+    df = with_derived(load_cached(sample, raw_columns(names)), names)
+    for name in names:
+        assert np.allclose(df[name], expected[name], equal_nan=True), name
+    assert df["Self-Consumption Ratio"].isna().any()
+
+
+def test_compact_columns_stay_float32(sample, expected):
+    df = with_derived(compact_frame(load_cached(sample, raw_columns(["Net Load"]))), ["Net Load"])
+    assert df["Net Load"].dtype == np.float32
+    assert np.allclose(df["Net Load"], expected["Net Load"], atol=1e-4)
+
+
+def test_blocks_give_the_same_columns(sample_frame, expected):
+    chunks = [
+        {name: sample_frame[name].to_numpy()[start:start + 1000] for name in (LOAD_SERVED, TOTAL_RENEWABLE, EXCESS)}
+        for start in range(0, len(sample_frame), 1000)
+    ]
+    blocks = list(derive_chunks(chunks, ["Renewable Fraction", "Battery Charge Power"]))
+    assert all("Battery Charge Power" not in block for block in blocks)
+    fraction = np.concatenate([block["Renewable Fraction"] for block in blocks])
+    assert np.allclose(fraction, expected["Renewable Fraction"], equal_nan=True)
+
+
+def test_renewable_output_without_homer_total():
+    engine = ColumnEngine(
+        {PV_OUTPUT: np.array([1.0, 2.0]), WIND_OUTPUT: np.array([0.5, 0.0]), LOAD_SERVED: np.array([2.0, 1.0])}
+    )
+    assert engine.column("Net Load").tolist() == [0.5, -1.0]
+    # Computed once and shared by the columns that need it.
+    assert engine.values["Renewable Output"] is engine.column("Renewable Output")
+
+
+def test_availability():
+    assert is_available("Renewable Output", {WIND_OUTPUT})
+    assert not is_available("Renewable Output", {LOAD_SERVED})
+    assert not is_available("Net Load", {TOTAL_RENEWABLE})
+    assert not is_available("Unknown", {LOAD_SERVED})
+    assert with_derived(pd.DataFrame({LOAD_SERVED: [1.0]}), ["Net Load"]).columns.tolist() == [LOAD_SERVED]
@@ -0,0 +1,160 @@
+import json
+import os
+
+import pytest
+
+from RES_incremental import REASONS, chart_record, scenario_record, stale_reasons
+from RES_pipeline import DEFAULT_MONTHS, DEFAULT_SEASONS, select_stale
+from RES_writer import save_signature
+
+# When an output counts as stale: every field of the dependency record that
+# changes has to give its reason, and nothing else may. The records go
+# through JSON like the signature files they are stored in.
+
+
+@pytest.fixture
+def scenario(tmp_path):
+    workbook = tmp_path / "RES_P11.xlsx"
+    workbook.write_bytes(b"first export")
+    return {
+        "name": "11",
+        "input": str(workbook),
+        "output": str(tmp_path / "Result_P11.xlsx"),
+        "columns": {"Total Electrical Load Served": "بار"},
+        "mode": "mid_month",
+        "day": 15,
+        "months": dict(DEFAULT_MONTHS),
+        "seasons": {name: list(months) for name, months in DEFAULT_SEASONS.items()},
+        "typical_days": 1,
+        "quantiles": [10.0, 50.0, 90.0],
+        "bin_minutes": 60,
+        "chunked": False,
+        "kpi": False,
+        "battery": False,
+        "compact": False,
+    }
+
+
+def stored(scenario, fmt="xlsx"):
+    return json.loads(json.dumps(scenario_record(scenario, fmt)))
+
+
+def reasons_after(scenario, change, fmt="xlsx"):
+    previous = stored(scenario)
+    change(scenario)
+    return stale_reasons(previous, scenario_record(scenario, fmt, previous["input"]))
+
+
+def move_winter(scenario):
+    scenario["seasons"]["Winter"] = [12, 1, 2]
+
+
+def test_an_output_without_a_record_is_stale(scenario):
+    assert stale_reasons(None, scenario_record(scenario, "xlsx")) == ["there is no previous output"]
+
+
+def test_an_unchanged_scenario_is_up_to_date(scenario):
+    assert reasons_after(scenario, lambda scenario: None) == []
+
+
+def test_a_touched_but_unchanged_input_is_up_to_date(scenario):
+    previous = stored(scenario)
+    stat = os.stat(scenario["input"])
+    os.utime(scenario["input"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert stale_reasons(previous, scenario_record(scenario, "xlsx", previous["input"])) == []
+
+
+def test_a_rewritten_input_is_stale(scenario):
+    def rewrite(scenario):
+        with open(scenario["input"], "wb") as handle:
+            handle.write(b"second export")
+    assert reasons_after(scenario, rewrite) == [REASONS["input"]]
+
+
+# Turning the KPI or Battery sheet on also brings the seasons into the
+# periods of a mid-month output.
+@pytest.mark.parametrize("fields, change", [
+    (["columns"], lambda scenario: scenario["columns"].update({"Grid Purchases": "خرید از شبکه"})),
+    (["periods"], lambda scenario: scenario.update(day=14)),
+    (["periods"], lambda scenario: scenario["months"].update({8: "Aug"})),
+    (["periods"], lambda scenario: scenario.update(bin_minutes=15)),
+    (["periods", "kpi"], lambda scenario: scenario.update(kpi=True)),
+    (["periods", "battery"], lambda scenario: scenario.update(battery=True)),
+    (["compact"], lambda scenario: scenario.update(compact=True)),
+])
+def test_a_changed_setting_is_stale(scenario, fields, change):
+    assert reasons_after(scenario, change) == [REASONS[field] for field in fields]
+
+
+def test_a_changed_format_is_stale(scenario):
+    previous = stored(scenario)
+    assert stale_reasons(previous, scenario_record(scenario, "csv", previous["input"])) == [REASONS["format"]]
+
+
+def test_the_seasons_of_a_mid_month_output_do_not_matter(scenario):
+    assert reasons_after(scenario, move_winter) == []
+
+
+@pytest.mark.parametrize("sheet", ["kpi", "battery"])
+def test_the_seasons_of_the_kpi_and_battery_sheets_matter_in_mid_month_mode(scenario, sheet):
+    # The KPI and Battery sheets have a column per season even when the
+    # profiles are mid-month days.
+    scenario[sheet] = True
+    assert reasons_after(scenario, move_winter) == [REASONS["periods"]]
+
+
+@pytest.mark.parametrize("mode, change", [
+    ("seasonal", move_winter),
+    ("representative", move_winter),
+    ("representative", lambda scenario: scenario.update(typical_days=3)),
+    ("distribution", move_winter),
+    ("distribution", lambda scenario: scenario.update(quantiles=[5.0, 50.0, 95.0])),
+])
+def test_the_periods_of_each_mode(scenario, mode, change):
+    scenario["mode"] = mode
+    assert reasons_after(scenario, change) == [REASONS["periods"]]
+
+
+def test_the_months_of_a_seasonal_output_do_not_matter(scenario):
+    scenario["mode"] = "seasonal"
+    assert reasons_after(scenario, lambda scenario: scenario["months"].update({8: "Aug"})) == []
+
+
+def test_select_stale_reads_the_signature_of_the_output(scenario, capsys):
+    # An output on disk with its signature is skipped until its scenario
+    # changes.
+    with open(scenario["output"], "wb") as handle:
+        handle.write(b"result")
+    save_signature(scenario["output"], scenario_record(scenario, "xlsx"))
+    stale, records = select_stale([scenario], "xlsx", None)
+    assert stale == []
+    assert "is up to date" in capsys.readouterr().out
+
+    scenario["kpi"] = True
+    stale, records = select_stale([scenario], "xlsx", None)
+    assert stale == [scenario]
+    assert REASONS["kpi"] in capsys.readouterr().out
+    assert select_stale([scenario], "xlsx", None, force=True)[0] == [scenario]
+
+
+def test_missing_charts_rebuild_an_output(scenario, tmp_path, capsys):
+    plots = {"dir": str(tmp_path / "charts"), "format": "png"}
+    chart = tmp_path / "charts" / "11_May.png"
+    with open(scenario["output"], "wb") as handle:
+        handle.write(b"result")
+    save_signature(scenario["output"], scenario_record(scenario, "xlsx"))
+    assert select_stale([scenario], "xlsx", None, plots=plots)[0] == [scenario]
+    assert "the charts are missing" in capsys.readouterr().out
+
+    chart.parent.mkdir()
+    chart.write_bytes(b"chart")
+    record = scenario_record(scenario, "xlsx")
+    record["charts"] = chart_record([str(chart)], plots)
+    save_signature(scenario["output"], record)
+    stale, records = select_stale([scenario], "xlsx", None, plots=plots)
+    assert stale == [] and records["11"]["charts"] == record["charts"]
+    assert select_stale([scenario], "xlsx", None, plots=dict(plots, format="svg"))[0] == [scenario]
+    assert select_stale([scenario], "xlsx", None)[0] == []
+
+    chart.unlink()
+    assert select_stale([scenario], "xlsx", None, plots=plots)[0] == [scenario]
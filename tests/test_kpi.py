@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from RES_cache import load_cached
+from RES_compact import compact_frame
+from RES_derived import BATTERY_INPUT, EXCESS, LOAD_SERVED, TOTAL_RENEWABLE, raw_columns
+from RES_kpi import (
+    CAPACITY_KPI,
+    CAPACITY_SHORTAGE,
+    CYCLES_KPI,
+    ENERGY_CONTENT,
+    KPI_COLUMNS,
+    STATE_OF_CHARGE,
+    UNMET_LOAD,
+    EnergyBalance,
+    kpi_sheet,
+)
+
+# The KPI sheet of the sample workbook against sums of its hourly columns
+# taken by hand (the export is one year of hourly rows, so every kW value is
+# a kWh of that year).
+
+SEASONS = {"Winter": [1, 2, 3], "Spring": [4, 5, 6], "Summer": [7, 8, 9], "Autumn": [10, 11, 12]}
+
+
+@pytest.fixture(scope="module")
+def frame(sample):
+    return load_cached(sample, raw_columns(KPI_COLUMNS))
+
+
+@pytest.fixture(scope="module")
+def expected(sample_frame):
+    df = sample_frame
+    powers = pd.DataFrame({
+        "Energy delivered (kWh)": df[LOAD_SERVED],
+        "Renewable production (kWh)": df[TOTAL_RENEWABLE],
+        "Excess production (kWh)": df[EXCESS],
+        "Unmet load (kWh)": df[UNMET_LOAD],
+        "Capacity shortage (kWh)": df[CAPACITY_SHORTAGE],
+        "Battery charge (kWh)": df[BATTERY_INPUT].clip(lower=0),
+        "Battery throughput (kWh)": (-df[BATTERY_INPUT]).clip(lower=0),
+    })
+    periods = {"Annual": list(range(1, 13)), **SEASONS}
+    table = pd.DataFrame({period: powers[df.index.month.isin(months)].sum() for period, months in periods.items()})
+    charged = df[STATE_OF_CHARGE] > 0
+    capacity = (df[ENERGY_CONTENT][charged] / (df[STATE_OF_CHARGE][charged] / 100)).mean()
+    table.loc[CYCLES_KPI] = table.loc["Battery throughput (kWh)"] / capacity
+    table.loc[CAPACITY_KPI] = capacity
+    return table
+
+
+def assert_same_kpis(sheet, expected, rtol=1e-9):
+    assert list(sheet.columns) == ["Annual"] + list(SEASONS)
+    for label, row in expected.iterrows():
+        assert np.allclose(sheet.loc[label], row, rtol=rtol), label
+
+
+def test_energy_totals_match_hand_computed_sums(frame, expected):
+    sheet = kpi_sheet(frame, SEASONS)
+    assert sheet.index.name == "KPI"
+    assert_same_kpis(sheet, expected)
+    # The sample has no grid.
+    assert sheet.loc[["Grid purchases (kWh)", "Grid sales (kWh)"]].isna().all().all()
+    assert np.isclose(sheet.loc["Energy delivered (kWh)", list(SEASONS)].sum(), sheet.loc["Energy delivered (kWh)", "Annual"])
+
+
+def test_blocks_and_compact_frames_give_the_same_totals(frame, expected):
+    balance = EnergyBalance(SEASONS)
+    for start in range(0, len(frame), 1000):
+        block = frame.iloc[start:start + 1000]
+        balance.add(block.index, {name: block[name].to_numpy() for name in block.columns})
+    assert_same_kpis(balance.result(), expected)
+    # float32 columns: the totals only differ by their rounding.
+    assert_same_kpis(kpi_sheet(compact_frame(frame, exact=[STATE_OF_CHARGE]), SEASONS), expected, rtol=1e-5)
+
+
+def test_totals_are_per_year_whatever_the_step(frame, expected):
+    # Two years of the same data, and the year at a 30-minute step.
+    later = frame.set_axis(frame.index + pd.Timedelta(days=365), axis=0)
+    two_years = pd.concat([frame, later])
+    assert_same_kpis(kpi_sheet(two_years, SEASONS), expected)
+    halves = pd.concat([frame, frame.set_axis(frame.index + pd.Timedelta(minutes=30), axis=0)]).sort_index()
+    assert_same_kpis(kpi_sheet(halves, SEASONS), expected)
@@ -0,0 +1,116 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import RES_pipeline
+from RES_pipeline import process_scenario, run_scenarios
+from RES_writer import write_result
+
+# Parity of the manifest-driven pipeline with the original scripts: the
+# first block of RES_main_1.py (mid-month days) and of RES_main_2.py
+# (seasonal hour-of-day means) as they were before the pipeline replaced
+# them, run on the sample workbook, must write the same sheets.
+
+TARGET_COLUMNS = {
+    "Generic flat plate PV Power Output": "خروجی سلول خورشیدی",
+    "Generic 1kWh Lead Acid Input Power": "ورودی باتری",
+    "Total Electrical Load Served": "بار",
+}
+TARGET_MONTHS = {2: "February", 5: "May", 8: "August", 11: "November"}
+SEASON_MONTHS = {"Winter": [1, 2, 3], "Spring": [4, 5, 6], "Summer": [7, 8, 9], "Autumn": [10, 11, 12]}
+
+
+@pytest.fixture(scope="module")
+def baseline_frame(sample):
+    df = pd.read_excel(sample)
+    df.columns = [col.encode("latin1").decode("utf-8", errors="ignore") if isinstance(col, str) else col for col in df.columns]
+    df["Time"] = pd.to_datetime(df["Time"], errors="coerce")
+    return df.set_index("Time")
+
+
+def baseline_main_1(df, path):
+    with pd.ExcelWriter(path) as writer:
+        for month_num, month_name in TARGET_MONTHS.items():
+            result_df = pd.DataFrame()
+            for orig_col, new_col in TARGET_COLUMNS.items():
+                if orig_col in df.columns:
+                    filtered = df[(df.index.month == month_num) & (df.index.day == 15)][orig_col]
+                    if len(filtered) >= 24:
+                        result_df[new_col] = filtered.iloc[:24].values
+                    else:
+                        result_df[new_col] = [None] * 24
+                else:
+                    result_df[new_col] = [None] * 24
+            result_df.index = list(range(24))
+            result_df.index.name = "Hour"
+            result_df.to_excel(writer, sheet_name=month_name)
+
+
+def baseline_main_2(df, path):
+    with pd.ExcelWriter(path) as writer:
+        for season_name, months_in_season in SEASON_MONTHS.items():
+            season_data = df[df.index.month.isin(months_in_season)].copy()
+            season_data["Hour"] = season_data.index.hour
+            result_df = pd.DataFrame()
+            for orig_col, new_col in TARGET_COLUMNS.items():
+                if orig_col in season_data.columns:
+                    hourly_mean = season_data.groupby("Hour")[orig_col].mean()
+                    result_df[new_col] = hourly_mean.reindex(range(24), fill_value=None).values
+                else:
+                    result_df[new_col] = [None] * 24
+            result_df.index = list(range(24))
+            result_df.index.name = "Hour"
+            result_df.to_excel(writer, sheet_name=season_name)
+
+
+def assert_same_workbook(path, expected_path):
+    written = pd.read_excel(path, sheet_name=None, index_col=0)
+    expected = pd.read_excel(expected_path, sheet_name=None, index_col=0)
+    assert list(written) == list(expected)
+    for name, sheet in expected.items():
+        assert list(written[name].columns) == list(sheet.columns)
+        assert list(written[name].index) == list(sheet.index)
+        assert np.allclose(written[name].astype(float), sheet.astype(float), equal_nan=True), name
+
+
+@pytest.mark.parametrize("number, baseline", [(1, baseline_main_1), (2, baseline_main_2)])
+def test_pipeline_matches_the_original_scripts(number, baseline, baseline_frame, manifest_scenario, tmp_path):
+    scenario = manifest_scenario(number)
+    assert scenario["columns"] == TARGET_COLUMNS
+    baseline(baseline_frame, tmp_path / "baseline.xlsx")
+    write_result(process_scenario(scenario), str(tmp_path / "pipeline.xlsx"))
+    assert_same_workbook(tmp_path / "pipeline.xlsx", tmp_path / "baseline.xlsx")
+
+
+@pytest.mark.parametrize("mode", ["mid_month", "seasonal", "representative"])
+def test_compact_frames_give_the_same_sheets(mode, manifest_scenario):
+    # The stages read the float32 columns and step numbers of a compact
+    # frame as they are; the sheets only differ by float32 rounding.
+    scenario = manifest_scenario(2, mode=mode, kpi=True, battery=True, typical_days=1)
+    expected = process_scenario(dict(scenario, compact=False))
+    sheets = process_scenario(dict(scenario, compact=True))
+    assert list(sheets) == list(expected)
+    for name, sheet in expected.items():
+        assert sheets[name].index.equals(sheet.index), name
+        assert list(sheets[name].columns) == list(sheet.columns), name
+        assert np.allclose(sheets[name].astype(float), sheet.astype(float), rtol=1e-4, atol=1e-3, equal_nan=True), name
+
+
+def test_an_unexpected_error_fails_only_its_scenario(manifest_scenario, monkeypatch, tmp_path, capsys):
+    # An error outside the expected I/O and value errors is reported with
+    # its type, and the other scenarios are still written.
+    broken = manifest_scenario(1, name="broken", output=str(tmp_path / "Result_broken.xlsx"))
+    working = manifest_scenario(1, output=str(tmp_path / "Result_P11.xlsx"))
+    instrumented = RES_pipeline.instrumented_scenario
+
+    def fail_broken(scenario, instrument=None):
+        if scenario["name"] == "broken":
+            raise TypeError("unsupported operand")
+        return instrumented(scenario, instrument)
+
+    monkeypatch.setattr(RES_pipeline, "instrumented_scenario", fail_broken)
+    assert run_scenarios([broken, working], force=True) == ["broken"]
+    assert "could not be processed: TypeError: unsupported operand" in capsys.readouterr().out
+    assert os.path.exists(working["output"]) and not os.path.exists(broken["output"])
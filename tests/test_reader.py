@@ -0,0 +1,81 @@
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from RES_bench import CONTENT_TYPES, ROOT_RELS, STYLES, WORKBOOK, WORKBOOK_RELS
+from RES_reader import CELL_PATTERN, load_homer
+
+# The streaming reader against pd.read_excel on small hand-written sheets,
+# and the cell matching on the XML HOMER and Excel write.
+
+HEADER = ["Time", "PV Power Output", "Load Served", "Grid Purchases"]
+
+# 2025-01-01 00:00 as an Excel serial date.
+START = 45658
+
+
+def cell(reference, value=None, style=None):
+    style = f' s="{style}"' if style is not None else ""
+    if value is None:
+        return f'<c r="{reference}"{style}/>'
+    return f'<c r="{reference}"{style}><v>{value!r}</v></c>'
+
+
+def write_workbook(path, rows):
+    # A one-sheet workbook with the header, units and the given data rows
+    # (lists of cell XML).
+    strings = HEADER + ["kW"]
+    kw = len(HEADER)
+    header = "".join(f'<c r="{letter}1" t="s"><v>{i}</v></c>' for i, letter in enumerate("ABCD"))
+    units = "".join(f'<c r="{letter}2" t="s"><v>{kw}</v></c>' for letter in "BCD")
+    body = f'<row r="1">{header}</row><row r="2">{units}</row>'
+    body += "".join(f'<row r="{number}">{"".join(cells)}</row>' for number, cells in enumerate(rows, start=3))
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+        archive.writestr("_rels/.rels", ROOT_RELS)
+        archive.writestr("xl/workbook.xml", WORKBOOK)
+        archive.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS)
+        archive.writestr("xl/styles.xml", STYLES)
+        archive.writestr(
+            "xl/sharedStrings.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            + "".join(f"<si><t>{text}</t></si>" for text in strings) + "</sst>",
+        )
+        archive.writestr(
+            "xl/worksheets/sheet1.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            f"<sheetData>{body}</sheetData></worksheet>",
+        )
+
+
+def test_a_self_closing_cell_does_not_take_the_next_value():
+    cells = CELL_PATTERN.findall(b'<c r="A3" s="1"/><c r="B3"><v>5</v></c>')
+    assert cells == [(b"A", b"3", b' s="1"', b""), (b"B", b"3", b"", b"<v>5</v>")]
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    # Empty styled cells before, between and after filled ones.
+    path = tmp_path / "RES_empty.xlsx"
+    write_workbook(path, [
+        [cell("A3", START, 1), cell("B3", None, 2), cell("C3", 1.5), cell("D3", 0.25)],
+        [cell("A4", START + 1 / 24, 1), cell("B4", 2.0), cell("C4", None, 2), cell("D4", 0.5)],
+        [cell("A5", START + 2 / 24, 1), cell("B5", 3.0), cell("C5", 2.5), cell("D5", None, 2)],
+    ])
+    return path
+
+
+@pytest.mark.filterwarnings("ignore:Workbook contains no default style")
+@pytest.mark.parametrize("columns", [None, ["Load Served"], ["PV Power Output", "Grid Purchases"]])
+def test_empty_cells_read_as_missing(workbook, columns):
+    df = load_homer(workbook, columns)
+    expected = pd.read_excel(workbook, skiprows=[1]).set_index("Time")
+    expected = expected[columns] if columns else expected
+    assert list(df.columns) == list(expected.columns)
+    assert (df.index == pd.DatetimeIndex(expected.index)).all()
+    assert np.array_equal(df.to_numpy(), expected.to_numpy(dtype=float), equal_nan=True)
+    assert df.isna().sum().sum() == expected.isna().sum().sum() > 0
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from RES_compact import compact_frame
+from RES_resample import BinAccumulator, detect_step, needs_resampling, resample_frame
+
+# Parity of the streaming bin means with pandas: a synthetic 15-minute export
+# that starts in the middle of a day and has missing values must average to
+# what df.resample(...).mean() gives, however it is cut into blocks.
+
+
+@pytest.fixture(scope="module")
+def quarter_hours():
+    rng = np.random.default_rng(11)
+    index = pd.date_range("2021-03-01 13:45", periods=4 * 24 * 3 + 5, freq="15min", name="Time")
+    df = pd.DataFrame({"PV": rng.uniform(0, 3, len(index)), "Load": rng.uniform(0.2, 1.5, len(index))}, index=index)
+    df.iloc[rng.choice(len(df), 40, replace=False), 0] = np.nan
+    # An hour without any load value, so its bin mean is missing too.
+    df.loc["2021-03-02 04:00":"2021-03-02 04:45", "Load"] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("bin_minutes", [30, 60])
+@pytest.mark.parametrize("chunk_rows", [7, 1 << 16])
+def test_resample_frame_matches_pandas(quarter_hours, bin_minutes, chunk_rows):
+    expected = quarter_hours.resample(f"{bin_minutes}min").mean()
+    result = resample_frame(quarter_hours, bin_minutes, chunk_rows=chunk_rows)
+    assert result.index.equals(expected.index)
+    assert result.index.name == "Time"
+    assert list(result.columns) == ["PV", "Load"]
+    assert np.allclose(result, expected, equal_nan=True)
+    assert result["Load"].isna().sum() == 60 // bin_minutes
+
+
+def test_blocks_may_arrive_in_any_order(quarter_hours):
+    expected = quarter_hours.resample("60min").mean()
+    accumulator = BinAccumulator(quarter_hours.columns)
+    for start in reversed(range(0, len(quarter_hours), 50)):
+        block = quarter_hours.iloc[start:start + 50]
+        accumulator.add(block.index, block.to_numpy())
+    result = accumulator.result()
+    assert result.index.equals(expected.index)
+    assert np.allclose(result, expected, equal_nan=True)
+
+
+def test_rows_without_a_time_are_left_out(quarter_hours):
+    df = quarter_hours.copy()
+    df.index = df.index.where(np.arange(len(df)) % 10 != 3)
+    kept = df[df.index.notna()]
+    result = resample_frame(df, 60)
+    assert np.allclose(result, kept.resample("60min").mean(), equal_nan=True)
+
+
+def test_a_compact_frame_gives_the_same_bins(quarter_hours):
+    expected = quarter_hours.resample("60min").mean()
+    result = resample_frame(compact_frame(quarter_hours, units={}), 60)
+    assert result.index.equals(expected.index)
+    assert np.allclose(result, expected, rtol=1e-6, equal_nan=True)
+
+
+def test_the_timestep_decides_whether_to_resample(quarter_hours):
+    assert detect_step(quarter_hours.index) == 15
+    assert needs_resampling(15, 60)
+    assert not needs_resampling(60, 60)
+    with pytest.raises(ValueError, match="coarser"):
+        needs_resampling(60, 30)
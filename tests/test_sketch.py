@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from RES_sketch import ACCURACY, QuantileSketch
+
+# The quantiles read back from a sketch have to lie within the accuracy of
+# the exact quantile of the same rank: relative for the values above the
+# zero floor of a column, absolute (ACCURACY times the largest magnitude of
+# the column, rounded up by one power of gamma) below it. Merged sketches
+# keep the same bound.
+
+SEASONS = {"Winter": [1, 2, 3], "Summer": [7, 8, 9]}
+COLUMNS = ["PV", "Battery", "Load", "Empty"]
+QUANTILES = [0, 10, 50, 90, 100]
+
+
+@pytest.fixture(scope="module")
+def year():
+    # Two years of hourly values: a solar curve with its nights of exact
+    # zeros and rounding noise, a signed battery power, a load of a very
+    # different magnitude and a column without values.
+    rng = np.random.default_rng(7)
+    index = pd.date_range("2024-01-01", periods=2 * 8760, freq="h")
+    hours = index.hour.to_numpy()
+    solar = np.clip(np.sin((hours - 6) / 12 * np.pi), 0, None) * rng.uniform(0.5, 3.0, len(index))
+    solar[rng.random(len(index)) < 0.05] = 1e-12
+    battery = rng.normal(0, 1.5, len(index))
+    load = 200 + 50 * rng.random(len(index))
+    values = np.column_stack([solar, battery, load, np.full(len(index), np.nan)])
+    return pd.DataFrame(values, index=index, columns=COLUMNS)
+
+
+def stamps_of(frame):
+    return frame.index.values.astype("datetime64[ns]").astype(np.int64)
+
+
+def sketch_of(frame, block_rows=None):
+    sketch = QuantileSketch(SEASONS, COLUMNS)
+    block_rows = block_rows or len(frame)
+    for first in range(0, len(frame), block_rows):
+        block = frame.iloc[first:first + block_rows]
+        sketch.add(stamps_of(block), block.to_numpy())
+    return sketch
+
+
+def assert_within_bounds(sketch, frame):
+    scale = np.abs(frame[COLUMNS[:3]].to_numpy()).max(axis=0)
+    for stat in QUANTILES:
+        profiles = sketch.profiles(stat)
+        for season, months in SEASONS.items():
+            rows = frame[frame.index.month.isin(months)]
+            exact = rows.groupby(rows.index.hour).quantile(stat / 100, interpolation="lower").to_numpy()
+            error = np.abs(profiles[season][:, :3] - exact[:, :3])
+            bound = ACCURACY * np.abs(exact[:, :3]) + ACCURACY * scale * sketch.gamma
+            assert (error <= bound).all(), (stat, season)
+            assert np.isnan(profiles[season][:, 3]).all()
+
+
+def test_one_pass_is_within_the_accuracy(year):
+    assert_within_bounds(sketch_of(year), year)
+
+
+def test_blocks_are_within_the_accuracy(year):
+    assert_within_bounds(sketch_of(year, block_rows=1000), year)
+
+
+def test_merged_sketches_are_within_the_accuracy(year):
+    # Sketches of separate files (here: quarters of the data, so their
+    # floors differ) pooled into one.
+    merged = None
+    for part in np.array_split(np.arange(len(year)), 8):
+        sketch = sketch_of(year.iloc[part])
+        merged = sketch if merged is None else merged.merge(sketch)
+    assert merged.counts.sum() == year[COLUMNS[:3]][year.index.month.isin([1, 2, 3, 7, 8, 9])].count().sum()
+    assert_within_bounds(merged, year)
+
+
+def test_merging_matches_columns_by_name(year):
+    first = QuantileSketch(SEASONS, ["PV", "Load"])
+    first.add(stamps_of(year), year[["PV", "Load"]].to_numpy())
+    second = QuantileSketch(SEASONS, ["Battery"])
+    second.add(stamps_of(year), year[["Battery"]].to_numpy())
+    first.merge(second)
+    assert first.columns == ["PV", "Load", "Battery"]
+    one_pass = sketch_of(year)
+    for stat in QUANTILES:
+        for season in SEASONS:
+            assert np.allclose(first.profiles(stat)[season], one_pass.profiles(stat)[season][:, [0, 2, 1]])
+
+
+def test_the_extremes_are_exact(year):
+    sketch = sketch_of(year, block_rows=5000)
+    rows = year[year.index.month.isin(SEASONS["Summer"])]
+    hours = rows.groupby(rows.index.hour)
+    assert np.array_equal(sketch.profiles("min")["Summer"], hours.min().to_numpy(), equal_nan=True)
+    assert np.array_equal(sketch.profiles("max")["Summer"], hours.max().to_numpy(), equal_nan=True)
+
+
+def test_save_and_load(year, tmp_path):
+    sketch = sketch_of(year, block_rows=5000)
+    sketch.save(tmp_path / "sketch.npz")
+    loaded = QuantileSketch.load(tmp_path / "sketch.npz")
+    for stat in (50, 90):
+        for season in SEASONS:
+            assert np.array_equal(loaded.profiles(stat)[season], sketch.profiles(stat)[season], equal_nan=True)
+
+
+def test_only_alike_sketches_merge():
+    with pytest.raises(ValueError):
+        QuantileSketch(SEASONS, COLUMNS).merge(QuantileSketch(SEASONS, COLUMNS, accuracy=0.02))
+    with pytest.raises(ValueError):
+        QuantileSketch(SEASONS, COLUMNS).profiles(101)
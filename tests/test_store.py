@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from RES_store import connect, ingest_file, query, stored_files
+
+# Ingest / query round trip of the profile store against the same profiles
+# computed directly with pandas on the sample workbook.
+
+LOAD = "Total Electrical Load Served"
+BATTERY = "Generic 1kWh Lead Acid Input Power"
+RENEWABLE = "Total Renewable Power Output"
+SEASONS = {"Dry": [5, 6, 7, 8, 9, 10], "Wet": [11, 12, 1, 2, 3, 4]}
+
+
+@pytest.fixture(scope="module")
+def connection(sample, tmp_path_factory):
+    connection = connect(str(tmp_path_factory.mktemp("store") / "profiles.sqlite"))
+    assert ingest_file(connection, sample, SEASONS)
+    yield connection
+    connection.close()
+
+
+def hourly(frame, months):
+    return frame[frame.index.month.isin(months)].groupby(lambda stamp: stamp.hour)
+
+
+@pytest.mark.parametrize("stat", ["mean", "std", "min", "max", "median"])
+@pytest.mark.parametrize("period, months", [("August", [8]), ("feb", [2]), ("11", [11]), ("Wet", SEASONS["Wet"])])
+def test_month_and_season_profiles_match_pandas(connection, sample_frame, stat, period, months):
+    result = query(connection, "RES_P11", period, [LOAD, BATTERY], stat)
+    expected = getattr(hourly(sample_frame, months)[[LOAD, BATTERY]], stat)()
+    assert result.index.name == "Hour"
+    assert list(result.index) == list(range(24))
+    assert np.allclose(result, expected)
+
+
+@pytest.mark.parametrize("period", ["Feb 15", "02-15", "15 February"])
+def test_day_profiles_hold_the_values_of_the_day(connection, sample_frame, period):
+    result = query(connection, "RES_P11.xlsx", period, LOAD, "max")
+    assert np.array_equal(result[LOAD], sample_frame.loc["2025-02-15", LOAD])
+
+
+def test_derived_columns_are_stored(connection, sample_frame):
+    result = query(connection, "RES_P11", "Dry", ["Net Load"])
+    net = (sample_frame[LOAD] - sample_frame[RENEWABLE]).to_frame("Net Load")
+    assert np.allclose(result, hourly(net, SEASONS["Dry"]).mean())
+
+
+def test_the_file_is_recorded(connection, sample_frame):
+    files = stored_files(connection)
+    assert files["name"].tolist() == ["RES_P11"]
+    assert files.loc[0, "rows"] == len(sample_frame)
+    assert files.loc[0, "first_time"] == str(sample_frame.index.min())
+
+
+def test_an_unchanged_file_is_not_ingested_again(connection, sample, capsys):
+    assert not ingest_file(connection, sample, SEASONS)
+    assert capsys.readouterr().out == "RES_P11 is already stored.\n"
+
+
+@pytest.mark.parametrize("period, message", [("Monsoon", "Unknown period"), ("02-30", "no 02-30 data")])
+def test_unknown_periods_are_refused(connection, period, message):
+    with pytest.raises(ValueError, match=message):
+        query(connection, "RES_P11", period, LOAD)
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from RES_cache import load_cached
+from RES_timeaxis import TimeAxisCheck, build_text_axis
+
+# The time axis of a synthetic hourly export around a leap day, written as
+# text the way some HOMER versions do, with one hour missing (2024-02-29
+# 05:00) and one hour written twice (2024-02-29 12:00).
+
+FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SKIPPED = pd.Timestamp("2024-02-29 05:00")
+REPEATED = pd.Timestamp("2024-02-29 12:00")
+
+
+def hours(start="2024-02-28 18:00", end="2024-03-01 06:00"):
+    return list(pd.date_range(start, end, freq="h"))
+
+
+@pytest.fixture(scope="module")
+def irregular():
+    stamps = [stamp for stamp in hours() if stamp != SKIPPED]
+    position = stamps.index(REPEATED)
+    return stamps[:position + 1] + stamps[position:]
+
+
+def as_text(stamps):
+    return np.array([stamp.strftime(FORMAT) for stamp in stamps], dtype=object)
+
+
+def checked(stamps, block=7):
+    check = TimeAxisCheck()
+    values = pd.DatetimeIndex(stamps).to_numpy()
+    for start in range(0, len(values), block):
+        check.add(values[start:start + block])
+    return check
+
+
+def test_a_regular_text_axis_is_generated_across_the_leap_day():
+    stamps = hours()
+    axis = build_text_axis(as_text(stamps))
+    assert axis.dtype == np.dtype("datetime64[s]")
+    assert np.array_equal(axis, pd.DatetimeIndex(stamps).to_numpy().astype("datetime64[s]"))
+    assert np.datetime64("2024-02-29T00:00:00") in axis
+
+
+def test_an_irregular_text_axis_keeps_every_timestamp(irregular):
+    axis = build_text_axis(as_text(irregular))
+    assert np.array_equal(axis, pd.DatetimeIndex(irregular).to_numpy().astype("datetime64[s]"))
+
+
+def test_the_missing_and_repeated_hours_are_reported(irregular):
+    summary = checked(irregular).summary()
+    assert summary["start"] == "2024-02-28T18:00:00"
+    assert summary["step"] == "1 h"
+    assert summary["rows"] == len(irregular)
+    assert summary["irregular"] == {"skipped hour (DST start?)": 1, "repeated hour (DST end?)": 1}
+    skipped, repeated = summary["examples"]
+    assert skipped == {
+        "row": irregular.index(SKIPPED + pd.Timedelta(hours=1)),
+        "kind": "skipped hour (DST start?)",
+        "after": "2024-02-29T04:00:00",
+        "at": "2024-02-29T06:00:00",
+    }
+    assert repeated["row"] == irregular.index(REPEATED) + 1
+    assert repeated["after"] == repeated["at"] == "2024-02-29T12:00:00"
+
+
+def test_a_regular_axis_has_nothing_to_report():
+    check = checked(hours())
+    assert check.summary()["irregular"] == {}
+    assert check.messages("RES_leap.xlsx") == []
+
+
+@pytest.mark.parametrize("block", [1, 7, 1000])
+def test_the_report_does_not_depend_on_the_blocks(irregular, block):
+    assert checked(irregular, block).summary() == checked(irregular).summary()
+
+
+def test_the_cache_reports_the_axis_once(irregular, tmp_path, capsys):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Time", "Load Served"])
+    sheet.append([None, "kW"])
+    for number, stamp in enumerate(irregular):
+        sheet.append([stamp.strftime(FORMAT), float(number)])
+    path = tmp_path / "RES_leap.xlsx"
+    workbook.save(path)
+
+    df = load_cached(str(path), cache_dir=str(tmp_path / "cache"))
+    assert df.index.equals(pd.DatetimeIndex(irregular, name="Time"))
+    assert np.array_equal(df["Load Served"], np.arange(len(irregular)))
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == [
+        "The Time column of RES_leap.xlsx has 1 x skipped hour (DST start?) (step 1 h),"
+        " first between 2024-02-29T04:00:00 and 2024-02-29T06:00:00.",
+        "The Time column of RES_leap.xlsx has 1 x repeated hour (DST end?) (step 1 h),"
+        " first between 2024-02-29T12:00:00 and 2024-02-29T12:00:00.",
+    ]
+    load_cached(str(path), cache_dir=str(tmp_path / "cache"))
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,80 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from RES_cache import load_cached
+from RES_typical import representative_sheets
+
+# The representative days of the sample workbook against the same search
+# written out directly in pandas: the days of a season as (day x hour)
+# tables, every column scaled by its standard deviation over the season, and
+# Euclidean distances between the days and to the season's mean day.
+
+TARGET_COLUMNS = {
+    "Generic flat plate PV Power Output": "PV",
+    "Generic 1kWh Lead Acid Input Power": "Battery",
+    "Total Electrical Load Served": "Load",
+}
+SEASONS = {"Winter": [1, 2, 3], "Summer": [7, 8, 9]}
+
+
+@pytest.fixture(scope="module")
+def frame(sample):
+    return load_cached(sample, list(TARGET_COLUMNS))
+
+
+def season_features(sample_frame, months):
+    # (dates, days x (hours * columns) scaled features) of a season.
+    season = sample_frame[sample_frame.index.month.isin(months)][list(TARGET_COLUMNS)]
+    season = season / season.std(ddof=0)
+    table = season.set_index([season.index.normalize(), season.index.hour]).unstack()
+    table = table.reorder_levels([1, 0], axis=1).sort_index(axis=1)
+    return table.index, table.to_numpy()
+
+
+def distances(features):
+    return np.sqrt(((features[:, None, :] - features[None, :, :]) ** 2).sum(axis=2))
+
+
+def test_the_day_closest_to_the_mean_is_picked(frame, sample_frame):
+    sheets = representative_sheets(frame, TARGET_COLUMNS, SEASONS)
+    assert list(sheets) == list(SEASONS) + ["Days"]
+    for season, months in SEASONS.items():
+        dates, features = season_features(sample_frame, months)
+        to_mean = np.sqrt(((features - features.mean(axis=0)) ** 2).sum(axis=1))
+        best = int(np.argmin(to_mean))
+        day = sheets["Days"].loc[season]
+        assert pd.Timestamp(int(day["Year"]), int(day["Month"]), int(day["Day"])) == dates[best]
+        assert day["Weight"] == 1.0
+        assert day["Distance"] == pytest.approx(to_mean[best])
+        hours = sample_frame.loc[dates[best].strftime("%Y-%m-%d"), list(TARGET_COLUMNS)]
+        assert np.allclose(sheets[season].to_numpy(dtype=float), hours.to_numpy())
+        assert list(sheets[season].columns) == list(TARGET_COLUMNS.values())
+
+
+@pytest.mark.parametrize("k", [2, 3])
+def test_typical_days_are_k_medoids(frame, sample_frame, k):
+    sheets = representative_sheets(frame, TARGET_COLUMNS, SEASONS, typical_days=k)
+    for season, months in SEASONS.items():
+        dates, features = season_features(sample_frame, months)
+        pairs = distances(features)
+        picked = sheets["Days"].loc[[f"{season} {rank}" for rank in range(1, k + 1)]]
+        chosen = [dates.get_loc(pd.Timestamp(int(row.Year), int(row.Month), int(row.Day))) for row in picked.itertuples()]
+        assert len(set(chosen)) == k
+
+        # Every day belongs to its nearest medoid; the weights are the
+        # shares of the season's days, largest first.
+        nearest = np.argmin(pairs[:, chosen], axis=1)
+        shares = np.bincount(nearest, minlength=k) / len(dates)
+        assert np.allclose(picked["Weight"], shares)
+        assert list(picked["Weight"]) == sorted(picked["Weight"], reverse=True)
+
+        # No single medoid/day swap lowers the total distance (PAM's
+        # stopping rule), checked by trying every swap.
+        cost = pairs[:, chosen].min(axis=1).sum()
+        for number, day in itertools.product(range(k), range(len(dates))):
+            swapped = list(chosen)
+            swapped[number] = day
+            assert pairs[:, swapped].min(axis=1).sum() >= cost * (1 - 1e-9)
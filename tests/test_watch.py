@@ -0,0 +1,58 @@
+import json
+import os
+
+from RES_watch import Watcher
+
+# Manifests that cannot be read: each version is read and reported once, the
+# previous scenarios are kept, and a fixed manifest is picked up again.
+
+
+def write_manifest(path, text, stamp):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(stamp, stamp))
+
+
+def scan_twice(watcher):
+    # A path is passed on once two scans saw the same signature.
+    watcher.scan()
+    return watcher.scan()
+
+
+def test_a_broken_manifest_is_reported_once_per_version(tmp_path, capsys):
+    manifest = tmp_path / "RES_main.json"
+    scenario = {"name": "11", "input": "RES_P11.xlsx", "output": "Result_P11.xlsx", "columns": {"Global Solar": "GS"}}
+    write_manifest(manifest, json.dumps({"scenarios": [scenario]}), 1_000_000_000)
+    watcher = Watcher([str(manifest)], settle=0)
+    assert list(watcher.scenarios) == [str(tmp_path / "Result_P11.xlsx")]
+    assert scan_twice(watcher) == []
+
+    write_manifest(manifest, '{"scenarios": [', 2_000_000_000)
+    assert scan_twice(watcher) == [str(manifest)]
+    assert watcher.load(str(manifest)) == []
+    assert "manifest could not be read" in capsys.readouterr().out
+    # The broken version is not read again, and the scenarios stay.
+    for _ in range(3):
+        assert watcher.scan() == []
+    assert capsys.readouterr().out == ""
+    assert list(watcher.scenarios) == [str(tmp_path / "Result_P11.xlsx")]
+
+    # A new broken version is reported again.
+    write_manifest(manifest, "[1, 2]", 3_000_000_000)
+    assert scan_twice(watcher) == [str(manifest)]
+    watcher.load(str(manifest))
+    assert "could not be read: AttributeError" in capsys.readouterr().out
+
+    scenario["output"] = "Result_P11_new.xlsx"
+    write_manifest(manifest, json.dumps({"scenarios": [scenario]}), 4_000_000_000)
+    assert scan_twice(watcher) == [str(manifest)]
+    assert watcher.load(str(manifest)) == [str(tmp_path / "Result_P11_new.xlsx")]
+    assert list(watcher.scenarios) == [str(tmp_path / "Result_P11_new.xlsx")]
+
+
+def test_a_manifest_broken_at_start_is_not_read_again(tmp_path, capsys):
+    manifest = tmp_path / "RES_main.json"
+    write_manifest(manifest, "{", 1_000_000_000)
+    watcher = Watcher([str(manifest)], settle=0)
+    assert watcher.scenarios == {}
+    assert scan_twice(watcher) == []
+    assert capsys.readouterr().out.count("could not be read") == 1
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+from RES_writer import MAX_SHEET_NAME, unique_sheet_name, write_combined
+
+# Sheet names of the combined workbook: Excel cuts them at 31 characters and
+# ignores case, so long scenario names must not end up on one sheet.
+
+
+def sheet(value):
+    result_df = pd.DataFrame({"Load": [value] * 24}, index=range(24))
+    result_df.index.name = "Hour"
+    return result_df
+
+
+def test_colliding_names_get_a_suffix():
+    used = set()
+    names = [unique_sheet_name(name, used) for name in ["Hybrid PV wind grid scenario A Winter"] * 3 + ["short", "SHORT"]]
+    assert names == [
+        "Hybrid PV wind grid scenario A ",
+        "Hybrid PV wind grid scenari (2)",
+        "Hybrid PV wind grid scenari (3)",
+        "short",
+        "SHORT (2)",
+    ]
+    assert all(len(name) <= MAX_SHEET_NAME for name in names)
+
+
+def test_every_scenario_keeps_its_sheets(tmp_path, capsys):
+    path = tmp_path / "Combined.xlsx"
+    results = {
+        "Hybrid PV wind grid, site A": {"Winter": sheet(1.0), "Summer": sheet(2.0)},
+        "Hybrid PV wind grid, site B": {"Winter": sheet(3.0), "Summer": sheet(4.0)},
+    }
+    write_combined(results, str(path))
+    written = pd.read_excel(path, sheet_name=None, index_col=0)
+    assert list(written) == [
+        "Hybrid PV wind grid, site A Win",
+        "Hybrid PV wind grid, site A Sum",
+        "Hybrid PV wind grid, site B Win",
+        "Hybrid PV wind grid, site B Sum",
+    ]
+    assert [frame["Load"].iloc[0] for frame in written.values()] == [1.0, 2.0, 3.0, 4.0]
+    assert capsys.readouterr().out == ""
+
+    # Names that only differ after the 31st character.
+    names = ["Hybrid PV wind grid scenario no. A", "Hybrid PV wind grid scenario no. B"]
+    results = {name: {"Winter": sheet(value)} for name, value in zip(names, [1.0, 2.0])}
+    write_combined(results, str(path))
+    written = pd.read_excel(path, sheet_name=None, index_col=0)
+    assert list(written) == ["Hybrid PV wind grid scenario no", "Hybrid PV wind grid scenari (2)"]
+    assert [frame["Load"].iloc[0] for frame in written.values()] == [1.0, 2.0]
+    assert "is written as Hybrid PV wind grid scenari (2)." in capsys.readouterr().out